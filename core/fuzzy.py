@@ -0,0 +1,144 @@
+"""
+Typo-tolerant word matching.
+
+Local dish and restaurant names are spelled many ways ("pancit"/"pansit",
+"lechon"/"litson"), so exact and prefix search often come back empty.
+``TrigramIndex`` holds a vocabulary of words with an inverted list from each
+character trigram to the words containing it. Correcting a query word only
+looks at vocabulary words sharing enough trigrams with it (the rarest
+trigrams pick the candidates, the common ones just confirm them), then keeps
+those within a few edits. The caller maps the corrected words back to names;
+the vocabulary is far smaller than the catalog, so no lookup ever scores
+every name.
+"""
+import time
+from collections import Counter
+
+# Vocabulary words checked by edit distance, and posting entries read, per query word at most
+CANDIDATE_LIMIT = 200
+POSTING_LIMIT = 20000
+
+
+def word_trigrams(word):
+    """Trigrams of a word padded like pg_trgm, so short words and word starts count"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(token):
+    """Typos allowed in a query word of this length (three-letter words must be exact)"""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return 2
+
+
+def bounded_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it is known to exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def word_distance(token, word, limit):
+    """Edits from ``token`` to ``word``, or to its start when the query is a shortened word"""
+    if word.startswith(token):
+        return 0
+    distance = bounded_distance(token, word, limit)
+    if distance and len(word) > len(token):
+        distance = min(distance, bounded_distance(token, word[:len(token)], limit))
+    return distance
+
+
+class TrigramIndex:
+    """A vocabulary searchable with typos. Not thread-safe; the owner locks."""
+
+    def __init__(self, words=()):
+        self._words = set()
+        self._postings = {}  # trigram -> words containing it
+        for word in words:
+            self.add(word)
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def add(self, word):
+        if word in self._words:
+            return
+        self._words.add(word)
+        for trigram in word_trigrams(word):
+            self._postings.setdefault(trigram, set()).add(word)
+
+    def remove(self, word):
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        for trigram in word_trigrams(word):
+            words = self._postings.get(trigram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._postings[trigram]
+
+    def similar(self, token, deadline=None):
+        """
+        ``[(word, edits)]`` for vocabulary words within ``max_edits(token)``
+        of ``token`` (or starting with it), fewest edits first. Stops early
+        once ``time.perf_counter()`` passes ``deadline``.
+        """
+        limit = max_edits(token)
+        query = word_trigrams(token)
+        # Each typo breaks at most three trigrams, and a shortened word
+        # ("chick" for "chicken") loses its word-end trigram
+        needed = max(1, len(query) - 3 * limit - 1)
+
+        # A word sharing ``needed`` trigrams must contain one of the
+        # len(query) - needed + 1 rarest ones
+        lists = sorted((self._postings.get(trigram, ()) for trigram in query), key=len)
+        split = len(lists) - needed + 1
+        shared = Counter()
+        read = 0
+        for words in lists[:split]:
+            read += len(words)
+            if read > POSTING_LIMIT and shared:
+                break
+            shared.update(words)
+        candidates = []
+        for word, count in shared.items():
+            count += sum(1 for words in lists[split:] if word in words)
+            if count >= needed:
+                candidates.append((-count, word))
+        candidates.sort()
+
+        matches = []
+        for _, word in candidates[:CANDIDATE_LIMIT]:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            edits = word_distance(token, word, limit)
+            if edits <= limit:
+                matches.append((word, edits))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+    def memory_bytes(self, size):
+        """Size of the index structures; the words themselves are shared with the owner"""
+        total = size(self._words) + size(self._postings)
+        for trigram, words in self._postings.items():
+            total += size(trigram) + size(words)
+        return total
@@ -0,0 +1,189 @@
+"""
+Address geocoding, done when an address is written rather than when it is read.
+
+Models using ``GeocodedLocationMixin`` store latitude, longitude and plus_code
+alongside the address text. They are resolved on save when the text changed
+(or was never resolved). Addresses containing a plus code are decoded locally
+(core.olc) during the save; anything else is looked up once the save has
+committed, through a cache keyed by the normalized address so the same street
+is only sent to Google once. Read endpoints use the stored values and never
+call out to the network.
+"""
+import hashlib
+import logging
+import re
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import olc
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+GEOCODE_CACHE_KEY = 'geocode:{digest}'
+# Successful lookups hardly ever change; failed ones are retried after an hour
+GEOCODE_HIT_TIMEOUT = 60 * 60 * 24 * 30
+GEOCODE_MISS_TIMEOUT = 60 * 60
+GEOCODE_TIMEOUT_SECONDS = 4
+
+# Fields resolved from the address text
+LOCATION_RESULT_FIELDS = ('latitude', 'longitude', 'plus_code')
+
+
+def normalize_address(text):
+    """Case, punctuation and whitespace-insensitive form of an address"""
+    text = re.sub(r'[\s,]+', ' ', str(text or '').lower())
+    return text.strip()
+
+
+def geocode(text):
+    """
+    Resolve an address (or a plus code) to
+    ``{'latitude': ..., 'longitude': ..., 'plus_code': ...}``, or None.
+    """
+    normalized = normalize_address(text)
+    if not normalized:
+        return None
+
+    key = GEOCODE_CACHE_KEY.format(digest=hashlib.sha1(normalized.encode()).hexdigest())
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+
+    api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', '')
+    if not api_key:
+        return None
+
+    try:
+        response = requests.get(
+            GEOCODE_URL,
+            params={'address': text, 'key': api_key, 'components': 'country:PH'},
+            timeout=GEOCODE_TIMEOUT_SECONDS,
+        )
+        data = response.json() if response.ok else {}
+    except (requests.RequestException, ValueError) as e:
+        # Network trouble: don't cache, the next save tries again
+        logger.warning(f"Geocoding failed for '{text}': {e}")
+        return None
+
+    if data.get('status') != 'OK' or not data.get('results'):
+        logger.info(f"Geocoding found nothing for '{text}': {data.get('status')}")
+        cache.set(key, {}, timeout=GEOCODE_MISS_TIMEOUT)
+        return None
+
+    best = data['results'][0]
+    location = best['geometry']['location']
+    result = {
+        'latitude': location['lat'],
+        'longitude': location['lng'],
+        'plus_code': best.get('plus_code', {}).get('global_code', '') or '',
+    }
+    cache.set(key, result, timeout=GEOCODE_HIT_TIMEOUT)
+    return result
+
+
+class GeocodedLocationMixin:
+    """
+    For models with ``latitude``, ``longitude`` and ``plus_code`` fields.
+
+    Subclasses define ``location_query()`` (the text to geocode) and
+    ``location_fields`` (the fields it is built from).
+    """
+
+    location_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_location = instance._location_state()
+        return instance
+
+    def _location_state(self):
+        # __dict__ so deferred fields don't trigger queries
+        return (
+            tuple(self.__dict__.get(field) for field in self.location_fields),
+            self.__dict__.get('latitude'),
+            self.__dict__.get('longitude'),
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        pending = None
+        if update_fields is None or set(self.location_fields).intersection(update_fields):
+            pending = self.resolve_location()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(LOCATION_RESULT_FIELDS)
+        super().save(*args, **kwargs)
+        self._loaded_location = self._location_state()
+        if pending is not None:
+            # The HTTP lookup stays out of the save and its transaction
+            transaction.on_commit(partial(geocode_saved, type(self), self.pk, pending), robust=True)
+
+    def resolve_location(self):
+        """
+        Set the location from what is at hand: coordinates sent with the
+        address, or a plus code in it. Returns the text that still has to be
+        geocoded, or None.
+        """
+        loaded = getattr(self, '_loaded_location', None)
+        text, latitude, longitude = self._location_state()
+
+        text_changed = loaded is None or [normalize_address(v) for v in text] != [normalize_address(v) for v in loaded[0]]
+
+        # Coordinates sent along with the address (e.g. from the phone's GPS) win
+        coordinates_given = latitude is not None and (loaded is None or (latitude, longitude) != loaded[1:])
+        if coordinates_given:
+            if text_changed or not self.plus_code:
+                self.plus_code = olc.encode(latitude, longitude)
+            return None
+
+        if not text_changed and self.latitude is not None:
+            return None
+
+        query = self.location_query()
+        located = olc.locate(query)
+        if located is not None:
+            self.apply_location({'plus_code': located[0], 'latitude': located[1], 'longitude': located[2]})
+            return None
+
+        if text_changed:
+            # Old coordinates belong to the old address
+            self.latitude = self.longitude = None
+            self.plus_code = ''
+        return query
+
+    def apply_location(self, result):
+        """Store a ``geocode()`` result"""
+        self.latitude = round(result['latitude'], 7)
+        self.longitude = round(result['longitude'], 7)
+        self.plus_code = result['plus_code'] or olc.encode(result['latitude'], result['longitude'])
+
+    def coordinates(self):
+        """
+        ``(latitude, longitude)`` as floats: the stored values, else decoded
+        from a plus code in the address, else ``(None, None)``. No network.
+        """
+        if self.latitude is not None and self.longitude is not None:
+            return float(self.latitude), float(self.longitude)
+        located = olc.locate(self.location_query())
+        if located is not None:
+            return located[1], located[2]
+        return None, None
+
+
+def geocode_saved(model, pk, query):
+    """After commit: geocode a saved row's address unless it has changed again since"""
+    result = geocode(query)
+    if result is None:
+        # Left unresolved; the next save of the row or backfill_locations retries
+        return
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or instance.location_query() != query or instance.latitude is not None:
+        return
+    instance.apply_location(result)
+    # update() rather than save(): nothing else changed, so no signals need to run
+    model.objects.filter(pk=pk).update(**{field: getattr(instance, field) for field in LOCATION_RESULT_FIELDS})
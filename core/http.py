@@ -0,0 +1,41 @@
+import hashlib
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+def make_etag(body):
+    """Strong ETag for a response body (bytes)"""
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def cached_json_response(request, body, etag=None, max_age=None):
+    """
+    Serve pre-encoded JSON bytes with an ETag.
+
+    Safe requests whose ``If-None-Match`` matches get an empty 304, so
+    clients polling unchanged data skip both the encoding and the transfer.
+    ``max_age`` adds a ``Cache-Control`` header (``no-cache`` when omitted,
+    i.e. clients must revalidate but may reuse their copy on a 304).
+    ``body`` may be a callable when ``etag`` is given; it is only called
+    when the body is actually sent.
+    """
+    if etag is None:
+        etag = make_etag(body)
+
+    if request.method in ('GET', 'HEAD') and etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body() if callable(body) else body, content_type='application/json')
+
+    response['ETag'] = etag
+    response['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'no-cache'
+    return response
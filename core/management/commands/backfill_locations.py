@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+
+from core import olc
+from core.geocoding import geocode
+from customer.models import Address
+from restaurant.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Resolve latitude/longitude/plus_code for addresses and restaurants saved before they were stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-resolve rows that already have coordinates')
+        parser.add_argument('--offline', action='store_true', help='Only decode plus codes; never call the geocoder')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in (Address, Restaurant):
+            rows = model.objects.order_by('pk')
+            if not options['all']:
+                rows = rows.filter(latitude__isnull=True)
+
+            decoded = geocoded = missing = 0
+            batch = []
+            for row in rows.iterator(chunk_size=options['batch_size']):
+                batch.append(row)
+                if len(batch) >= options['batch_size']:
+                    counts = self.resolve_batch(model, batch, options['offline'])
+                    decoded, geocoded, missing = decoded + counts[0], geocoded + counts[1], missing + counts[2]
+                    batch = []
+            if batch:
+                counts = self.resolve_batch(model, batch, options['offline'])
+                decoded, geocoded, missing = decoded + counts[0], geocoded + counts[1], missing + counts[2]
+
+            # Rows with coordinates but no plus code (e.g. set from GPS before this change)
+            without_code = list(model.objects.filter(latitude__isnull=False, plus_code=''))
+            codes = olc.encode_many((row.latitude, row.longitude) for row in without_code)
+            for row, code in zip(without_code, codes):
+                row.plus_code = code
+            model.objects.bulk_update(without_code, ['plus_code'], batch_size=options['batch_size'])
+            encoded = len(without_code)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}: {decoded} decoded from plus codes, {geocoded} geocoded, '
+                f'{encoded} plus codes encoded, {missing} unresolved'
+            ))
+
+    def resolve_batch(self, model, rows, offline):
+        decoded, geocoded, missing = [], [], 0
+
+        # Plus codes decode locally in one pass; only the rest needs the geocoder
+        located = olc.locate_many(row.location_query() for row in rows)
+        for row, result in zip(rows, located):
+            if result is not None:
+                row.plus_code, row.latitude, row.longitude = result[0], round(result[1], 7), round(result[2], 7)
+                decoded.append(row)
+                continue
+            if offline:
+                missing += 1
+                continue
+
+            # Forget what was loaded so the address counts as new
+            row._loaded_location = None
+            row.latitude = row.longitude = None
+            query = row.resolve_location()
+            result = geocode(query) if query is not None else None
+            if result is None:
+                missing += 1
+            else:
+                row.apply_location(result)
+                geocoded.append(row)
+
+        model.objects.bulk_update(decoded + geocoded, ['latitude', 'longitude', 'plus_code'])
+        return len(decoded), len(geocoded), missing
@@ -0,0 +1,118 @@
+import random
+import string
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from core.suggest import PRODUCT, SuggestionIndex
+
+WORDS = [
+    'chicken', 'adobo', 'pancit', 'canton', 'beef', 'rendang', 'lechon', 'sinigang', 'halo', 'palabok',
+    'rice', 'fried', 'grilled', 'spicy', 'sweet', 'sour', 'tapa', 'silog', 'burger', 'pizza', 'shawarma',
+    'piaparan', 'palapa', 'kuning', 'dodol', 'tiyateg', 'milk', 'tea', 'coffee', 'mango', 'shake',
+]
+BARANGAYS = ['Poblacion', 'Basak', 'Lilod Madaya', 'Marinaut', 'Saduc', 'Datu Saber', 'Bangon', 'Tampilong']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Build the search autocomplete and typo index from synthetic names and report memory and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--restaurants', type=int, default=500)
+        parser.add_argument('--queries', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--budget-ms', type=float, default=25, help='Time budget per typo-tolerant search')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def name(words):
+            return ' '.join(rng.choice(WORDS).title() for _ in range(words))
+
+        products = [(i, f'{name(rng.randint(1, 3))} {rng.randint(1, 999)}') for i in range(options['products'])]
+        restaurants = [
+            (i, f"{name(2)} {rng.choice(['House', 'Grill', 'Kitchen', 'Cafe'])}", rng.choice(BARANGAYS))
+            for i in range(options['restaurants'])
+        ]
+
+        index = SuggestionIndex()
+        tracemalloc.start()
+        started = time.perf_counter()
+        index.load(products, restaurants)
+        build_ms = (time.perf_counter() - started) * 1000
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = index.stats()
+
+        self.stdout.write(
+            f"🏗️  {stats['entries']} entries, {stats['words']} words built in {build_ms:.0f} ms | "
+            f"memory ~{stats['memory_bytes'] / 1024 / 1024:.1f} MB (estimate), "
+            f"{traced / 1024 / 1024:.1f} MB (tracemalloc, incl. input lists)"
+        )
+
+        prefixes = []
+        for _ in range(options['queries']):
+            words = [rng.choice(WORDS + [b.lower() for b in BARANGAYS]) for _ in range(rng.randint(1, 2))]
+            words[-1] = words[-1][:rng.randint(1, len(words[-1]))]
+            prefixes.append(' '.join(words))
+        # Some misses too
+        prefixes += [''.join(rng.choices(string.ascii_lowercase, k=3)) for _ in range(options['queries'] // 10)]
+
+        latencies = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.suggest(prefix)
+            latencies.append(time.perf_counter() - started)
+
+        def us(value):
+            return f'{value * 1_000_000:.0f} µs'
+
+        self.stdout.write(
+            f"⌨️  {len(prefixes)} suggestions | p50 {us(percentile(latencies, 50))} "
+            f"p95 {us(percentile(latencies, 95))} p99 {us(percentile(latencies, 99))} "
+            f"max {us(max(latencies))}"
+        )
+
+        # Misspelled searches: one random edit in a word of a real name
+        def misspell(word):
+            position = rng.randrange(len(word))
+            edit = rng.choice(['swap', 'drop', 'add'])
+            if edit == 'swap':
+                return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+            if edit == 'drop' and len(word) > 4:
+                return word[:position] + word[position + 1:]
+            return word[:position] + rng.choice(string.ascii_lowercase) + word[position:]
+
+        typos = []
+        for _ in range(options['queries'] // 10):
+            words = rng.choice(products)[1].lower().split()[:-1]
+            typos.append(' '.join(misspell(word) if len(word) > 3 else word for word in words))
+
+        budget = options['budget_ms'] / 1000
+        latencies = []
+        found = 0
+        for query in typos:
+            started = time.perf_counter()
+            found += bool(index.fuzzy_search(PRODUCT, query, 10, budget))
+            latencies.append(time.perf_counter() - started)
+
+        def ms(value):
+            return f'{value * 1000:.1f} ms'
+
+        self.stdout.write(
+            f"🔤 {len(typos)} misspelled searches, {found * 100 / max(len(typos), 1):.0f}% found something | "
+            f"p50 {ms(percentile(latencies, 50))} p95 {ms(percentile(latencies, 95))} "
+            f"p99 {ms(percentile(latencies, 99))} max {ms(max(latencies))} (budget {options['budget_ms']:g} ms)"
+        )
+
+        started = time.perf_counter()
+        for i in range(1000):
+            index.put_product(options['products'] + i, name(2))
+        self.stdout.write(f"✏️  1000 incremental product updates in {(time.perf_counter() - started) * 1000:.0f} ms")
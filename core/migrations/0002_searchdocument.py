@@ -0,0 +1,79 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:11
+
+import re
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def normalize_text(*parts):
+    return re.sub(r'\s+', ' ', ' '.join(str(part or '') for part in parts)).strip().lower()
+
+
+def create_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX core_searchdocument_vector_gin ON core_searchdocument USING gin (search_vector)'
+    )
+
+
+def drop_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_searchdocument_vector_gin')
+
+
+def build_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    Product = apps.get_model('menu', 'Product')
+    Restaurant = apps.get_model('restaurant', 'Restaurant')
+
+    documents = [
+        SearchDocument(kind='product', object_id=product.pk, title=normalize_text(product.name)[:255],
+                       body=normalize_text(product.description))
+        for product in Product.objects.all().iterator()
+    ]
+    documents += [
+        SearchDocument(kind='restaurant', object_id=restaurant.pk, title=normalize_text(restaurant.name)[:255],
+                       body=normalize_text(restaurant.barangay, restaurant.address), visible=restaurant.is_approved)
+        for restaurant in Restaurant.objects.all().iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        SearchDocument.objects.update(search_vector=(
+            SearchVector('title', weight='A', config='simple') + SearchVector('body', weight='B', config='simple')
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('menu', '0006_alter_product_product_picture'),
+        ('restaurant', '0006_restaurant_latitude_restaurant_longitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('restaurant', 'Restaurant')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('visible', models.BooleanField(default=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'visible', 'title'], name='core_search_kind_c6557a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_vector_index, drop_vector_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -13,3 +14,34 @@ class MagicLink(models.Model):
 
     def is_expired(self):
         return timezone.now() > self.expires_at
+
+
+class SearchDocument(models.Model):
+    """Precomputed search text for one product or restaurant (see core.search)"""
+    PRODUCT = 'product'
+    RESTAURANT = 'restaurant'
+    KIND_CHOICES = [
+        (PRODUCT, 'Product'),
+        (RESTAURANT, 'Restaurant'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    # Lowercased, whitespace-collapsed name and supporting text
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    visible = models.BooleanField(default=True)
+    # Filled in on PostgreSQL only; its GIN index is created by migration 0002
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'visible', 'title']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
@@ -0,0 +1,267 @@
+"""
+Open Location Code (plus code) encoding and decoding, without network calls.
+
+Follows the reference implementation (github.com/google/open-location-code)
+using its integer arithmetic, so results match Google's to the last digit.
+Short codes such as ``X7Q3+FF`` are recovered against a reference point,
+by default ``PLUS_CODE_REFERENCE_LATITUDE/LONGITUDE`` (Marawi City).
+"""
+import math
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+SEPARATOR = '+'
+SEPARATOR_POSITION = 8
+PADDING_CHARACTER = '0'
+CODE_ALPHABET = '23456789CFGHJMPQRVWX'
+ENCODING_BASE = len(CODE_ALPHABET)
+LATITUDE_MAX = 90
+LONGITUDE_MAX = 180
+MAX_DIGIT_COUNT = 15
+PAIR_CODE_LENGTH = 10
+PAIR_FIRST_PLACE_VALUE = ENCODING_BASE ** (PAIR_CODE_LENGTH // 2 - 1)
+PAIR_PRECISION = ENCODING_BASE ** 3
+GRID_CODE_LENGTH = MAX_DIGIT_COUNT - PAIR_CODE_LENGTH
+GRID_COLUMNS = 4
+GRID_ROWS = 5
+GRID_LAT_FIRST_PLACE_VALUE = GRID_ROWS ** (GRID_CODE_LENGTH - 1)
+GRID_LNG_FIRST_PLACE_VALUE = GRID_COLUMNS ** (GRID_CODE_LENGTH - 1)
+FINAL_LAT_PRECISION = PAIR_PRECISION * GRID_ROWS ** GRID_CODE_LENGTH
+FINAL_LNG_PRECISION = PAIR_PRECISION * GRID_COLUMNS ** GRID_CODE_LENGTH
+
+_DIGIT_VALUES = {char: value for value, char in enumerate(CODE_ALPHABET)}
+
+# A plus code inside free text, e.g. "X7Q3+FF Marawi City, Lanao del Sur"
+PLUS_CODE_PATTERN = re.compile(
+    r'(?<![0-9A-Z])[2-9CFGHJMPQRVWX0]{2,8}\+[2-9CFGHJMPQRVWX]*(?![0-9A-Z])', re.IGNORECASE
+)
+
+DEFAULT_REFERENCE = (7.9986, 124.2928)  # Marawi City
+
+
+class CodeArea(namedtuple('CodeArea', 'latitude_lo longitude_lo latitude_hi longitude_hi code_length')):
+    @property
+    def latitude_center(self):
+        return min(self.latitude_lo + (self.latitude_hi - self.latitude_lo) / 2, LATITUDE_MAX)
+
+    @property
+    def longitude_center(self):
+        return min(self.longitude_lo + (self.longitude_hi - self.longitude_lo) / 2, LONGITUDE_MAX)
+
+    @property
+    def center(self):
+        return self.latitude_center, self.longitude_center
+
+
+def reference_point():
+    return (
+        getattr(settings, 'PLUS_CODE_REFERENCE_LATITUDE', DEFAULT_REFERENCE[0]),
+        getattr(settings, 'PLUS_CODE_REFERENCE_LONGITUDE', DEFAULT_REFERENCE[1]),
+    )
+
+
+def is_valid(code):
+    if not code or not isinstance(code, str):
+        return False
+    separator = code.find(SEPARATOR)
+    if code.count(SEPARATOR) != 1 or len(code) == 1:
+        return False
+    if separator > SEPARATOR_POSITION or separator % 2 == 1:
+        return False
+
+    padding = code.find(PADDING_CHARACTER)
+    if padding > -1:
+        # Padding only in full codes, not at the start, in even runs, before the separator
+        if separator < SEPARATOR_POSITION or padding == 0:
+            return False
+        runs = re.findall('0+', code)
+        if len(runs) > 1 or len(runs[0]) % 2 == 1 or len(runs[0]) > SEPARATOR_POSITION - 2:
+            return False
+        if code[-1] != SEPARATOR:
+            return False
+
+    # A single character after the separator is not allowed
+    if len(code) - separator - 1 == 1:
+        return False
+
+    return all(char in _DIGIT_VALUES or char in '+0' for char in code.upper())
+
+
+def is_short(code):
+    return is_valid(code) and 0 <= code.find(SEPARATOR) < SEPARATOR_POSITION
+
+
+def is_full(code):
+    if not is_valid(code) or is_short(code):
+        return False
+    code = code.upper()
+    # The first pair must be within range
+    if _DIGIT_VALUES[code[0]] * ENCODING_BASE >= LATITUDE_MAX * 2:
+        return False
+    if len(code) > 1 and _DIGIT_VALUES[code[1]] * ENCODING_BASE >= LONGITUDE_MAX * 2:
+        return False
+    return True
+
+
+def _clip_latitude(latitude):
+    return min(LATITUDE_MAX, max(-LATITUDE_MAX, latitude))
+
+
+def _normalize_longitude(longitude):
+    while longitude < -LONGITUDE_MAX:
+        longitude += LONGITUDE_MAX * 2
+    while longitude >= LONGITUDE_MAX:
+        longitude -= LONGITUDE_MAX * 2
+    return longitude
+
+
+def _latitude_precision(code_length):
+    if code_length <= PAIR_CODE_LENGTH:
+        return ENCODING_BASE ** math.floor(code_length / -2 + 2)
+    return ENCODING_BASE ** -3 / GRID_ROWS ** (code_length - PAIR_CODE_LENGTH)
+
+
+def encode(latitude, longitude, code_length=PAIR_CODE_LENGTH):
+    """Full plus code for a point (10 digits = ~14m, 11 = ~3m)"""
+    if code_length < 2 or (code_length < PAIR_CODE_LENGTH and code_length % 2 == 1):
+        raise ValueError(f'Invalid plus code length: {code_length}')
+    code_length = min(code_length, MAX_DIGIT_COUNT)
+    latitude = _clip_latitude(float(latitude))
+    longitude = _normalize_longitude(float(longitude))
+    if latitude == LATITUDE_MAX:
+        latitude -= _latitude_precision(code_length)
+
+    lat_value = int(round((latitude + LATITUDE_MAX) * FINAL_LAT_PRECISION, 6))
+    lng_value = int(round((longitude + LONGITUDE_MAX) * FINAL_LNG_PRECISION, 6))
+
+    digits = []
+    if code_length > PAIR_CODE_LENGTH:
+        for _ in range(GRID_CODE_LENGTH):
+            digits.append(CODE_ALPHABET[(lat_value % GRID_ROWS) * GRID_COLUMNS + lng_value % GRID_COLUMNS])
+            lat_value //= GRID_ROWS
+            lng_value //= GRID_COLUMNS
+    else:
+        lat_value //= GRID_ROWS ** GRID_CODE_LENGTH
+        lng_value //= GRID_COLUMNS ** GRID_CODE_LENGTH
+
+    for _ in range(PAIR_CODE_LENGTH // 2):
+        digits.append(CODE_ALPHABET[lng_value % ENCODING_BASE])
+        digits.append(CODE_ALPHABET[lat_value % ENCODING_BASE])
+        lat_value //= ENCODING_BASE
+        lng_value //= ENCODING_BASE
+
+    code = ''.join(reversed(digits))
+    code = code[:SEPARATOR_POSITION] + SEPARATOR + code[SEPARATOR_POSITION:]
+    if code_length >= SEPARATOR_POSITION:
+        return code[:code_length + 1]
+    return code[:code_length] + PADDING_CHARACTER * (SEPARATOR_POSITION - code_length) + SEPARATOR
+
+
+def decode(code):
+    """The area a full plus code covers"""
+    if not is_full(code):
+        raise ValueError(f'Not a valid full plus code: {code}')
+    code = re.sub('[+0]', '', code.upper())[:MAX_DIGIT_COUNT]
+
+    normal_lat = -LATITUDE_MAX * PAIR_PRECISION
+    normal_lng = -LONGITUDE_MAX * PAIR_PRECISION
+    grid_lat = grid_lng = 0
+
+    digits = min(len(code), PAIR_CODE_LENGTH)
+    place_value = PAIR_FIRST_PLACE_VALUE
+    for i in range(0, digits, 2):
+        normal_lat += _DIGIT_VALUES[code[i]] * place_value
+        normal_lng += _DIGIT_VALUES[code[i + 1]] * place_value
+        if i < digits - 2:
+            place_value //= ENCODING_BASE
+    lat_precision = lng_precision = place_value / PAIR_PRECISION
+
+    if len(code) > PAIR_CODE_LENGTH:
+        row_value, column_value = GRID_LAT_FIRST_PLACE_VALUE, GRID_LNG_FIRST_PLACE_VALUE
+        for i in range(PAIR_CODE_LENGTH, len(code)):
+            row, column = divmod(_DIGIT_VALUES[code[i]], GRID_COLUMNS)
+            grid_lat += row * row_value
+            grid_lng += column * column_value
+            if i < len(code) - 1:
+                row_value //= GRID_ROWS
+                column_value //= GRID_COLUMNS
+        lat_precision = row_value / FINAL_LAT_PRECISION
+        lng_precision = column_value / FINAL_LNG_PRECISION
+
+    latitude = normal_lat / PAIR_PRECISION + grid_lat / FINAL_LAT_PRECISION
+    longitude = normal_lng / PAIR_PRECISION + grid_lng / FINAL_LNG_PRECISION
+    return CodeArea(
+        round(latitude, 14), round(longitude, 14),
+        round(latitude + lat_precision, 14), round(longitude + lng_precision, 14),
+        len(code),
+    )
+
+
+def recover_nearest(code, reference_latitude=None, reference_longitude=None):
+    """Full code for a short code, taking the match closest to the reference point"""
+    if not is_short(code):
+        if is_full(code):
+            return code.upper()
+        raise ValueError(f'Not a valid plus code: {code}')
+
+    if reference_latitude is None or reference_longitude is None:
+        reference_latitude, reference_longitude = reference_point()
+    reference_latitude = _clip_latitude(reference_latitude)
+    reference_longitude = _normalize_longitude(reference_longitude)
+
+    code = code.upper()
+    padding_length = SEPARATOR_POSITION - code.find(SEPARATOR)
+    resolution = ENCODING_BASE ** (2 - padding_length / 2)
+    half_resolution = resolution / 2
+
+    area = decode(encode(reference_latitude, reference_longitude)[:padding_length] + code)
+    latitude, longitude = area.center
+
+    # The prefix cell may be the wrong neighbour of the reference point's cell
+    if reference_latitude + half_resolution < latitude and latitude - resolution >= -LATITUDE_MAX:
+        latitude -= resolution
+    elif reference_latitude - half_resolution > latitude and latitude + resolution <= LATITUDE_MAX:
+        latitude += resolution
+    if reference_longitude + half_resolution < longitude:
+        longitude -= resolution
+    elif reference_longitude - half_resolution > longitude:
+        longitude += resolution
+
+    return encode(latitude, longitude, area.code_length)
+
+
+def find_plus_code(text):
+    """The first plus code in free text, or None"""
+    match = PLUS_CODE_PATTERN.search(str(text or ''))
+    if match and is_valid(match.group(0)):
+        return match.group(0).upper()
+    return None
+
+
+def locate(text, reference=None):
+    """
+    ``(full_code, latitude, longitude)`` for the plus code in ``text`` (short
+    codes recovered near ``reference``), or None if there is none.
+    """
+    code = find_plus_code(text)
+    if code is None:
+        return None
+    if is_short(code):
+        code = recover_nearest(code, *(reference or reference_point()))
+    elif not is_full(code):
+        return None
+    latitude, longitude = decode(code).center
+    return code, latitude, longitude
+
+
+# Batch helpers for backfills (plain Python; each item is independent)
+
+def locate_many(texts, reference=None):
+    reference = reference or reference_point()
+    return [locate(text, reference) for text in texts]
+
+
+def encode_many(points, code_length=PAIR_CODE_LENGTH):
+    return [encode(latitude, longitude, code_length) for latitude, longitude in points]
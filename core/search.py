@@ -0,0 +1,100 @@
+"""
+Product and restaurant search.
+
+Every product and restaurant has a ``SearchDocument`` holding its lowercased
+name (``title``) and supporting text (``body``). Documents are rewritten when
+the product or restaurant is saved (core.signals). On PostgreSQL the document
+also carries a weighted ``tsvector`` with a GIN index, so a search is one
+indexed, ranked and limited query however large the catalog grows. Other
+databases (SQLite in tests and local development) fall back to substring
+matching on the compact document table with a simple rank.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import SearchDocument
+
+# Names mix Filipino, Maranao and English; don't stem, just split on words
+SEARCH_CONFIG = 'simple'
+SEARCH_RESULT_LIMIT = 10
+MAX_QUERY_TOKENS = 8
+
+
+def normalize_text(*parts):
+    return re.sub(r'\s+', ' ', ' '.join(str(part or '') for part in parts)).strip().lower()
+
+
+def search_tokens(query):
+    return re.findall(r'\w+', normalize_text(query))[:MAX_QUERY_TOKENS]
+
+
+def uses_search_vectors():
+    return connection.vendor == 'postgresql'
+
+
+def document_vector():
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('body', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def write_document(kind, object_id, title, body='', visible=True):
+    SearchDocument.objects.update_or_create(
+        kind=kind, object_id=object_id,
+        defaults={'title': normalize_text(title)[:255], 'body': normalize_text(body), 'visible': visible},
+    )
+    if uses_search_vectors():
+        SearchDocument.objects.filter(kind=kind, object_id=object_id).update(search_vector=document_vector())
+
+
+def index_product(product):
+    write_document(SearchDocument.PRODUCT, product.pk, product.name, product.description)
+
+
+def index_restaurant(restaurant):
+    write_document(
+        SearchDocument.RESTAURANT, restaurant.pk, restaurant.name,
+        f'{restaurant.barangay} {restaurant.address}', visible=restaurant.is_approved,
+    )
+
+
+def remove_document(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def search_documents(kind, query, limit=SEARCH_RESULT_LIMIT, exclude_titles=()):
+    """Ids of the best matching visible products or restaurants, best first"""
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+
+    documents = SearchDocument.objects.filter(kind=kind, visible=True)
+    if exclude_titles:
+        documents = documents.exclude(title__in=[normalize_text(title) for title in exclude_titles])
+
+    if uses_search_vectors():
+        # Every word must match, as a prefix so "chick" finds "chicken"
+        search_query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=SEARCH_CONFIG
+        )
+        documents = (
+            documents.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+        )
+    else:
+        phrase = ' '.join(tokens)
+        for token in tokens:
+            documents = documents.filter(Q(title__contains=token) | Q(body__contains=token))
+        documents = documents.annotate(rank=Case(
+            When(title__startswith=phrase, then=Value(3)),
+            When(title__contains=phrase, then=Value(2)),
+            When(title__contains=tokens[0], then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+    return list(documents.order_by('-rank', 'title', 'object_id').values_list('object_id', flat=True)[:limit])
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from menu.models import Product
+from restaurant.models import Restaurant
+
+from .models import SearchDocument
+from .search import index_product, index_restaurant, remove_document
+from .suggest import suggestion_index
+
+
+def update_suggestions(update, *args):
+    """Apply a change to this process's autocomplete index once it is committed"""
+    def apply():
+        update(*args)
+        suggestion_index.changed()
+    transaction.on_commit(apply, robust=True)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    """Keep the product's search document in step with its name and description"""
+    if not raw:
+        index_product(instance)
+        update_suggestions(suggestion_index.put_product, instance.pk, instance.name)
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, raw=False, **kwargs):
+    """Name, address or approval may have changed"""
+    if not raw:
+        index_restaurant(instance)
+        update_suggestions(
+            suggestion_index.put_restaurant, instance.pk, instance.name, instance.barangay, instance.is_approved
+        )
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    remove_document(SearchDocument.PRODUCT, instance.pk)
+    update_suggestions(suggestion_index.remove_product, instance.pk)
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_deleted(sender, instance, **kwargs):
+    remove_document(SearchDocument.RESTAURANT, instance.pk)
+    update_suggestions(suggestion_index.remove_restaurant, instance.pk)
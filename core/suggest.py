@@ -0,0 +1,373 @@
+"""
+Autocomplete for the customer search bar, served from memory.
+
+Each process keeps a prefix index over product names, approved restaurant
+names and their barangays: a sorted array of normalized words, each pointing
+at the entry it came from. A keystroke is a binary search plus a short scan,
+with no database access. The index is loaded on first use and kept current
+from Product/Restaurant signals (core.signals). Other processes learn about
+a change through a shared version in the cache, checked at most once per
+``SYNC_INTERVAL`` seconds, and reload.
+
+The distinct words also form a trigram vocabulary (core.fuzzy). Search falls
+back to it when a misspelled query finds nothing: each query word is
+corrected to nearby vocabulary words, and the sorted word array maps those
+back to products and restaurants.
+"""
+import heapq
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from django.core.cache import cache
+
+from .fuzzy import TrigramIndex
+from .search import normalize_text, search_tokens
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_VERSION_KEY = 'search:suggest_version'
+SUGGEST_LIMIT = 8
+# Per keystroke: matching entries ranked, and index positions looked at
+CANDIDATE_LIMIT = 100
+SCAN_LIMIT = 2000
+# Per misspelled search: index positions looked at when mapping corrections to names
+FUZZY_SCAN_LIMIT = 5000
+SYNC_INTERVAL = 1.0
+# Sorts after every word sharing a prefix
+WORD_END = '\U0010ffff'
+
+PRODUCT = 'product'
+RESTAURANT = 'restaurant'
+BARANGAY = 'barangay'
+# Restaurants and places first when labels tie
+KIND_ORDER = {RESTAURANT: 0, BARANGAY: 1, PRODUCT: 2}
+
+
+class SuggestionIndex:
+    def __init__(self, loader=None):
+        self.loader = loader
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._words = []  # sorted normalized words
+        self._keys = []  # entry key for each word, same order
+        self._entries = {}  # (kind, id) -> (label, words, normalized label)
+        self._barangays = Counter()  # barangay -> approved restaurants in it
+        self._restaurant_barangays = {}  # restaurant id -> its barangay
+        self._vocabulary = TrigramIndex()  # distinct words, for typo-tolerant search
+        self._loaded = False
+        self._version = None
+        self._checked_at = 0.0
+        self.builds = 0
+        self.queries = 0
+        self.fuzzy_queries = 0
+
+    # Building
+
+    def load(self, products=(), restaurants=()):
+        """
+        Replace the contents with ``products`` as ``(id, name)`` and approved
+        ``restaurants`` as ``(id, name, barangay)``.
+        """
+        pairs = []
+        entries = {}
+        barangays = Counter()
+        restaurant_barangays = {}
+
+        def collect(key, label):
+            entry = make_entry(label)
+            if entry is not None:
+                entries[key] = entry
+                pairs.extend((word, key) for word in entry[1])
+
+        for product_id, name in products:
+            collect((PRODUCT, product_id), name)
+        for restaurant_id, name, barangay in restaurants:
+            collect((RESTAURANT, restaurant_id), name)
+            barangay = (barangay or '').strip()
+            if barangay:
+                restaurant_barangays[restaurant_id] = barangay
+                barangays[barangay] += 1
+        for barangay in barangays:
+            collect((BARANGAY, barangay), barangay)
+
+        pairs.sort()
+        words = [word for word, _ in pairs]
+        vocabulary = TrigramIndex(set(words))
+        with self._lock:
+            self._words = words
+            self._keys = [key for _, key in pairs]
+            self._vocabulary = vocabulary
+            self._entries = entries
+            self._barangays = barangays
+            self._restaurant_barangays = restaurant_barangays
+            self._loaded = True
+            self.builds += 1
+
+    def ensure_loaded(self):
+        """Load from the database on first use, or when another process changed the catalog"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < SYNC_INTERVAL:
+            return
+        self._checked_at = now
+        version = cache.get_or_set(SUGGEST_VERSION_KEY, 0, timeout=None)
+        if self._loaded and version == self._version:
+            return
+        if self.loader is None or not self._load_lock.acquire(blocking=not self._loaded):
+            # Someone else is reloading; keep answering from what we have
+            return
+
+        try:
+            started = time.perf_counter()
+            products, restaurants = self.loader()
+            self.load(products, restaurants)
+            self._version = version
+        finally:
+            self._load_lock.release()
+        logger.info(
+            f"Loaded search suggestions: {len(self._entries)} entries, {len(self._words)} words "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    # Incremental updates
+
+    def _put(self, key, label):
+        self._drop(key)
+        entry = make_entry(label)
+        if entry is None:
+            return
+        self._entries[key] = entry
+        for word in entry[1]:
+            position = bisect_left(self._words, word)
+            self._words.insert(position, word)
+            self._keys.insert(position, key)
+            self._vocabulary.add(word)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for word in entry[1]:
+            position = bisect_left(self._words, word)
+            while position < len(self._words) and self._words[position] == word:
+                if self._keys[position] == key:
+                    del self._words[position]
+                    del self._keys[position]
+                    break
+                position += 1
+            position = bisect_left(self._words, word)
+            if position == len(self._words) or self._words[position] != word:
+                self._vocabulary.remove(word)
+
+    def _set_barangay(self, restaurant_id, barangay):
+        old = self._restaurant_barangays.pop(restaurant_id, None)
+        if old:
+            self._barangays[old] -= 1
+            if self._barangays[old] <= 0:
+                del self._barangays[old]
+                self._drop((BARANGAY, old))
+        if barangay:
+            self._restaurant_barangays[restaurant_id] = barangay
+            self._barangays[barangay] += 1
+            if self._barangays[barangay] == 1:
+                self._put((BARANGAY, barangay), barangay)
+
+    def put_product(self, product_id, name):
+        with self._lock:
+            if self._loaded:
+                self._put((PRODUCT, product_id), name)
+
+    def remove_product(self, product_id):
+        with self._lock:
+            if self._loaded:
+                self._drop((PRODUCT, product_id))
+
+    def put_restaurant(self, restaurant_id, name, barangay, approved=True):
+        with self._lock:
+            if not self._loaded:
+                return
+            if approved:
+                self._put((RESTAURANT, restaurant_id), name)
+                self._set_barangay(restaurant_id, (barangay or '').strip())
+            else:
+                self.remove_restaurant(restaurant_id)
+
+    def remove_restaurant(self, restaurant_id):
+        with self._lock:
+            if self._loaded:
+                self._drop((RESTAURANT, restaurant_id))
+                self._set_barangay(restaurant_id, '')
+
+    def changed(self):
+        """Tell other processes to reload (this one is already up to date)"""
+        cache.add(SUGGEST_VERSION_KEY, 0, timeout=None)
+        try:
+            version = cache.incr(SUGGEST_VERSION_KEY)
+        except ValueError:
+            version = None
+            cache.set(SUGGEST_VERSION_KEY, 1, timeout=None)
+        with self._lock:
+            # Only skip our own reload if we hadn't missed anyone else's change
+            if version is not None and self._version is not None and version == self._version + 1:
+                self._version = version
+
+    # Lookups
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        """``[{'type', 'id', 'label'}]`` for entries with a word starting with each query word"""
+        self.ensure_loaded()
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        phrase = ' ' + ' '.join(tokens)
+
+        with self._lock:
+            self.queries += 1
+            words, keys, entries = self._words, self._keys, self._entries
+            # Walk the narrowest word range; the other words are checked per entry
+            # as " word" inside the entry's normalized label (a word-prefix match)
+            ranges = sorted(
+                (bisect_left(words, token + WORD_END) - bisect_left(words, token), token) for token in tokens
+            )
+            driver = ranges[0][1]
+            others = [' ' + token for _, token in ranges[1:]]
+
+            candidates = {}
+            position = bisect_left(words, driver)
+            end = min(position + ranges[0][0], position + SCAN_LIMIT)
+            for key in keys[position:end]:
+                entry = entries[key]
+                for token in others:
+                    if token not in entry[2]:
+                        break
+                else:
+                    candidates[key] = entry
+                    if len(candidates) >= CANDIDATE_LIMIT:
+                        break
+
+        ranked = heapq.nsmallest(limit, candidates.items(), key=lambda item: (
+            not item[1][2].startswith(phrase), KIND_ORDER[item[0][0]], len(item[1][0]), item[1][0],
+        ))
+        return [
+            {'type': kind, 'id': None if kind == BARANGAY else object_id, 'label': entry[0]}
+            for (kind, object_id), entry in ranked
+        ]
+
+    def fuzzy_search(self, kind, query, limit, budget, exclude_titles=()):
+        """
+        ``[(id, edits)]`` of ``kind`` ('product' or 'restaurant') with a word
+        near each query word, fewest typos first; ``edits`` is 0 when no word
+        had to be corrected. Names in ``exclude_titles`` are left out, as in
+        ``search_documents``. Gives up on further corrections after
+        ``budget`` seconds and ranks what it has.
+        """
+        self.ensure_loaded()
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        deadline = time.perf_counter() + budget
+        phrase = ' ' + ' '.join(tokens)
+        excluded = {normalize_text(title) for title in exclude_titles}
+
+        with self._lock:
+            self.fuzzy_queries += 1
+            words, keys, entries = self._words, self._keys, self._entries
+            # word -> edits, for each query word
+            corrections = [dict(self._vocabulary.similar(token, deadline)) for token in tokens]
+            if not all(corrections):
+                return []
+
+            # Collect names from the query word matching the fewest index
+            # positions; the other corrections are checked per name
+            def positions(correction):
+                return sum(bisect_right(words, word) - bisect_left(words, word) for word in correction)
+
+            corrections.sort(key=positions)
+            driver, others = corrections[0], corrections[1:]
+            matches = []
+            read = 0
+            # Closest corrections first, so a cut-off scan keeps the best names
+            for word, edits in driver.items():
+                start = bisect_left(words, word)
+                end = min(bisect_right(words, word), start + FUZZY_SCAN_LIMIT - read)
+                read += end - start
+                for key in keys[start:end]:
+                    if key[0] != kind or (excluded and normalize_text(entries[key][0]) in excluded):
+                        continue
+                    total = edits
+                    for correction in others:
+                        best = min((correction[w] for w in entries[key][1] if w in correction), default=None)
+                        if best is None:
+                            break
+                        total += best
+                    else:
+                        matches.append((total, key))
+                if read >= FUZZY_SCAN_LIMIT or time.perf_counter() > deadline:
+                    break
+
+            # A name can come up once per matching word; keep its best
+            best_by_key = {}
+            for total, key in matches:
+                if total < best_by_key.get(key, total + 1):
+                    best_by_key[key] = total
+            ranked = heapq.nsmallest(limit, best_by_key.items(), key=lambda item: (
+                item[1], not entries[item[0]][2].startswith(phrase), len(entries[item[0]][0]), item[0][1],
+            ))
+        return [(key[1], total) for key, total in ranked]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'entries': len(self._entries),
+                'words': len(self._words),
+                'memory_bytes': self.memory_bytes(),
+                'builds': self.builds,
+                'vocabulary': len(self._vocabulary),
+                'queries': self.queries,
+                'fuzzy_queries': self.fuzzy_queries,
+            }
+
+    def memory_bytes(self):
+        """Approximate size of the index structures (strings counted once per object)"""
+        with self._lock:
+            seen = set()
+
+            def size(obj):
+                if id(obj) in seen:
+                    return 0
+                seen.add(id(obj))
+                return sys.getsizeof(obj)
+
+            total = size(self._words) + size(self._keys) + size(self._entries) + size(self._barangays)
+            total += sum(size(word) for word in self._words)
+            for key, (label, words, normalized) in self._entries.items():
+                total += size(key) + size(key[1]) + size(label) + size(words) + size(normalized)
+                total += sum(size(word) for word in words)
+            total += self._vocabulary.memory_bytes(size)
+            return total
+
+
+def make_entry(label):
+    """``(label, distinct words, normalized label)``, or None if there are no words"""
+    tokens = search_tokens(label)
+    if not tokens:
+        return None
+    # Leading space so " chick" matches at the start of any word
+    return label, tuple(sorted(set(tokens))), ' ' + ' '.join(tokens)
+
+
+def load_catalog():
+    from menu.models import Product
+    from restaurant.models import Restaurant
+
+    products = Product.objects.values_list('id', 'name').iterator()
+    restaurants = Restaurant.objects.filter(is_approved=True).values_list('id', 'name', 'barangay').iterator()
+    return products, restaurants
+
+
+# Shared per-process index
+suggestion_index = SuggestionIndex(loader=load_catalog)
@@ -1,3 +1,332 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from customer.models import Address
+from menu.models import Product
+from restaurant.models import Restaurant
+from users.models import User
+
+from . import olc
+from .models import SearchDocument
+from .search import search_documents
+from .suggest import SuggestionIndex, load_catalog
+
+
+def geocoder_response(latitude, longitude, plus_code=''):
+    response = mock.Mock(ok=True)
+    response.json.return_value = {
+        'status': 'OK',
+        'results': [{
+            'geometry': {'location': {'lat': latitude, 'lng': longitude}},
+            'plus_code': {'global_code': plus_code},
+        }],
+    }
+    return response
+
+
+@override_settings(GOOGLE_MAPS_API_KEY='test-key')
+class GeocodedLocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='customer', role='customer')
+
+    def setUp(self):
+        # Geocoder results are cached by address
+        cache.clear()
+        patcher = mock.patch('core.geocoding.requests.get', return_value=geocoder_response(8.0012, 124.2851))
+        self.http_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_address_is_geocoded_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            address = Address.objects.create(user=self.user, street='Pacasum Street', barangay='Basak', label='home')
+            # Nothing goes out while the save's transaction is open
+            self.http_get.assert_not_called()
+
+        self.assertEqual(self.http_get.call_count, 1)
+        address.refresh_from_db()
+        self.assertEqual(address.latitude, Decimal('8.0012000'))
+        self.assertEqual(address.longitude, Decimal('124.2851000'))
+        self.assertTrue(address.plus_code)
+
+    def test_update_fields_save_writes_the_resolved_location(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            address = Address.objects.create(user=self.user, street='Pacasum Street', barangay='Basak', label='home')
+
+        address = Address.objects.get(pk=address.pk)
+        address.street = 'X7Q3+FF Marawi City'
+        with self.captureOnCommitCallbacks(execute=True):
+            address.save(update_fields=['street'])
+
+        address.refresh_from_db()
+        self.assertEqual(address.plus_code, '6QV6X7Q3+FF')
+        self.assertAlmostEqual(float(address.latitude), 7.9886875, places=6)
+        # Decoded locally; only the first address went to the geocoder
+        self.assertEqual(self.http_get.call_count, 1)
+
+    def test_same_address_is_looked_up_once(self):
+        other = User.objects.create(username='neighbour', role='customer')
+        with self.captureOnCommitCallbacks(execute=True):
+            Address.objects.create(user=self.user, street='Pacasum Street', barangay='Basak', label='home')
+            Address.objects.create(user=other, street='pacasum  street', barangay='BASAK', label='home')
+
+        self.assertEqual(self.http_get.call_count, 1)
+        self.assertEqual(Address.objects.filter(latitude__isnull=False).count(), 2)
+
+    def test_unchanged_address_is_not_looked_up_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            address = Address.objects.create(user=self.user, street='Pacasum Street', barangay='Basak', label='home')
+
+        address = Address.objects.get(pk=address.pk)
+        address.note = 'Blue gate'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            address.save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.http_get.call_count, 1)
+
+
+class OpenLocationCodeTests(SimpleTestCase):
+    # From the Open Location Code reference test data (encoding, decoding, shortCodeTests)
+    ENCODING = [
+        (20.375, 2.775, 6, '7FG49Q00+'),
+        (20.3700625, 2.7821875, 10, '7FG49QCJ+2V'),
+        (20.3701125, 2.782234375, 11, '7FG49QCJ+2VX'),
+        (20.3701135, 2.78223535156, 13, '7FG49QCJ+2VXGJ'),
+        (47.0000625, 8.0000625, 10, '8FVC2222+22'),
+        (-41.2730625, 174.7859375, 10, '4VCPPQGP+Q9'),
+        (0.5, -179.5, 4, '62G20000+'),
+        (-89.5, -179.5, 4, '22220000+'),
+        (20.5, 2.5, 4, '7FG40000+'),
+        (-89.9999375, -179.9999375, 10, '22222222+22'),
+        (0.5, 179.5, 4, '6VGX0000+'),
+        (1, 1, 11, '6FH32222+222'),
+        (90, 1, 4, 'CFX30000+'),
+        (92, 1, 4, 'CFX30000+'),
+        (1, 180, 4, '62H20000+'),
+        (1, 181, 4, '62H30000+'),
+    ]
+    DECODING = [
+        ('7FG49Q00+', 6, 20.35, 2.75, 20.4, 2.8),
+        ('7FG49QCJ+2V', 10, 20.37, 2.782125, 20.370125, 2.78225),
+        ('8FVC2222+22', 10, 47.0, 8.0, 47.000125, 8.000125),
+    ]
+    RECOVERY = [
+        ('9G8F+6X', 47.4, 8.6, '8FVC9G8F+6X'),
+        ('CJ+2VX', 51.3708675, -1.217765625, '9C3W9QCJ+2VX'),
+        # Next to the poles the prefix cell can't move past them
+        ('2222+22', 89.6, 0.0, 'CFX22222+22'),
+        ('XXXXXX+XX', -81.0, 0.0, '2CXXXXXX+XX'),
+    ]
+
+    def test_encode(self):
+        for latitude, longitude, length, code in self.ENCODING:
+            with self.subTest(code=code):
+                self.assertEqual(olc.encode(latitude, longitude, length), code)
+
+    def test_decode(self):
+        for code, length, lat_lo, lng_lo, lat_hi, lng_hi in self.DECODING:
+            with self.subTest(code=code):
+                area = olc.decode(code)
+                self.assertEqual(area.code_length, length)
+                for got, expected in zip(
+                    (area.latitude_lo, area.longitude_lo, area.latitude_hi, area.longitude_hi),
+                    (lat_lo, lng_lo, lat_hi, lng_hi),
+                ):
+                    self.assertAlmostEqual(got, expected, places=10)
+
+    def test_recover_nearest(self):
+        for code, latitude, longitude, full in self.RECOVERY:
+            with self.subTest(code=code):
+                self.assertEqual(olc.recover_nearest(code, latitude, longitude), full)
+
+    def test_validity(self):
+        self.assertTrue(olc.is_full('8FWC2345+G6'))
+        self.assertTrue(olc.is_short('2345+G6'))
+        self.assertFalse(olc.is_valid('8FWC2345+G'))
+        self.assertFalse(olc.is_valid('8FWC2_45+G6'))
+        self.assertFalse(olc.is_full('2345+G6'))
+
+    def test_locate_in_free_text(self):
+        # Short codes are recovered near the configured reference point (Marawi City)
+        code, latitude, longitude = olc.locate('X7Q3+FF Marawi City, Lanao del Sur')
+        self.assertEqual(code, '6QV6X7Q3+FF')
+        self.assertAlmostEqual(latitude, 7.9886875, places=10)
+        self.assertAlmostEqual(longitude, 124.2536875, places=10)
+        self.assertIsNone(olc.locate('Pacasum Street, Basak'))
+
+
+def create_catalog(cls):
+    """Restaurants and products shared by the search tests, as class attributes"""
+    owner = User.objects.create(username='bahay', role='restaurant')
+    cls.bahay = Restaurant.objects.create(
+        user=owner, name='Lutong Bahay', address='Rizal Street', barangay='Poblacion', phone='1', is_approved=True
+    )
+    owner = User.objects.create(username='pending', role='restaurant')
+    cls.unapproved = Restaurant.objects.create(
+        user=owner, name='Chicken House', address='Pacasum Street', barangay='Basak', phone='2'
+    )
+    cls.inasal = Product.objects.create(restaurant=cls.bahay, name='Chicken Inasal', price='120.00')
+    cls.fried = Product.objects.create(restaurant=cls.bahay, name='Fried Chicken', price='99.00')
+    cls.pancit = Product.objects.create(
+        restaurant=cls.bahay, name='Pancit Canton', description='Noodles with chicken', price='85.00'
+    )
+    # Same name as its restaurant, a common data-entry mistake
+    cls.namesake = Product.objects.create(restaurant=cls.bahay, name='Lutong Bahay', price='150.00')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(cls)
+
+    def setUp(self):
+        # The view falls back to the autocomplete index; give it one built from this test's data
+        patcher = mock.patch('core.views.suggestion_index', SuggestionIndex(loader=load_catalog))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(
+            search_documents(SearchDocument.PRODUCT, 'Chicken'),
+            [self.inasal.id, self.fried.id, self.pancit.id],
+        )
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'chicken', limit=1), [self.inasal.id])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'fried  CHICKEN!'), [self.fried.id])
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'fried noodles'), [])
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, '  '), [])
+
+    def test_unapproved_restaurants_are_hidden_until_approved(self):
+        self.assertEqual(search_documents(SearchDocument.RESTAURANT, 'chicken'), [])
+        self.unapproved.is_approved = True
+        self.unapproved.save()
+        self.assertEqual(search_documents(SearchDocument.RESTAURANT, 'chicken'), [self.unapproved.id])
+
+    def test_excluded_titles(self):
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'bahay'), [self.namesake.id])
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'bahay', exclude_titles=['Lutong  Bahay']), [])
+
+    def test_renamed_product_is_reindexed(self):
+        self.pancit.name = 'Pancit Bihon'
+        self.pancit.save()
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'bihon'), [self.pancit.id])
+        self.assertEqual(search_documents(SearchDocument.PRODUCT, 'canton'), [])
+
+    def test_search_view(self):
+        data = self.client.get(reverse('core:search_products_and_restaurants'), {'q': 'bahay'}).json()
+        self.assertEqual([restaurant['name'] for restaurant in data['restaurants']], ['Lutong Bahay'])
+        # The product named like the matched restaurant is left out
+        self.assertEqual(data['products'], [])
+
+        data = self.client.get(reverse('core:search_products_and_restaurants'), {'q': 'chicken'}).json()
+        self.assertEqual(
+            [(product['name'], product['restaurant_name']) for product in data['products']],
+            [('Chicken Inasal', 'Lutong Bahay'), ('Fried Chicken', 'Lutong Bahay'), ('Pancit Canton', 'Lutong Bahay')],
+        )
+
+
+class SearchSuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.index = SuggestionIndex(loader=load_catalog)
+        patcher = mock.patch('core.views.suggestion_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggest(self, query, **params):
+        response = self.client.get(reverse('core:search_suggest'), {'q': query, **params})
+        return [(entry['type'], entry['id'], entry['label']) for entry in response.json()['suggestions']]
+
+    def test_word_prefixes(self):
+        # Names starting with the query first, then any word starting with it
+        self.assertEqual(self.suggest('chi'), [
+            ('product', self.inasal.id, 'Chicken Inasal'),
+            ('product', self.fried.id, 'Fried Chicken'),
+        ])
+        self.assertEqual(self.suggest('chick fri'), [('product', self.fried.id, 'Fried Chicken')])
+        self.assertEqual(self.suggest('pob'), [('barangay', None, 'Poblacion')])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_restaurants_come_before_products(self):
+        self.assertEqual(self.suggest('lutong', limit=1), [('restaurant', self.bahay.id, 'Lutong Bahay')])
+        self.assertEqual(self.suggest('lutong'), [
+            ('restaurant', self.bahay.id, 'Lutong Bahay'),
+            ('product', self.namesake.id, 'Lutong Bahay'),
+        ])
+
+    def test_keystrokes_do_not_query_the_database(self):
+        self.suggest('c')
+        with self.assertNumQueries(0):
+            for prefix in ('ch', 'chi', 'chic', 'chick'):
+                self.assertTrue(self.suggest(prefix))
+
+    def test_committed_changes_reach_the_index(self):
+        self.suggest('c')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unapproved.is_approved = True
+            self.unapproved.save()
+            self.fried.delete()
+
+        # The signals update the shared index; this one reloads on the version bump
+        with mock.patch('core.suggest.SYNC_INTERVAL', 0):
+            self.assertEqual(self.suggest('chi'), [
+                ('restaurant', self.unapproved.id, 'Chicken House'),
+                ('product', self.inasal.id, 'Chicken Inasal'),
+            ])
+        self.assertEqual(self.suggest('bas'), [('barangay', None, 'Basak')])
+
+
+class FuzzySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.index = SuggestionIndex(loader=load_catalog)
+        patcher = mock.patch('core.views.suggestion_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, query):
+        return self.client.get(reverse('core:search_products_and_restaurants'), {'q': query}).json()
+
+    def test_misspelled_query_falls_back_to_similar_names(self):
+        data = self.search('chiken')
+        self.assertEqual([product['name'] for product in data['products']], ['Fried Chicken', 'Chicken Inasal'])
+        self.assertEqual(data['restaurants'], [])
+        self.assertTrue(data['fuzzy'])
+
+    def test_exact_matches_are_not_flagged(self):
+        data = self.search('chicken')
+        self.assertEqual(len(data['products']), 3)
+        self.assertFalse(data['fuzzy'])
+
+    def test_fallback_leaves_out_products_named_like_a_matched_restaurant(self):
+        data = self.search('lutong bahy')
+        self.assertEqual([restaurant['name'] for restaurant in data['restaurants']], ['Lutong Bahay'])
+        self.assertEqual(data['products'], [])
+        self.assertTrue(data['fuzzy'])
+
+    def test_edits_are_summed_over_the_query_words(self):
+        self.assertEqual(
+            self.index.fuzzy_search(SearchDocument.PRODUCT, 'chiken inasal', 10, 1), [(self.inasal.id, 1)]
+        )
+        self.assertEqual(
+            self.index.fuzzy_search(SearchDocument.PRODUCT, 'fried chicken', 10, 1), [(self.fried.id, 0)]
+        )
+        self.assertEqual(
+            self.index.fuzzy_search(SearchDocument.PRODUCT, 'lutong bahay', 10, 1, exclude_titles=['Lutong Bahay']),
+            [],
+        )
+        # Every query word needs a correction within reach
+        self.assertEqual(self.index.fuzzy_search(SearchDocument.PRODUCT, 'chiken xyzzy', 10, 1), [])
@@ -25,6 +25,7 @@ urlpatterns = [
     path('getOrderStatus/<int:order_id>/', views.get_order_status, name='get_order_status'),
     path('getCustomerOrders/', views.get_customer_orders, name='get_customer_orders'),
     path('search/', views.search_products_and_restaurants, name='search_products_and_restaurants'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('dashboard/', views.dashboard, name='dashboard'),
     
     # Stripe Payment Integration URLs
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0004_address_latitude_address_longitude'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='plus_code',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -2,6 +2,8 @@
 from django.conf import settings
 from django.db import models
 
+from core.geocoding import GeocodedLocationMixin
+
 class Customer(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     address = models.TextField()
@@ -11,7 +13,7 @@ class Customer(models.Model):
         return self.user.username
     
 
-class Address(models.Model):
+class Address(GeocodedLocationMixin, models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     street = models.CharField(max_length=255)
     barangay = models.CharField(max_length=255)
@@ -19,6 +21,13 @@ class Address(models.Model):
     label = models.CharField(max_length=50, choices=[('home', 'Home'), ('work', 'Work'), ('partner', 'Partner'), ('other', 'Other')])
     latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    plus_code = models.CharField(max_length=20, blank=True, default='')
+
+    # latitude/longitude/plus_code are resolved from these when they change
+    location_fields = ('street', 'barangay')
 
     def __str__(self):
+        return f'{self.street}, {self.barangay}'
+
+    def location_query(self):
         return f'{self.street}, {self.barangay}'
\ No newline at end of file
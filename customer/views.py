@@ -10,6 +10,7 @@ from django.contrib import messages
 from django.http import JsonResponse
 from menu.models import CartItem
 from orders.models import Order, OrderLine
+from orders.placement import place_cart_order
 from django.shortcuts import get_object_or_404
 from django.db.models import Sum
 import logging
@@ -116,54 +117,23 @@ def finalize_order(request):
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method')
 
-        cart_items = CartItem.objects.filter(user=request.user)
-
-        if not cart_items.exists():
-            messages.error(request, 'Your cart is empty.')
-            return redirect('checkout')
-
-        # Assume all items are from the same restaurant
-        restaurant = cart_items.first().restaurant
-
-        # Calculate total amount
-        total = sum(item.subtotal() for item in cart_items)
-        rider_fee = 39  # You can set logic here if needed
-        small_order_fee = 29 if total < 200 else 0  # Example: apply small order fee if total < 200
-
-        # Debugging: Print order calculation details
-        print(f"Total amount before fees: {total}, Rider fee: {rider_fee}, Small order fee: {small_order_fee}")
-        print(f"Restaurant selected: {restaurant.name}")
+        def fees(total):
+            rider_fee = 39  # You can set logic here if needed
+            small_order_fee = 29 if total < 200 else 0  # Example: apply small order fee if total < 200
+            logger.debug(f"Total amount before fees: {total}, Rider fee: {rider_fee}, Small order fee: {small_order_fee}")
+            return {'rider_fee': rider_fee, 'small_order_fee': small_order_fee}
 
         # Begin the Order creation process
         try:
-            # Create the Order
-            order = Order.objects.create(
-                customer=request.user,
-                restaurant=restaurant.user,  # Ensure this is the correct User linked to the Restaurant
-                total_amount=total + rider_fee + small_order_fee,
-                rider_fee=rider_fee,
-                small_order_fee=small_order_fee,
-                payment_method=payment_method,
-                status='pending',
-            )
-
-            # Debugging: Print the order details
-            print(f"Order created: {order}, Payment method: {payment_method}")
-
-            # Create OrderLine entries
-            for item in cart_items:
-                OrderLine.objects.create(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    subtotal=item.subtotal(),
-                )
-
-            # Clear the cart after order is successfully created
-            cart_items.delete()
-
-            # Debugging: Print the cart items that were cleared
-            print(f"Cart items cleared: {cart_items}")
+            # Order, lines and cart clean-up commit together; notifications go out after.
+            # Assume all items are from the same restaurant.
+            order = place_cart_order(request.user, pricing=fees, payment_method=payment_method)
+
+            if order is None:
+                messages.error(request, 'Your cart is empty.')
+                return redirect('checkout')
+
+            logger.debug(f"Order created: {order}, Payment method: {payment_method}")
 
             messages.success(request, f'Order placed successfully with {payment_method}!')
             return redirect('order_complete', order_id=order.id)
@@ -0,0 +1,122 @@
+"""
+Cached restaurant menus.
+
+Each restaurant's menu has a version, bumped whenever one of its products is
+saved or deleted (menu.signals). The product rows are loaded once per version,
+as plain dicts, and shared by the web storefront and /getRestaurantProducts/;
+encoded JSON pages are cached per version too. ETags are derived from the version, so
+revalidating an unchanged menu is one cache read and an empty 304.
+"""
+import hashlib
+import json
+import logging
+import time
+from functools import partial
+
+from django.core.cache import cache
+
+from restaurant.listing import picture_url
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+MENU_VERSION_KEY = 'menu:version:{restaurant_id}'
+MENU_PRODUCTS_KEY = 'menu:products:{restaurant_id}:{version}'
+MENU_PAGE_KEY = 'menu:page:{restaurant_id}:{version}:{variant}'
+# Entries for old versions are never read again; let them expire
+MENU_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+MENU_MAX_PAGE_SIZE = 200
+
+
+def _initial_version():
+    # Clock-based, so a version lost with the cache is never reused with other content
+    return int(time.time() * 1000)
+
+
+def menu_version(restaurant_id):
+    return cache.get_or_set(MENU_VERSION_KEY.format(restaurant_id=restaurant_id), _initial_version, timeout=None)
+
+
+def bump_menu_version(restaurant_id):
+    """Mark a restaurant's cached menu stale"""
+    key = MENU_VERSION_KEY.format(restaurant_id=restaurant_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def _load_products(restaurant_id):
+    return list(
+        Product.objects.filter(restaurant_id=restaurant_id).order_by('id').values(
+            'id', 'name', 'description', 'price', 'product_picture'
+        )
+    )
+
+
+def menu_products(restaurant_id, version=None):
+    """All of a restaurant's product rows, in id order, loaded once per menu version"""
+    if version is None:
+        version = menu_version(restaurant_id)
+    return cache.get_or_set(
+        MENU_PRODUCTS_KEY.format(restaurant_id=restaurant_id, version=version),
+        partial(_load_products, restaurant_id),
+        timeout=MENU_SNAPSHOT_TIMEOUT,
+    )
+
+
+def product_entry(product, base_url):
+    """A row from menu_products as the apps and the storefront show it"""
+    field = Product._meta.get_field('product_picture')
+    return {
+        'id': product['id'],
+        'name': product['name'],
+        'description': product['description'],
+        'price': str(product['price']),
+        'product_picture': picture_url(field.attr_class(None, field, product['product_picture']), base_url),
+    }
+
+
+def _variant(base_url, limit, cursor):
+    host = hashlib.md5(base_url.encode()).hexdigest()[:12]
+    if limit is None:
+        return f'{host}-all'
+    return f'{host}-{limit}-{cursor or 0}'
+
+
+def menu_etag(restaurant_id, base_url, limit=None, cursor=None, version=None):
+    """ETag for one menu response, without building it"""
+    if version is None:
+        version = menu_version(restaurant_id)
+    return f'"menu-{restaurant_id}-{version}-{_variant(base_url, limit, cursor)}"'
+
+
+def menu_page(restaurant_id, base_url, limit=None, cursor=None, version=None):
+    """
+    Encoded JSON for /getRestaurantProducts/: the whole menu, or with
+    ``limit`` the products after the ``cursor`` id plus a ``next_cursor``.
+    """
+    if version is None:
+        version = menu_version(restaurant_id)
+    key = MENU_PAGE_KEY.format(
+        restaurant_id=restaurant_id, version=version, variant=_variant(base_url, limit, cursor)
+    )
+    body = cache.get(key)
+    if body is not None:
+        return body
+
+    products = menu_products(restaurant_id, version)
+    data = {'success': True}
+    if limit is None:
+        data['products'] = [product_entry(product, base_url) for product in products]
+    else:
+        after = [product for product in products if cursor is None or product['id'] > cursor]
+        page = after[:limit]
+        data['products'] = [product_entry(product, base_url) for product in page]
+        data['next_cursor'] = page[-1]['id'] if len(after) > limit else None
+
+    body = json.dumps(data).encode()
+    cache.set(key, body, timeout=MENU_SNAPSHOT_TIMEOUT)
+    return body
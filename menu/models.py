@@ -12,6 +12,13 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.name} ({self.restaurant.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The restaurant whose cached menu lists it (see menu.signals)
+        instance._loaded_restaurant_id = instance.__dict__.get('restaurant_id')
+        return instance
+
 
 class CartItem(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -0,0 +1,22 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_menu_version
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    """Rebuild the restaurant's cached menu once the change is committed"""
+    restaurant_ids = {instance.restaurant_id}
+    # A product moved to another restaurant also leaves the old one's menu
+    loaded_id = getattr(instance, '_loaded_restaurant_id', None)
+    if loaded_id is not None:
+        restaurant_ids.add(loaded_id)
+    instance._loaded_restaurant_id = instance.restaurant_id
+    for restaurant_id in restaurant_ids:
+        transaction.on_commit(partial(bump_menu_version, restaurant_id), robust=True)
@@ -1,3 +1,77 @@
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from restaurant.models import Restaurant
+from users.models import User
+
+from .catalog import menu_products
+from .models import Product
+
+
+class RestaurantMenuTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='resto', role='restaurant')
+        cls.restaurant = Restaurant.objects.create(user=user, name='Resto', address='a', barangay='Poblacion', phone='1')
+        cls.adobo = Product.objects.create(
+            restaurant=cls.restaurant, name='Adobo', price='129.00',
+            product_picture='https://res.cloudinary.com/demo/image/upload/adobo.jpg',
+        )
+        cls.sinigang = Product.objects.create(restaurant=cls.restaurant, name='Sinigang', price='149.50')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('core:get_restaurant_products', args=[self.restaurant.id])
+
+    def test_menu_is_served_from_the_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.json()['products'], [
+            {
+                'id': self.adobo.id, 'name': 'Adobo', 'description': '', 'price': '129.00',
+                'product_picture': 'https://res.cloudinary.com/demo/image/upload/adobo.jpg',
+            },
+            {
+                'id': self.sinigang.id, 'name': 'Sinigang', 'description': '', 'price': '149.50',
+                'product_picture': None,
+            },
+        ])
+
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url)
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+    def test_cached_rows_are_plain_values(self):
+        self.assertEqual(menu_products(self.restaurant.id)[0], {
+            'id': self.adobo.id, 'name': 'Adobo', 'description': '', 'price': Decimal('129.00'),
+            'product_picture': 'https://res.cloudinary.com/demo/image/upload/adobo.jpg',
+        })
+
+    def test_saved_product_changes_the_etag(self):
+        first = self.client.get(self.url)
+        self.adobo.price = '139.00'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.adobo.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['products'][0]['price'], '139.00')
+
+    def test_pages_follow_the_cursor(self):
+        page = self.client.get(self.url, {'limit': 1}).json()
+        self.assertEqual([product['name'] for product in page['products']], ['Adobo'])
+        self.assertEqual(page['next_cursor'], self.adobo.id)
+
+        page = self.client.get(self.url, {'limit': 1, 'cursor': page['next_cursor']}).json()
+        self.assertEqual([product['name'] for product in page['products']], ['Sinigang'])
+        self.assertIsNone(page['next_cursor'])
 
-# Create your tests here.
+    def test_storefront_lists_the_cached_menu(self):
+        response = self.client.get(reverse('restaurant:restaurant_detail', args=[self.restaurant.id]))
+        self.assertContains(response, 'src="https://res.cloudinary.com/demo/image/upload/adobo.jpg"')
+        self.assertContains(response, 'Sinigang')
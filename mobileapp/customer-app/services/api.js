@@ -1010,8 +1010,9 @@ export const apiService = {
     }
   },
 
-  // Get customer orders (active and recent)
-  getCustomerOrders: async (userId) => {
+  // Get customer orders (active and recent). Recent orders come a page at a time:
+  // pass the previous result's nextCursor to load older ones.
+  getCustomerOrders: async (userId, cursor = null) => {
     try {
       console.log('📦 Getting customer orders for user:', userId);
       
@@ -1038,7 +1039,7 @@ export const apiService = {
         },
       });
       
-      const response = await ordersApi.post('/getCustomerOrders/', { user_id: userId }, {
+      const response = await ordersApi.post('/getCustomerOrders/', { user_id: userId, cursor }, {
         headers: {
           'X-Requested-With': 'XMLHttpRequest',
         }
@@ -1051,6 +1052,7 @@ export const apiService = {
           success: true,
           activeOrders: response.data.active_orders || [],
           recentOrders: response.data.recent_orders || [],
+          nextCursor: response.data.next_cursor || null,
         };
       } else {
         return {
@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Order, OrderLine
+from .models import Order, OrderLine, OrderStatusTransition
 # Register your models here.
 admin.site.register(Order)
 admin.site.register(OrderLine)
+admin.site.register(OrderStatusTransition)
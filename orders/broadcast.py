@@ -0,0 +1,130 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .dispatch import notification_dispatcher
+from .zones import zone_area, zone_group
+
+logger = logging.getLogger(__name__)
+
+# Last count sent to a group, shared by every process sending to it
+LAST_SENT_KEY = 'orders:count_sent:{group}'
+
+
+class OrderCountBroadcaster:
+    """
+    Coalesces order changes into at most one ``order_count_update`` per
+    group per window.
+
+    The first change in a quiet period arms a timer; every change that lands
+    before it fires is folded into the same flush. The flush sends the
+    city-wide count to ``group`` and, for every zone touched in the window,
+    the area count to the riders of that zone and its neighbours. Each group
+    is only sent to when its value differs from the last one sent to it by
+    any process (kept in the cache, since every process sends to the same
+    channel-layer groups).
+    """
+
+    def __init__(self, group, count_func, area_count_func=None, window=None):
+        self.group = group
+        self.count_func = count_func
+        self.area_count_func = area_count_func
+        self._window = window
+        self._lock = threading.Lock()
+        self._timer = None
+        self._dirty_zones = set()
+        self._groups = set()
+        self.requested = 0
+        self.coalesced = 0
+        self.unchanged = 0
+        self.sent = 0
+
+    @property
+    def window(self):
+        if self._window is not None:
+            return self._window
+        return getattr(settings, 'ORDERS_BROADCAST_WINDOW_SECONDS', 0.25)
+
+    def schedule(self, zone=''):
+        """Record a change; the broadcast happens when the window closes."""
+        window = self.window
+        with self._lock:
+            self.requested += 1
+            if zone:
+                self._dirty_zones.add(zone)
+            if self._timer is not None:
+                self.coalesced += 1
+                return
+            if window > 0:
+                self._timer = threading.Timer(window, self._run_timer)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        # A zero window disables coalescing (useful in tests and scripts)
+        self.flush()
+
+    def _run_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads get their own DB connection; don't leak it
+            close_old_connections()
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            dirty_zones, self._dirty_zones = self._dirty_zones, set()
+
+        # Riders in any zone whose area includes a changed zone
+        affected_zones = set()
+        for zone in dirty_zones:
+            affected_zones |= zone_area(zone)
+
+        targets = [(self.group, None)]
+        if self.area_count_func is not None:
+            targets += [(zone_group(zone), zone) for zone in sorted(affected_zones)]
+
+        for group, zone in targets:
+            try:
+                count = self.count_func() if zone is None else self.area_count_func(zone_area(zone))
+            except Exception as e:
+                logger.error(f"Order count broadcast failed for {group}: {e}")
+                continue
+
+            key = LAST_SENT_KEY.format(group=group)
+            if cache.get(key) == count:
+                with self._lock:
+                    self.unchanged += 1
+                continue
+            cache.set(key, count, timeout=None)
+            with self._lock:
+                self._groups.add(group)
+                self.sent += 1
+
+            self.send(group, count)
+
+    def send(self, group, count):
+        logger.info(f"Notifying riders via WebSocket ({group}): {count} orders available")
+        notification_dispatcher.group_send(
+            group,
+            {
+                'type': 'order_count_update',
+                'count': count,
+                'message': f'{count} orders available for pickup'
+            }
+        )
+
+    def stats(self):
+        return {
+            'window_seconds': self.window,
+            'requested': self.requested,
+            'coalesced': self.coalesced,
+            'unchanged': self.unchanged,
+            'suppressed': self.coalesced + self.unchanged,
+            'sent': self.sent,
+            'last_count': cache.get(LAST_SENT_KEY.format(group=self.group)),
+            'groups': len(self._groups),
+        }
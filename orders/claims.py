@@ -0,0 +1,57 @@
+"""
+Riders claiming orders from the pickup pool.
+
+A claim is one conditional UPDATE that sets the rider and the status
+together: it only matches while the order has no rider and is still in a
+pickable status, so when several riders accept the same order at once the
+database picks exactly one winner, and a kitchen moving the order between
+pickable statuses doesn't make the claim miss. The winner's history row is
+a single INSERT that takes the status it replaced from the order's history
+(orders.transitions). Only a rider who loses reads the order, to get an
+explicit reason instead of silently overwriting the winner.
+"""
+import logging
+
+from django.db import transaction
+
+from .counters import AVAILABLE_STATUSES
+from .models import Order
+from .transitions import NOT_FOUND, record_transition
+
+logger = logging.getLogger(__name__)
+
+# Claim outcomes
+CLAIMED = 'claimed'
+ALREADY_YOURS = 'already_yours'  # a retried accept from the winner
+TAKEN = 'taken'
+NOT_CLAIMABLE = 'not_claimable'  # e.g. cancelled before anyone accepted it
+
+CLAIMED_STATUS = 'assigned'
+
+
+def claim_order(order_id, rider_user):
+    """Try to assign an order to a rider; returns one of the outcomes above."""
+    with transaction.atomic():
+        claimed = Order.objects.filter(
+            pk=order_id, status__in=AVAILABLE_STATUSES, rider__isnull=True
+        ).update(rider=rider_user, status=CLAIMED_STATUS)
+        if claimed:
+            # The status it was claimed from comes from the order's history, inside the INSERT
+            record_transition(order_id, None, CLAIMED_STATUS, rider_user, rider_assigned=True)
+
+    if claimed:
+        logger.info(f"Order {order_id} claimed by rider {rider_user.id}")
+        return CLAIMED
+    return _claim_lost(order_id, rider_user)
+
+
+def _claim_lost(order_id, rider_user):
+    """Why the claim didn't match"""
+    current = Order.objects.filter(pk=order_id).values('rider_id', 'status').first()
+    if current is None:
+        return NOT_FOUND
+    if current['rider_id'] == rider_user.id:
+        return ALREADY_YOURS
+    if current['rider_id'] is not None:
+        return TAKEN
+    return NOT_CLAIMABLE
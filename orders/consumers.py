@@ -1,20 +1,36 @@
+import asyncio
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from .dispatch import notification_dispatcher
+from .feed import current_sequence
 from .models import Order
-from django.db.models import Q
+from .notifications import order_group, order_status_snapshot, restaurant_group
+from .presence import rider_presence
+from .signals import count_available_orders, rider_orders_group
+from .zones import rider_zone, zone_slug
 
 
 class OrderUpdatesConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Get the user from the session (you might need to adjust this based on your auth)
         self.user = self.scope["user"]
+        # Order notifications are sent from this (the server's) event loop
+        notification_dispatcher.attach()
         
         if self.user.is_authenticated:
             # Create a unique group name for this rider
             self.rider_group = f"rider_{self.user.id}_orders"
-            self.orders_group = "orders_updates"
+
+            # Riders listen on their barangay zone (declared via ?barangay= or
+            # derived from RiderLocation); riders without one get city-wide updates
+            query = parse_qs(self.scope.get("query_string", b"").decode())
+            declared_barangay = query.get("barangay", [None])[0]
+            self.zone = await database_sync_to_async(rider_zone)(self.user.id, declared_barangay)
+            self.orders_group = rider_orders_group(self.zone)
             
             # Join both groups
             await self.channel_layer.group_add(
@@ -27,15 +43,24 @@ class OrderUpdatesConsumer(AsyncWebsocketConsumer):
             )
             
             await self.accept()
+
+            # Shared presence record; refreshed while the socket stays open
+            if await database_sync_to_async(rider_presence.connect)(self.user.id, self.channel_name, self.zone):
+                self.presence_task = asyncio.create_task(self.keep_presence())
             
-            # Send initial order count
+            # Send initial order count and the feed position to apply deltas from
             await self.send_initial_count()
+            await self.send_feed_sync()
             
-            print(f"📡 WebSocket connected for rider {self.user.id}")
+            print(f"📡 WebSocket connected for rider {self.user.id} ({self.orders_group})")
         else:
             await self.close()
 
     async def disconnect(self, close_code):
+        if hasattr(self, 'presence_task'):
+            self.presence_task.cancel()
+            await database_sync_to_async(rider_presence.disconnect)(self.user.id, self.channel_name)
+
         if hasattr(self, 'rider_group'):
             # Leave both groups
             await self.channel_layer.group_discard(
@@ -48,6 +73,37 @@ class OrderUpdatesConsumer(AsyncWebsocketConsumer):
             )
             print(f"📡 WebSocket disconnected for rider {self.user.id}")
 
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "{}")
+        except ValueError:
+            return
+
+        if data.get("type") == "set_barangay":
+            await self.change_zone(zone_slug(data.get("barangay")))
+        elif data.get("type") == "heartbeat":
+            await self.touch_presence()
+
+    async def keep_presence(self):
+        """Refresh presence until the socket closes (a dead process just stops refreshing)"""
+        while True:
+            await asyncio.sleep(rider_presence.refresh_interval)
+            await self.touch_presence()
+
+    async def touch_presence(self):
+        await database_sync_to_async(rider_presence.touch)(self.user.id, self.channel_name, self.zone)
+
+    async def change_zone(self, zone):
+        """Move the rider to another barangay zone (e.g. after driving across town)"""
+        new_group = rider_orders_group(zone)
+        if new_group != self.orders_group:
+            await self.channel_layer.group_discard(self.orders_group, self.channel_name)
+            await self.channel_layer.group_add(new_group, self.channel_name)
+            self.zone, self.orders_group = zone, new_group
+            await self.touch_presence()
+            await self.send_feed_sync()
+        await self.send_initial_count()
+
     async def send_initial_count(self):
         """Send the initial order count when rider connects"""
         count = await self.get_pending_orders_count()
@@ -65,12 +121,144 @@ class OrderUpdatesConsumer(AsyncWebsocketConsumer):
             'message': event.get('message', f"{event['count']} orders available for pickup")
         }))
 
+    async def send_feed_sync(self):
+        """
+        Tell the client which feed sequence its group is at. Events with a
+        higher ``seq`` apply on top of a /rider/fetch-orders/ list; a gap in
+        ``seq`` means an event was missed and the list should be re-fetched.
+        """
+        seq = await database_sync_to_async(current_sequence)(self.orders_group)
+        await self.send(text_data=json.dumps({
+            'type': 'order_feed_sync',
+            'seq': seq,
+        }))
+
+    async def order_feed_event(self, event):
+        """Forward a pre-encoded order_added / order_claimed / order_removed event"""
+        await self.send(text_data=event['text'])
+
     @database_sync_to_async
     def get_pending_orders_count(self):
-        """Get count of pending orders from database"""
-        return Order.objects.filter(
-            Q(status='pending') | 
-            Q(status='accepted') | 
-            Q(status='preparing') | 
-            Q(status='ready')
-        ).count()
+        """Get count of orders available for pickup in the rider's area (cached counter)"""
+        return count_available_orders(self.zone)
+
+
+class OrderStatusConsumer(AsyncWebsocketConsumer):
+    """
+    Live status for a single order, addressed by its token number.
+
+    The client gets a snapshot on connect and then every status, rider or
+    payment change as it happens; /getOrderStatus/ is only a fallback.
+    """
+
+    async def connect(self):
+        self.user = self.scope["user"]
+        token_number = self.scope["url_route"]["kwargs"]["token_number"]
+        notification_dispatcher.attach()
+
+        order = await self.get_order(token_number)
+        if order is None or not self.can_watch(order):
+            await self.close()
+            return
+
+        self.order_id = order.id
+        self.order_group = order_group(order.id)
+        await self.channel_layer.group_add(
+            self.order_group,
+            self.channel_name
+        )
+
+        await self.accept()
+
+        # Send the current state so the client doesn't need an extra request
+        await self.send(text_data=json.dumps({
+            'type': 'order_status',
+            'order': order_status_snapshot(order),
+        }))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'order_group'):
+            await self.channel_layer.group_discard(
+                self.order_group,
+                self.channel_name
+            )
+
+    async def order_status_update(self, event):
+        """Forward an order change to the client"""
+        await self.send(text_data=json.dumps({
+            'type': 'order_status',
+            'order': event['order'],
+        }))
+
+    def can_watch(self, order):
+        # The mobile app tracks orders without a session (like /getOrderStatus/);
+        # logged-in web users may only watch orders they are part of.
+        if not self.user.is_authenticated:
+            return True
+        return self.user.id in (order.customer_id, order.restaurant_id, order.rider_id)
+
+    @database_sync_to_async
+    def get_order(self, token_number):
+        return Order.objects.select_related('rider').filter(token_number=token_number).first()
+
+
+class RestaurantOrdersConsumer(AsyncWebsocketConsumer):
+    """
+    Live dashboard feed for a restaurant.
+
+    On connect the restaurant gets its pending orders (the /pending-orders/
+    payload); afterwards each new order arrives in full as ``order_created``
+    and later status/rider changes as small ``order_updated`` deltas.
+    """
+
+    async def connect(self):
+        self.user = self.scope["user"]
+        notification_dispatcher.attach()
+
+        if not self.user.is_authenticated or getattr(self.user, 'role', None) != 'restaurant':
+            await self.close()
+            return
+
+        self.restaurant_group = restaurant_group(self.user.id)
+        await self.channel_layer.group_add(
+            self.restaurant_group,
+            self.channel_name
+        )
+
+        await self.accept()
+
+        await self.send(text_data=json.dumps({
+            'type': 'pending_orders',
+            'orders': await self.get_pending_orders(),
+        }, cls=DjangoJSONEncoder))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'restaurant_group'):
+            await self.channel_layer.group_discard(
+                self.restaurant_group,
+                self.channel_name
+            )
+
+    async def restaurant_order_created(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'order_created',
+            'order': event['order'],
+        }))
+
+    async def restaurant_order_updated(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'order_updated',
+            'order': event['order'],
+        }))
+
+    @database_sync_to_async
+    def get_pending_orders(self):
+        from restaurant.serializers import OrderSerializer
+
+        orders = (
+            Order.objects.filter(restaurant=self.user, status='pending')
+            .select_related('customer__address', 'rider')
+            .prefetch_related('items__product')
+            .order_by('-created_at')
+        )
+        return OrderSerializer(orders, many=True).data
@@ -0,0 +1,115 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+# Statuses in which an order without a rider can still be claimed
+AVAILABLE_STATUSES = ('pending', 'accepted', 'preparing', 'ready')
+
+
+def is_available(status, rider_id):
+    """True if an order in this state belongs to the rider pickup pool"""
+    return rider_id is None and status in AVAILABLE_STATUSES
+
+
+def available_orders():
+    """Queryset of orders riders can still pick up"""
+    from .models import Order
+
+    return Order.objects.filter(rider__isnull=True, status__in=AVAILABLE_STATUSES)
+
+
+class AvailableOrderCounter:
+    """
+    Cache-backed count of the rider pickup pool, city-wide and per zone.
+
+    Order signals move the values up or down as orders enter or leave the
+    pool, so reads are a single cache lookup. A missing key or a stale
+    reconciliation timestamp triggers a COUNT against the database, which
+    also corrects any drift from writes that bypassed the signals.
+    """
+
+    key = 'orders:available_count'
+    zone_key_prefix = 'orders:available_count:zone:'
+    zones_key = 'orders:available_count:zones'
+    reconciled_key = 'orders:available_count:reconciled_at'
+
+    @property
+    def reconcile_interval(self):
+        return getattr(settings, 'ORDERS_COUNTER_RECONCILE_SECONDS', 300)
+
+    def zone_key(self, zone):
+        return f'{self.zone_key_prefix}{zone}'
+
+    def get(self):
+        values = cache.get_many([self.key, self.reconciled_key])
+        count = values.get(self.key)
+        if count is None or self._reconcile_due(values.get(self.reconciled_key)):
+            return self.reconcile()['total']
+        return max(count, 0)
+
+    def get_area(self, zones):
+        """Available orders across a set of zones (a rider's zone + neighbours)"""
+        if not zones:
+            return 0
+        keys = [self.zone_key(zone) for zone in zones]
+        values = cache.get_many(keys + [self.reconciled_key])
+        if self._reconcile_due(values.get(self.reconciled_key)):
+            by_zone = self.reconcile()['zones']
+            return sum(by_zone.get(zone, 0) for zone in zones)
+        return sum(max(values.get(key) or 0, 0) for key in keys)
+
+    def adjust(self, delta, zone=''):
+        if not delta:
+            return
+        try:
+            cache.incr(self.key, delta)
+            if zone:
+                cache.incr(self.zone_key(zone), delta)
+        except ValueError:
+            # Key expired or was never set; rebuild from the database
+            self.reconcile()
+
+    def reconcile(self):
+        rows = (
+            available_orders()
+            .values('restaurant__restaurant__barangay')
+            .annotate(n=Count('id'))
+        )
+        from .zones import zone_slug
+
+        by_zone = {}
+        for row in rows:
+            zone = zone_slug(row['restaurant__restaurant__barangay'])
+            by_zone[zone] = by_zone.get(zone, 0) + row['n']
+        total = sum(by_zone.values())
+        by_zone.pop('', None)
+
+        previous = cache.get(self.key)
+        if previous is not None and previous != total:
+            logger.warning(f"Available order counter drifted: cached {previous}, actual {total}")
+
+        # Zones that emptied out since the last run must be reset to zero
+        known_zones = set(cache.get(self.zones_key) or ()) | set(by_zone)
+        values = {self.zone_key(zone): by_zone.get(zone, 0) for zone in known_zones}
+        values.update({
+            self.key: total,
+            self.zones_key: sorted(known_zones),
+            self.reconciled_key: time.time(),
+        })
+        cache.set_many(values, timeout=None)
+        return {'total': total, 'zones': by_zone}
+
+    def invalidate(self):
+        """Force the next read to reconcile against the database"""
+        cache.delete(self.reconciled_key)
+
+    def _reconcile_due(self, reconciled_at):
+        return reconciled_at is None or time.time() - reconciled_at > self.reconcile_interval
+
+
+available_order_counter = AvailableOrderCounter()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Sends channel-layer messages from a background asyncio task.
+
+    Request threads hand messages over with ``group_send`` and return
+    immediately; a single worker drains a bounded queue and awaits the
+    channel layer. Work that needs the database to build its messages is
+    handed over with ``run`` instead, as ids, and runs on the worker through
+    ``database_sync_to_async`` so the request never waits for it. Under
+    Daphne the worker runs on the server's event loop (``attach`` is called
+    from the consumers), which the in-memory channel layer requires.
+    Elsewhere (management commands, WSGI) it falls back to a private loop on
+    a daemon thread. When the queue is full new messages are dropped and
+    counted rather than blocking the request.
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._workers = []  # (loop, worker future), including superseded ones still draining
+        self._thread_loop = None
+        self._thread = None
+        self.enqueued = 0
+        self.sent = 0
+        self.jobs = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(settings, 'ORDERS_DISPATCH_QUEUE_SIZE', 1000)
+
+    def attach(self):
+        """Run the worker on the calling event loop (call from async code)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._start_worker(loop)
+
+    def group_send(self, group, message):
+        """Queue a message for a group; never blocks on the channel layer."""
+        loop, queue = self._ensure_worker()
+        item = (group, message, time.monotonic())
+        loop.call_soon_threadsafe(self._put, queue, item)
+
+    def run(self, job, *args):
+        """Queue ``job(*args)`` to run on the worker; it may query the database and send messages."""
+        loop, queue = self._ensure_worker()
+        item = (job, args, time.monotonic())
+        loop.call_soon_threadsafe(self._put, queue, item)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._stop_thread_loop()
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name='order-notifications', daemon=True
+                )
+                thread.start()
+                self._thread_loop, self._thread = loop, thread
+                self._start_worker(loop)
+            return self._loop, self._queue
+
+    def _start_worker(self, loop):
+        # Called with the lock held. A previous worker keeps draining its own
+        # queue; new messages go to the queue on the new loop.
+        queue = asyncio.Queue(maxsize=self.maxsize)
+        self._loop, self._queue = loop, queue
+        self._workers = [(old, worker) for old, worker in self._workers if not old.is_closed()]
+        self._workers.append((loop, asyncio.run_coroutine_threadsafe(self._worker(queue), loop)))
+
+    def close(self):
+        """
+        Cancel the workers and stop the private loop, so nothing is left
+        pending at shutdown (for scripts and tests). Messages still queued
+        are discarded; the next one starts a new worker.
+        """
+        with self._lock:
+            for loop, worker in self._workers:
+                if not loop.is_closed():
+                    worker.cancel()
+            self._workers = []
+            self._loop = self._queue = None
+            self._stop_thread_loop()
+
+    def _stop_thread_loop(self):
+        # Called with the lock held
+        loop, thread = self._thread_loop, self._thread
+        self._thread_loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+
+        async def cancel_pending():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel_pending(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    def _put(self, queue, item):
+        try:
+            queue.put_nowait(item)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Notification queue full; dropped message for {getattr(item[0], '__name__', item[0])}")
+
+    async def _worker(self, queue):
+        channel_layer = get_channel_layer()
+        while True:
+            target, payload, queued_at = await queue.get()
+            try:
+                if callable(target):
+                    # Its own group_send calls queue behind it on this worker
+                    await database_sync_to_async(target)(*payload)
+                    self.jobs += 1
+                else:
+                    if channel_layer:
+                        await channel_layer.group_send(target, payload)
+                    self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Notification to {getattr(target, '__name__', target)} failed: {e}")
+            finally:
+                lag = time.monotonic() - queued_at
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self._total_lag += lag
+                queue.task_done()
+
+    async def drain(self):
+        """Wait until every queued message and job has been handled (for scripts and tests)."""
+        # Let hand-offs from this loop reach the queue first
+        await asyncio.sleep(0)
+        queue = self._queue
+        if queue is not None:
+            await queue.join()
+
+    def stats(self):
+        handled = self.sent + self.jobs + self.failed
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'queue_size': self.maxsize,
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'jobs': self.jobs,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'last_lag_ms': round(self.last_lag * 1000, 2),
+            'max_lag_ms': round(self.max_lag * 1000, 2),
+            'avg_lag_ms': round(self._total_lag / handled * 1000, 2) if handled else 0.0,
+        }
+
+
+notification_dispatcher = NotificationDispatcher()
@@ -0,0 +1,201 @@
+import json
+import logging
+
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery, Sum
+
+from .counters import AVAILABLE_STATUSES
+from .dispatch import notification_dispatcher
+from .zones import restaurant_zone, zone_area, zone_group
+
+logger = logging.getLogger(__name__)
+
+FEED_SEQUENCE_KEY = 'orders:feed_seq:{group}'
+FEED_VERSION_KEY = 'orders:feed_version'
+FEED_SNAPSHOT_KEY = 'orders:feed_snapshot'
+
+ORDER_ADDED = 'order_added'
+ORDER_CLAIMED = 'order_claimed'
+ORDER_REMOVED = 'order_removed'
+
+FEED_PAGE_SIZE = 50
+FEED_MAX_PAGE_SIZE = 200
+
+
+def order_summary(order, restaurant, address, subtotal):
+    """One entry of the rider order feed (the shape /rider/fetch-orders/ returns)"""
+    return {
+        'order_id': order.id,
+        'restaurant_barangay': restaurant.barangay,
+        'customer_barangay': address.barangay,
+        'customer_street': address.street,
+        'customer_plus_code': address.plus_code,
+        'restaurant': {
+            'name': restaurant.name,
+        },
+        'total_amount': float(order.total_amount),
+        'rider_fee': float(order.rider_fee),
+        'small_order_fee': float(order.small_order_fee),
+        'subtotal': float(subtotal or 0),
+    }
+
+
+def build_order_summary(order):
+    """Feed entry for a single order, or None if its restaurant/address is missing"""
+    from customer.models import Address
+    from restaurant.models import Restaurant
+
+    restaurant = Restaurant.objects.filter(user_id=order.restaurant_id).first()
+    address = Address.objects.filter(user_id=order.customer_id).first()
+    if restaurant is None or address is None:
+        return None
+
+    subtotal = order.items.aggregate(total=Sum('subtotal'))['total'] or 0
+    return order_summary(order, restaurant, address, subtotal)
+
+
+def feed_page(statuses=None, limit=None, cursor=None):
+    """
+    The rider order feed, newest first, in a single query.
+
+    Restaurant and customer address are joined in, and the subtotal comes
+    from a correlated subquery, so the cost doesn't grow with the number of
+    open orders. Without a ``limit`` the whole pool is returned; otherwise
+    one page, where ``cursor`` is the last order id of the previous page.
+    Returns ``(entries, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    from .models import Order, OrderLine
+
+    subtotals = (
+        OrderLine.objects.filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum('subtotal'))
+        .values('total')
+    )
+    orders = (
+        Order.objects.filter(
+            rider__isnull=True,
+            status__in=statuses or AVAILABLE_STATUSES,
+            # Orders without a restaurant profile or address can't be shown
+            restaurant__restaurant__isnull=False,
+            customer__address__isnull=False,
+        )
+        .select_related('restaurant__restaurant', 'customer__address')
+        .annotate(items_subtotal=Subquery(subtotals))
+        .order_by('-id')
+    )
+    if cursor is not None:
+        orders = orders.filter(id__lt=cursor)
+
+    if limit is None:
+        page, has_more = list(orders), False
+    else:
+        # One extra row tells us whether there is another page
+        page = list(orders[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+    entries = [
+        order_summary(order, order.restaurant.restaurant, order.customer.address, order.items_subtotal)
+        for order in page
+    ]
+    next_cursor = page[-1].id if has_more else None
+    return entries, next_cursor
+
+
+def feed_version():
+    return cache.get_or_set(FEED_VERSION_KEY, 1, timeout=None)
+
+
+def bump_feed_version():
+    """Mark the shared feed snapshot stale (an order entered or left the pool)"""
+    cache.add(FEED_VERSION_KEY, 1, timeout=None)
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.set(FEED_VERSION_KEY, 1, timeout=None)
+
+
+def feed_snapshot():
+    """
+    The default feed (no filters, no paging: the whole pool) as encoded JSON bytes.
+
+    Every rider polls the same list, so it is built once per pool change and
+    stored in the cache together with the version it was built for and its
+    ETag. Returns ``(body, etag)``.
+    """
+    from core.http import make_etag
+
+    version = feed_version()
+    snapshot = cache.get(FEED_SNAPSHOT_KEY)
+    if snapshot is not None and snapshot['version'] == version:
+        return snapshot['body'], snapshot['etag']
+
+    entries, next_cursor = feed_page()
+    body = json.dumps({'success': True, 'orders': entries, 'next_cursor': next_cursor}).encode()
+    etag = make_etag(body)
+    # If the pool changed while building, the next read sees a newer version and rebuilds
+    cache.set(FEED_SNAPSHOT_KEY, {'version': version, 'body': body, 'etag': etag}, timeout=None)
+    logger.info(f"Rebuilt rider feed snapshot v{version} ({len(entries)} orders)")
+    return body, etag
+
+
+def feed_groups(order):
+    """Rider groups that should see feed events for this order"""
+    from .signals import ORDERS_GROUP
+
+    groups = [ORDERS_GROUP]
+    groups += [zone_group(zone) for zone in sorted(zone_area(restaurant_zone(order.restaurant_id)))]
+    return groups
+
+
+def current_sequence(group):
+    return cache.get(FEED_SEQUENCE_KEY.format(group=group), 0)
+
+
+def next_sequence(group):
+    key = FEED_SEQUENCE_KEY.format(group=group)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); restart the sequence
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def publish_feed_event(event_type, order, summary=None):
+    """
+    Send a delta event for the rider order feed.
+
+    The event is encoded once per group and forwarded verbatim by every
+    rider socket, so a new order costs one summary build no matter how many
+    riders are connected. Each group has its own sequence number so clients
+    can detect missed events and fall back to a full /rider/fetch-orders/.
+    """
+    if summary is None:
+        summary = {'order_id': order.id}
+
+    for group in feed_groups(order):
+        text = json.dumps({
+            'type': event_type,
+            'seq': next_sequence(group),
+            'order': summary,
+        })
+        notification_dispatcher.group_send(
+            group,
+            {'type': 'order_feed_event', 'text': text}
+        )
+
+
+def publish_pool_change(order, was_available, now_available):
+    """Translate a rider pool membership change into a feed event"""
+    if now_available and not was_available:
+        summary = build_order_summary(order)
+        if summary is None:
+            logger.warning(f"Order {order.id} has no restaurant or customer address; not added to feed")
+            return
+        publish_feed_event(ORDER_ADDED, order, summary)
+    elif was_available and not now_available:
+        event_type = ORDER_CLAIMED if order.rider_id else ORDER_REMOVED
+        publish_feed_event(event_type, order)
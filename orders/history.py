@@ -0,0 +1,78 @@
+"""
+A customer's order history, a page at a time.
+
+Orders still in progress come back separately (there are only ever a few).
+Finished orders are paged newest first with a keyset cursor on
+``(created_at, id)``, so a page costs the same however long the history is,
+and an order finishing between two requests can't shift the next page.
+Restaurant names are read in the same query through the restaurant user's
+profile, so each request is a fixed number of queries.
+"""
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import Order
+
+# Statuses an order doesn't leave again
+FINISHED_STATUSES = ('delivered', 'cancelled')
+
+ACTIVE_ORDERS_LIMIT = 10
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+HISTORY_FIELDS = (
+    'id', 'token_number', 'restaurant__restaurant__name', 'total_amount', 'payment_method', 'status', 'created_at',
+)
+
+
+def encode_cursor(created_at, order_id):
+    return f'{created_at.isoformat()}|{order_id}'
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a ``next_cursor``; ValueError if it isn't one"""
+    created_at, _, order_id = str(cursor).rpartition('|')
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+def order_entry(row):
+    return {
+        'id': row['id'],
+        'token_number': row['token_number'],
+        'restaurant_name': row['restaurant__restaurant__name'],
+        'total_amount': str(row['total_amount']),
+        'payment_method': row['payment_method'],
+        'status': row['status'],
+        'created_at': row['created_at'].isoformat(),
+    }
+
+
+def customer_orders(customer_id):
+    return Order.objects.filter(customer_id=customer_id).order_by('-created_at', '-id')
+
+
+def active_orders(customer_id, limit=ACTIVE_ORDERS_LIMIT):
+    rows = customer_orders(customer_id).exclude(status__in=FINISHED_STATUSES).values(*HISTORY_FIELDS)[:limit]
+    return [order_entry(row) for row in rows]
+
+
+def order_history_page(customer_id, limit=HISTORY_PAGE_SIZE, cursor=None):
+    """
+    ``(finished orders, next_cursor)`` for the page after ``cursor`` (a
+    previous ``next_cursor``, or None for the newest). ``next_cursor`` is None
+    on the last page; a ``limit`` of None returns all of them.
+    """
+    orders = customer_orders(customer_id).filter(status__in=FINISHED_STATUSES)
+    if cursor is not None:
+        created_at, order_id = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+
+    if limit is None:
+        return [order_entry(row) for row in orders.values(*HISTORY_FIELDS)], None
+
+    # One extra row tells us whether there is another page
+    rows = list(orders.values(*HISTORY_FIELDS)[:limit + 1])
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]['created_at'], page[-1]['id']) if len(rows) > limit else None
+    return [order_entry(row) for row in page], next_cursor
@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from orders.claims import CLAIMED, claim_order
+from orders.models import Order
+from users.models import User
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))]
+
+
+def naive_claim(order_id, rider_user):
+    """The old read-check-save accept, for comparison"""
+    order = Order.objects.get(pk=order_id)
+    if order.rider_id is None:
+        order.rider = rider_user
+        order.status = 'assigned'
+        order.save()
+        return CLAIMED
+    return 'taken'
+
+
+class Command(BaseCommand):
+    help = 'Fire parallel rider claims at one order and check there is exactly one winner'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--claims', type=int, default=300, help='Riders trying to accept the same order')
+        parser.add_argument('--threads', type=int, default=50, help='Concurrent database connections')
+        parser.add_argument('--rounds', type=int, default=3, help='Orders to run the race on')
+        parser.add_argument('--naive', action='store_true', help='Use the old read-check-save instead')
+
+    def handle(self, *args, **options):
+        if options['claims'] < 2 or options['threads'] < 1:
+            raise CommandError('--claims must be at least 2 and --threads at least 1')
+
+        tag = uuid.uuid4().hex[:8]
+        customer = User.objects.create(username=f'benchclaim_customer_{tag}', role='customer')
+        restaurant = User.objects.create(username=f'benchclaim_restaurant_{tag}', role='restaurant')
+        riders = User.objects.bulk_create([
+            User(username=f'benchclaim_rider_{tag}_{i}', role='rider') for i in range(options['claims'])
+        ])
+        claim = naive_claim if options['naive'] else claim_order
+
+        try:
+            self.stdout.write(
+                f"🏁 {options['claims']} claims per order over {options['threads']} threads, "
+                f"{options['rounds']} rounds ({'read-check-save' if options['naive'] else 'conditional UPDATE'})"
+            )
+            failures = 0
+            for round_number in range(1, options['rounds'] + 1):
+                order = Order.objects.create(customer=customer, restaurant=restaurant, total_amount=100)
+                failures += self.race(round_number, order, riders, claim, options['threads'])
+        finally:
+            User.objects.filter(username__startswith='benchclaim_', username__contains=tag).delete()
+
+        if failures:
+            raise CommandError(f'{failures} round(s) did not end with exactly one consistent winner')
+        self.stdout.write(self.style.SUCCESS('✅ Exactly one winner in every round'))
+
+    def race(self, round_number, order, riders, claim, threads):
+        threads = min(threads, len(riders))
+        start_line = threading.Barrier(threads)
+        outcomes = []
+        outcomes_lock = threading.Lock()
+
+        def worker(batch):
+            try:
+                # Connect before the race so connection setup isn't timed
+                connection.ensure_connection()
+                start_line.wait(timeout=30)
+                for rider in batch:
+                    started = time.perf_counter()
+                    try:
+                        result = claim(order.id, rider)
+                    except OperationalError as e:
+                        # e.g. "database is locked" on SQLite
+                        result = f'error: {e}'
+                    with outcomes_lock:
+                        outcomes.append((rider.id, result, time.perf_counter() - started))
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=worker, args=(riders[i::threads],)) for i in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        winners = [rider_id for rider_id, result, _ in outcomes if result == CLAIMED]
+        errors = [result for _, result, _ in outcomes if result.startswith('error')]
+        latencies = [latency for _, _, latency in outcomes]
+        order.refresh_from_db()
+        consistent = len(winners) == 1 and order.rider_id == winners[0]
+
+        def ms(value):
+            return f'{value * 1000:.1f} ms'
+
+        self.stdout.write(
+            f"Round {round_number}: {len(winners)} winner(s), stored rider {order.rider_id}, "
+            f"{len(outcomes) - len(winners) - len(errors)} told they lost, {len(errors)} errors | "
+            f"latency p50 {ms(percentile(latencies, 50))} p95 {ms(percentile(latencies, 95))} "
+            f"p99 {ms(percentile(latencies, 99))}"
+        )
+        if not consistent:
+            self.stdout.write(self.style.ERROR(f'❌ Round {round_number}: winners {winners}'))
+        return 0 if consistent else 1
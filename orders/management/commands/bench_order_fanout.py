@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from orders.broadcast import OrderCountBroadcaster
+from orders.dispatch import notification_dispatcher
+from orders.signals import ORDERS_GROUP, rider_orders_group
+from orders.zones import RESTAURANT_ZONE_CACHE_KEY, _neighbour_map, forget_restaurant_zone, restaurant_zone
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-event fan-out cost: city-wide group vs barangay zone groups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--riders', type=int, default=1000, help='Connected rider sockets to simulate')
+        parser.add_argument('--zones', type=int, default=20, help='Number of barangay zones')
+        parser.add_argument('--neighbours', type=int, default=2, help='Neighbouring zones per zone (ring layout)')
+        parser.add_argument('--events', type=int, default=200, help='Order events to send per mode')
+
+    def handle(self, *args, **options):
+        riders = options['riders']
+        zones = max(options['zones'], 1)
+        neighbours = min(options['neighbours'], zones - 1)
+        events = options['events']
+
+        self.stdout.write(
+            f'📦 {riders} riders, {zones} zones, {neighbours} neighbours per zone, {events} events'
+        )
+
+        # Zones laid out on a ring, each adjacent to the next ``neighbours`` ones
+        ring = {
+            f'zone-{i}': [f'zone-{(i + d) % zones}' for d in range(1, neighbours + 1)] for i in range(zones)
+        }
+        # Stand-in restaurants (negative user ids never exist), one per zone,
+        # resolved through the real restaurant_zone() cache path
+        restaurants = [-(i + 1) for i in range(zones)]
+        for i, user_id in enumerate(restaurants):
+            cache.set(RESTAURANT_ZONE_CACHE_KEY.format(user_id=user_id), f'zone-{i}', timeout=None)
+        previous_layer = channel_layers.backends.get(DEFAULT_CHANNEL_LAYER)
+
+        try:
+            with override_settings(ORDERS_BARANGAY_NEIGHBOURS=ring):
+                _neighbour_map.cache_clear()
+                city = asyncio.run(self.run_mode(riders, zones, restaurants, events, zoned=False))
+                zoned = asyncio.run(self.run_mode(riders, zones, restaurants, events, zoned=True))
+        finally:
+            _neighbour_map.cache_clear()
+            for user_id in restaurants:
+                forget_restaurant_zone(user_id)
+            if previous_layer is None:
+                channel_layers.backends.pop(DEFAULT_CHANNEL_LAYER, None)
+            else:
+                channel_layers.backends[DEFAULT_CHANNEL_LAYER] = previous_layer
+
+        for label, result in (('city-wide', city), ('zoned', zoned)):
+            self.stdout.write(
+                f'  {label:<10} {result["us_per_event"]:>9.1f} µs/event  '
+                f'{result["deliveries_per_event"]:>8.1f} deliveries/event  '
+                f'{result["groups_per_event"]:.1f} group_send/event'
+            )
+
+        if zoned['deliveries_per_event']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Zoning cuts deliveries per event by '
+                f'{city["deliveries_per_event"] / zoned["deliveries_per_event"]:.1f}x '
+                f'and send time by {city["us_per_event"] / max(zoned["us_per_event"], 1e-9):.1f}x'
+            ))
+
+    async def run_mode(self, riders, zones, restaurants, events, zoned):
+        # One message per rider per event must fit without ChannelFull drops.
+        # The dispatcher picks up the default layer when it attaches to this loop.
+        layer = InMemoryChannelLayer(capacity=events + 1)
+        channel_layers.backends[DEFAULT_CHANNEL_LAYER] = layer
+        notification_dispatcher.attach()
+
+        channels = []
+        for i in range(riders):
+            channel = await layer.new_channel()
+            await layer.group_add(rider_orders_group(f'zone-{i % zones}' if zoned else ''), channel)
+            channels.append(channel)
+
+        # A different count every event, so no send is skipped as unchanged
+        current = {'count': 0}
+        broadcaster = OrderCountBroadcaster(
+            ORDERS_GROUP,
+            lambda: current['count'],
+            (lambda area: current['count']) if zoned else None,
+            window=0,
+        )
+
+        start = time.perf_counter()
+        for event in range(events):
+            current['count'] = event + 1
+            broadcaster.schedule(restaurant_zone(restaurants[event % zones]))
+            # Let the hand-offs reach the queue, then wait for the sends
+            await asyncio.sleep(0)
+            await notification_dispatcher.drain()
+        elapsed = time.perf_counter() - start
+
+        deliveries = sum(layer.channels[channel].qsize() for channel in channels if channel in layer.channels)
+        await layer.flush()
+
+        return {
+            'us_per_event': elapsed / events * 1e6,
+            'deliveries_per_event': deliveries / events,
+            'groups_per_event': broadcaster.sent / events,
+        }
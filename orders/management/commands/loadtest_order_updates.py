@@ -0,0 +1,211 @@
+import asyncio
+import json
+import time
+import tracemalloc
+import uuid
+
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.models import Address
+from orders.dispatch import notification_dispatcher
+from orders.models import Order
+from orders.routing import websocket_urlpatterns
+from restaurant.models import Restaurant
+from users.models import User
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class RiderSocket:
+    """One simulated rider connection and what it received"""
+
+    def __init__(self, communicator, barangay):
+        self.communicator = communicator
+        self.barangay = barangay
+        self.baseline = None
+        self.feed_events = {}
+        self.reader = None
+
+    async def read_forever(self):
+        while True:
+            message = json.loads(await self.communicator.receive_from(timeout=3600))
+            received_at = time.perf_counter()
+            if message['type'] == 'order_feed_sync':
+                self.baseline = message['seq']
+            elif message['type'] in ('order_added', 'order_removed', 'order_claimed'):
+                self.feed_events[message['seq']] = received_at
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test OrderUpdatesConsumer in-process: open N rider sockets against the '
+        'ASGI websocket router, drive order status changes and report latencies'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--riders', type=int, default=200, help='Simulated rider sockets')
+        parser.add_argument('--rate', type=float, default=20.0, help='Order status changes per second')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to drive changes for')
+        parser.add_argument(
+            '--zones', type=int, default=0,
+            help='Spread riders over this many barangay zones (0 = everyone city-wide)'
+        )
+        parser.add_argument(
+            '--redis-url', default=None,
+            help='Use RedisChannelLayer at this URL (e.g. a local redis-server) instead of InMemoryChannelLayer'
+        )
+
+    def handle(self, *args, **options):
+        if options['riders'] < 1 or options['rate'] <= 0:
+            raise CommandError('--riders and --rate must be positive')
+
+        if options['redis_url']:
+            from channels_redis.core import RedisChannelLayer
+            layer = RedisChannelLayer(hosts=[options['redis_url']])
+            layer_name = f"RedisChannelLayer ({options['redis_url']})"
+        else:
+            layer = InMemoryChannelLayer(capacity=10000)
+            layer_name = 'InMemoryChannelLayer'
+        previous_layer = channel_layers.set('default', layer)
+
+        fixtures = self.create_fixtures()
+        try:
+            self.stdout.write(
+                f"📡 {options['riders']} riders on {layer_name}, "
+                f"{options['rate']:g} changes/s for {options['duration']:g}s"
+            )
+            report = asyncio.run(self.run(fixtures, options))
+        finally:
+            self.delete_fixtures(fixtures)
+            # Nothing may be left pending on the dispatcher's loops at exit
+            notification_dispatcher.close()
+            channel_layers.set('default', previous_layer)
+
+        self.print_report(report)
+
+    def create_fixtures(self):
+        tag = uuid.uuid4().hex[:8]
+        customer = User.objects.create(username=f'loadtest_customer_{tag}', role='customer')
+        restaurant_user = User.objects.create(username=f'loadtest_restaurant_{tag}', role='restaurant')
+        rider = User.objects.create(username=f'loadtest_rider_{tag}', role='rider')
+        Restaurant.objects.create(
+            user=restaurant_user, name=f'Load test {tag}', address='Load test', barangay='loadtest-0', phone='0'
+        )
+        Address.objects.create(user=customer, street='Load test', barangay='loadtest-0', label='home')
+        order = Order.objects.create(
+            customer=customer, restaurant=restaurant_user, total_amount=100, status='cancelled'
+        )
+        return {'users': [customer, restaurant_user, rider], 'rider': rider, 'order': order}
+
+    def delete_fixtures(self, fixtures):
+        for user in fixtures['users']:
+            user.delete()
+
+    async def run(self, fixtures, options):
+        application = URLRouter(websocket_urlpatterns)
+        riders = options['riders']
+        zones = options['zones']
+
+        # Connect everyone, measuring connect latency and memory per socket
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        sockets, connect_latencies = [], []
+        for i in range(riders):
+            barangay = f'loadtest-{i % zones}' if zones else ''
+            path = '/ws/orders/updates/' + (f'?barangay={barangay}' if barangay else '')
+            communicator = WebsocketCommunicator(application, path)
+            communicator.scope['user'] = fixtures['rider']
+            start = time.perf_counter()
+            connected, _ = await communicator.connect(timeout=10)
+            connect_latencies.append(time.perf_counter() - start)
+            if not connected:
+                raise CommandError(f'Socket {i} was rejected')
+            socket = RiderSocket(communicator, barangay)
+            socket.reader = asyncio.create_task(socket.read_forever())
+            sockets.append(socket)
+        await asyncio.sleep(0.5)
+        memory_per_socket = (tracemalloc.get_traced_memory()[0] - memory_before) / riders
+        tracemalloc.stop()
+
+        # Drive the order in and out of the rider pool at the requested rate
+        order_id = fixtures['order'].id
+        interval = 1 / options['rate']
+        sent_at = []
+        status = 'cancelled'
+        deadline = time.perf_counter() + options['duration']
+        while time.perf_counter() < deadline:
+            status = 'pending' if status == 'cancelled' else 'cancelled'
+            tick = time.perf_counter()
+            sent_at.append(tick)
+            await database_sync_to_async(self.set_status)(order_id, status)
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+
+        # Let the queue drain and the last messages arrive
+        await notification_dispatcher.drain()
+        await asyncio.sleep(1.0)
+
+        latencies, expected, received = [], 0, 0
+        for socket in sockets:
+            # Riders outside the restaurant's zone area are not sent anything
+            if socket.barangay not in ('', 'loadtest-0'):
+                continue
+            expected += len(sent_at)
+            received += len(socket.feed_events)
+            for seq, received_at in socket.feed_events.items():
+                index = seq - (socket.baseline or 0) - 1
+                if 0 <= index < len(sent_at):
+                    latencies.append(received_at - sent_at[index])
+
+        for socket in sockets:
+            socket.reader.cancel()
+            await socket.communicator.disconnect()
+
+        return {
+            'riders': riders,
+            'events': len(sent_at),
+            'connect_latencies': connect_latencies,
+            'memory_per_socket': memory_per_socket,
+            'latencies': latencies,
+            'expected': expected,
+            'received': received,
+            'dispatcher': notification_dispatcher.stats(),
+        }
+
+    @staticmethod
+    def set_status(order_id, status):
+        # A plain save so the normal signal -> on_commit -> dispatcher path runs
+        order = Order.objects.get(id=order_id)
+        order.status = status
+        order.save()
+
+    def print_report(self, report):
+        def ms(value):
+            return f'{value * 1000:.1f} ms'
+
+        connect = report['connect_latencies']
+        latencies = report['latencies']
+        dropped = report['expected'] - report['received']
+
+        self.stdout.write(f"🔌 Connect latency   p50 {ms(percentile(connect, 50))}  "
+                          f"p95 {ms(percentile(connect, 95))}  p99 {ms(percentile(connect, 99))}")
+        self.stdout.write(f"🧠 Memory / socket   {report['memory_per_socket'] / 1024:.1f} KiB (tracemalloc, in-process)")
+        self.stdout.write(f"📦 Events driven     {report['events']}")
+        self.stdout.write(f"⏱️  Delivery latency  p50 {ms(percentile(latencies, 50))}  "
+                          f"p95 {ms(percentile(latencies, 95))}  p99 {ms(percentile(latencies, 99))}")
+        self.stdout.write(f"📬 Delivered         {report['received']}/{report['expected']}")
+        self.stdout.write(f"🚚 Dispatcher        {report['dispatcher']}")
+
+        if dropped:
+            self.stdout.write(self.style.WARNING(f'⚠️ {dropped} messages dropped'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No messages dropped'))
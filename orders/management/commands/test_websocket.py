@@ -1,8 +1,7 @@
 from django.core.management.base import BaseCommand
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-from orders.models import Order
-from django.db.models import Q
+from orders.counters import available_order_counter
 
 
 class Command(BaseCommand):
@@ -10,12 +9,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         # Get pending orders count
-        pending_count = Order.objects.filter(
-            Q(status='pending') | 
-            Q(status='accepted') | 
-            Q(status='preparing') | 
-            Q(status='ready')
-        ).count()
+        pending_count = available_order_counter.reconcile()['total']
         
         self.stdout.write(f'📦 Current pending orders: {pending_count}')
         
@@ -55,6 +55,64 @@ class Order(models.Model):
     ]
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending', help_text="Payment processing status")
 
+    class Meta:
+        indexes = [
+            # A customer's orders newest first (orders.history)
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_recent_idx'),
+        ]
+
+    # Fields someone is notified about when they change (field name -> attribute)
+    TRACKED_FIELDS = {'status': 'status', 'rider': 'rider_id', 'payment_status': 'payment_status'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._tracked_values()
+        return instance
+
+    def _tracked_values(self):
+        # __dict__ so deferred fields don't trigger queries
+        return {name: self.__dict__.get(attname) for name, attname in self.TRACKED_FIELDS.items()}
+
+    def tracked_fields_in(self, update_fields):
+        """Tracked fields a save with ``update_fields`` writes (None: all of them)"""
+        if update_fields is None:
+            return set(self.TRACKED_FIELDS)
+        update_fields = set(update_fields)
+        return {name for name, attname in self.TRACKED_FIELDS.items() if {name, attname} & update_fields}
+
+    def changed_fields(self, update_fields=None):
+        """Tracked fields that differ from the database (all of them for a new order)"""
+        written = self.tracked_fields_in(update_fields)
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return written
+        current = self._tracked_values()
+        return {name for name in written if current[name] != loaded[name]}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Only what was written is now in the database
+        current = self._tracked_values()
+        loaded = getattr(self, '_loaded_values', None) or dict(current)
+        for name in self.tracked_fields_in(kwargs.get('update_fields')):
+            loaded[name] = current[name]
+        self._loaded_values = loaded
+
+class OrderStatusTransition(models.Model):
+    """One status change of an order (see orders.transitions)"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_transitions')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_transitions')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status} -> {self.to_status}"
+
 class OrderLine(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
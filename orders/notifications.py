@@ -0,0 +1,150 @@
+import json
+import logging
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .dispatch import notification_dispatcher
+
+logger = logging.getLogger(__name__)
+
+# Order fields a customer tracking screen cares about
+CUSTOMER_VISIBLE_FIELDS = frozenset({'status', 'rider', 'payment_status'})
+# ...and the restaurant dashboard (new orders are pushed whole regardless)
+RESTAURANT_VISIBLE_FIELDS = frozenset({'status'})
+
+
+class OrderChangeStats:
+    """
+    Per audience, how many order changes were pushed and how many were
+    skipped because nothing that audience sees had changed (e.g. a Stripe
+    webhook that only sets payment_status doesn't reach riders).
+    """
+
+    AUDIENCES = ('riders', 'customers', 'restaurants')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.changes = 0
+        self.notified = dict.fromkeys(self.AUDIENCES, 0)
+        self.avoided = dict.fromkeys(self.AUDIENCES, 0)
+
+    def record(self, **audiences):
+        """``record(riders=True, customers=False, restaurants=False)``"""
+        with self._lock:
+            self.changes += 1
+            for audience in self.AUDIENCES:
+                if audiences.get(audience):
+                    self.notified[audience] += 1
+                else:
+                    self.avoided[audience] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'changes': self.changes,
+                'notified': dict(self.notified),
+                'avoided': dict(self.avoided),
+            }
+
+
+# Shared per-process counters, reported by /orders/broadcast-stats/
+order_change_stats = OrderChangeStats()
+
+
+def order_group(order_id):
+    """Channel-layer group for everyone watching a single order"""
+    return f'order_{order_id}'
+
+
+def order_status_snapshot(order):
+    """Tracking payload for one order (same shape as /getOrderStatus/)"""
+    order_data = {
+        'id': order.id,
+        'token_number': order.token_number,
+        'status': order.status,
+        'total_amount': str(order.total_amount),
+        'payment_method': order.payment_method,
+        'payment_status': order.payment_status,
+        'created_at': order.created_at.isoformat(),
+    }
+
+    # Include assigned rider information if available
+    if order.rider:
+        order_data['assigned_rider_id'] = order.rider.id
+        order_data['assigned_rider_name'] = f"{order.rider.first_name} {order.rider.last_name}"
+
+    return order_data
+
+
+def notify_order_watchers(order):
+    """Push the current order snapshot to the order's tracking group"""
+    notification_dispatcher.group_send(
+        order_group(order.id),
+        {
+            'type': 'order_status_update',
+            'order': order_status_snapshot(order),
+        }
+    )
+
+
+def restaurant_group(restaurant_user_id):
+    """Channel-layer group for a restaurant's dashboard sockets"""
+    return f'restaurant_{restaurant_user_id}'
+
+
+def restaurant_order_payload(order):
+    """Full dashboard entry for one order (same shape as /get_pending_orders/)"""
+    from restaurant.serializers import OrderSerializer
+
+    order = (
+        type(order).objects
+        .select_related('customer__address', 'rider')
+        .prefetch_related('items__product')
+        .get(pk=order.pk)
+    )
+    return OrderSerializer(order).data
+
+
+def restaurant_order_delta(order):
+    """Just what changes after an order is placed: status and rider"""
+    from restaurant.serializers import OrderSerializer
+
+    serializer = OrderSerializer()
+    return {
+        'id': order.id,
+        'token_number': order.token_number,
+        'status': order.status,
+        'rider_name': serializer.get_rider_name(order),
+        'rider_phone': serializer.get_rider_phone(order),
+    }
+
+
+def notify_restaurant_new_order(order):
+    """Push a newly placed order to the restaurant's dashboard"""
+    try:
+        payload = restaurant_order_payload(order)
+    except Exception as e:
+        # e.g. a customer without an address; the dashboard still shows it on reload
+        logger.error(f"Could not serialize order {order.id} for restaurant dashboard: {e}")
+        return
+
+    # Plain JSON types so the Redis channel layer can encode the message
+    notification_dispatcher.group_send(
+        restaurant_group(order.restaurant_id),
+        {
+            'type': 'restaurant_order_created',
+            'order': json.loads(json.dumps(payload, cls=DjangoJSONEncoder)),
+        }
+    )
+
+
+def notify_restaurant_order_change(order):
+    """Push a status/rider change to the restaurant's dashboard"""
+    notification_dispatcher.group_send(
+        restaurant_group(order.restaurant_id),
+        {
+            'type': 'restaurant_order_updated',
+            'order': restaurant_order_delta(order),
+        }
+    )
@@ -0,0 +1,64 @@
+"""
+Turning a customer's cart into an order.
+
+Used by every checkout path (the mobile COD and Stripe endpoints and the web
+checkout). The cart rows are locked and read together with their products
+in one query, the lines are priced in memory from that read, and the order,
+its lines and the emptied cart are written in one transaction. Checkout is
+the same handful of statements however many items the cart holds, and two
+checkouts of the same cart (e.g. a double-tapped button) can't both turn it
+into an order: the second one finds it empty.
+"""
+import logging
+
+from django.db import transaction
+
+from menu.models import CartItem
+
+from .models import Order, OrderLine
+
+logger = logging.getLogger(__name__)
+
+
+def place_cart_order(customer, restaurant=None, pricing=None, **order_fields):
+    """
+    Create an order from ``customer``'s cart items for ``restaurant`` (a
+    ``Restaurant``; None: whatever is in the cart, for a single-restaurant
+    cart) and empty them. Returns the order, or None if there was nothing in
+    the cart.
+
+    ``order_fields`` go on the order as given; its restaurant is the cart
+    restaurant's user. ``pricing``, if given, is called with the items'
+    subtotal and returns more of them (e.g. fees that depend on it). Without
+    a ``total_amount`` the order total is the subtotal plus the rider and
+    small order fees.
+    """
+    with transaction.atomic():
+        items = CartItem.objects.filter(user=customer)
+        if restaurant is not None:
+            items = items.filter(restaurant=restaurant)
+        items = list(
+            items.select_related('product', 'restaurant').select_for_update(of=('self',)).order_by('id')
+        )
+        if not items:
+            return None
+
+        subtotal = sum(item.product.price * item.quantity for item in items)
+        if pricing is not None:
+            order_fields.update(pricing(subtotal))
+        order_fields.setdefault('status', 'pending')
+        order = Order(customer=customer, restaurant_id=items[0].restaurant.user_id, **order_fields)
+        if order.total_amount is None:
+            order.total_amount = subtotal + order.rider_fee + order.small_order_fee
+        order.save()
+
+        # bulk_create skips OrderLine.save(), so the subtotal is set here
+        OrderLine.objects.bulk_create([
+            OrderLine(order=order, product=item.product, quantity=item.quantity,
+                      subtotal=item.product.price * item.quantity)
+            for item in items
+        ])
+        CartItem.objects.filter(id__in=[item.id for item in items]).delete()
+
+    logger.info(f"Order {order.id} placed from {len(items)} cart items")
+    return order
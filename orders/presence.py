@@ -0,0 +1,209 @@
+"""
+Rider presence shared by every server process.
+
+Each open rider connection (WebSocket or SSE) is recorded in the cache with
+an expiry. Connections refresh themselves while they are alive, so a process
+that dies or a socket that vanishes without a clean disconnect simply ages
+out after ``ORDERS_PRESENCE_TTL_SECONDS``.
+
+Alongside the per-rider record there is one index per barangay zone mapping
+rider id -> (expires_at, is_available). "Who is online in barangay X" is a
+single cache read of that index, with no ``Rider`` table scan. Index updates
+are read-modify-write; a lost update between processes is repaired by the
+next refresh of the affected connection.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .zones import zone_area
+
+logger = logging.getLogger(__name__)
+
+RIDER_KEY = 'orders:presence:rider:{rider_id}'
+ZONE_KEY = 'orders:presence:zone:{zone}'
+ZONES_KEY = 'orders:presence:zones'
+
+
+def rider_is_available(rider_user_id):
+    """``Rider.is_available`` for a user, or None if the user is not a rider"""
+    from rider.models import Rider
+
+    return Rider.objects.filter(user_id=rider_user_id).values_list('is_available', flat=True).first()
+
+
+class RiderPresence:
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'ORDERS_PRESENCE_TTL_SECONDS', 90)
+
+    @property
+    def refresh_interval(self):
+        """How often a live connection should call ``touch``"""
+        return self.ttl / 3
+
+    # Connections
+
+    def connect(self, rider_id, connection_id, zone=''):
+        """
+        Register a connection. Returns False (and records nothing) when the
+        user has no rider profile.
+        """
+        available = rider_is_available(rider_id)
+        if available is None:
+            return False
+        self.touch(rider_id, connection_id, zone, available=available)
+        logger.info(f"Rider {rider_id} connected for real-time updates ({zone or 'city-wide'})")
+        return True
+
+    def touch(self, rider_id, connection_id, zone='', available=None):
+        """Heartbeat: keep a connection alive and record the rider's current zone."""
+        now = time.time()
+        expires_at = now + self.ttl
+        key = RIDER_KEY.format(rider_id=rider_id)
+        record = cache.get(key) or {}
+
+        connections = {
+            conn: expiry for conn, expiry in record.get('connections', {}).items() if expiry > now
+        }
+        connections[connection_id] = expires_at
+        if available is None:
+            available = record.get('available')
+            if available is None:
+                # Record expired; re-check the rider profile
+                available = rider_is_available(rider_id)
+                if available is None:
+                    return
+
+        old_zone = record.get('zone')
+        cache.set(key, {'connections': connections, 'zone': zone, 'available': available}, timeout=self.ttl)
+
+        if old_zone is not None and old_zone != zone:
+            self._index_remove(old_zone, rider_id)
+        self._index_put(zone, rider_id, expires_at, available, force=old_zone != zone)
+
+    def disconnect(self, rider_id, connection_id):
+        key = RIDER_KEY.format(rider_id=rider_id)
+        record = cache.get(key)
+        if record is None:
+            return
+
+        now = time.time()
+        connections = {
+            conn: expiry for conn, expiry in record['connections'].items()
+            if conn != connection_id and expiry > now
+        }
+        if connections:
+            # Still connected from another tab/device
+            record['connections'] = connections
+            cache.set(key, record, timeout=self.ttl)
+            return
+
+        cache.delete(key)
+        self._index_remove(record['zone'], rider_id)
+        logger.info(f"Rider {rider_id} disconnected")
+
+    def set_available(self, rider_id, available):
+        """Mirror a change of ``Rider.is_available`` for a connected rider."""
+        key = RIDER_KEY.format(rider_id=rider_id)
+        record = cache.get(key)
+        if record is None or record['available'] == available:
+            return
+        record['available'] = available
+        cache.set(key, record, timeout=self.ttl)
+        expires_at = max(record['connections'].values(), default=time.time())
+        self._index_put(record['zone'], rider_id, expires_at, available, force=True)
+
+    # Queries
+
+    def is_online(self, rider_id):
+        record = cache.get(RIDER_KEY.format(rider_id=rider_id))
+        if record is None:
+            return False
+        now = time.time()
+        return any(expiry > now for expiry in record['connections'].values())
+
+    def online_riders(self, zone=None, available_only=True):
+        """
+        Ids of riders online in ``zone`` ('' = riders without a zone, None =
+        everyone). By default only riders who are accepting orders.
+        """
+        if zone is None:
+            zones = cache.get(ZONES_KEY) or []
+        else:
+            zones = [zone]
+        return self._riders_in(zones, available_only)
+
+    def online_riders_in_area(self, zone, available_only=True):
+        """Riders who are offered orders from ``zone`` (the zone and its neighbours)"""
+        return self._riders_in(sorted(zone_area(zone)), available_only)
+
+    def stats(self):
+        zones = cache.get(ZONES_KEY) or []
+        indexes = cache.get_many([ZONE_KEY.format(zone=zone) for zone in zones])
+        now = time.time()
+        per_zone = {}
+        for zone in zones:
+            entries = indexes.get(ZONE_KEY.format(zone=zone)) or {}
+            per_zone[zone or 'city-wide'] = sum(
+                1 for expiry, available in entries.values() if expiry > now and available
+            )
+        return {
+            'ttl_seconds': self.ttl,
+            'online_available': sum(per_zone.values()),
+            'zones': per_zone,
+        }
+
+    # Zone index
+
+    def _riders_in(self, zones, available_only):
+        if not zones:
+            return []
+        keys = [ZONE_KEY.format(zone=zone) for zone in zones]
+        now = time.time()
+        riders = set()
+        for entries in cache.get_many(keys).values():
+            for rider_id, (expiry, available) in entries.items():
+                if expiry > now and (available or not available_only):
+                    riders.add(rider_id)
+        return sorted(riders)
+
+    def _index_put(self, zone, rider_id, expires_at, available, force=False):
+        key = ZONE_KEY.format(zone=zone)
+        entries = cache.get(key)
+        if entries is None:
+            entries = {}
+            self._remember_zone(zone)
+
+        current = entries.get(rider_id)
+        # Heartbeats only rewrite the index once half the TTL has been used up
+        if not force and current is not None and current[1] == available \
+                and current[0] - time.time() > self.ttl / 2:
+            return
+
+        now = time.time()
+        entries = {rid: entry for rid, entry in entries.items() if entry[0] > now}
+        entries[rider_id] = (expires_at, available)
+        cache.set(key, entries, timeout=None)
+
+    def _index_remove(self, zone, rider_id):
+        key = ZONE_KEY.format(zone=zone)
+        entries = cache.get(key)
+        if entries and rider_id in entries:
+            del entries[rider_id]
+            cache.set(key, entries, timeout=None)
+
+    def _remember_zone(self, zone):
+        zones = cache.get(ZONES_KEY) or []
+        if zone not in zones:
+            cache.set(ZONES_KEY, zones + [zone], timeout=None)
+
+
+rider_presence = RiderPresence()
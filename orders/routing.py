@@ -3,4 +3,6 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/orders/updates/$', consumers.OrderUpdatesConsumer.as_asgi()),
+    re_path(r'ws/restaurant/orders/$', consumers.RestaurantOrdersConsumer.as_asgi()),
+    re_path(r'ws/orders/(?P<token_number>[\w-]+)/$', consumers.OrderStatusConsumer.as_asgi()),
 ]
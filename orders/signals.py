@@ -1,77 +1,174 @@
+from functools import partial
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .broadcast import OrderCountBroadcaster
+from .counters import available_order_counter, is_available
+from .dispatch import notification_dispatcher
+from .feed import bump_feed_version, publish_pool_change
+from .notifications import (
+    CUSTOMER_VISIBLE_FIELDS, RESTAURANT_VISIBLE_FIELDS, notify_order_watchers, notify_restaurant_new_order,
+    notify_restaurant_order_change, order_change_stats,
+)
+from .presence import rider_presence
 from .models import Order
-import json
-import threading
-import time
+from .zones import forget_restaurant_zone, restaurant_zone, zone_area, zone_group
+from customer.models import Address
+from restaurant.models import Restaurant
+from rider.models import Rider
 import logging
 
 logger = logging.getLogger(__name__)
 
-# In-memory storage for connected riders (in production, use Redis or similar)
-connected_riders = set()
+# Channel-layer group every rider socket / SSE stream subscribes to
+ORDERS_GROUP = 'orders_updates'
 
-def add_rider_connection(rider_id):
-    """Add a rider to the connected riders set"""
-    connected_riders.add(rider_id)
-    logger.info(f"Rider {rider_id} connected for real-time updates")
-
-def remove_rider_connection(rider_id):
-    """Remove a rider from the connected riders set"""
-    connected_riders.discard(rider_id)
-    logger.info(f"Rider {rider_id} disconnected")
+# Order fields whose changes can move an order in or out of the rider pool
+RIDER_VISIBLE_FIELDS = frozenset({'status', 'rider'})
 
 def get_connected_riders():
-    """Get list of connected riders"""
-    return list(connected_riders)
-
-def notify_riders_of_order_change():
-    """Notify all connected riders of order count change via WebSocket"""
-    from .models import Order
-    from django.db.models import Q
-    from channels.layers import get_channel_layer
-    from asgiref.sync import async_to_sync
-    
-    # Get current pending orders count
-    pending_count = Order.objects.filter(
-        Q(status='pending') | 
-        Q(status='accepted') | 
-        Q(status='preparing') | 
-        Q(status='ready')
-    ).count()
-    
-    # Log the notification
-    logger.info(f"Notifying riders via WebSocket: {pending_count} orders available")
-    
-    # Send WebSocket message to all connected riders
-    channel_layer = get_channel_layer()
-    if channel_layer:
-        # Send to all rider groups (in a real app, you'd track connected riders)
-        # For now, we'll send to a general orders group
-        async_to_sync(channel_layer.group_send)(
-            'orders_updates',
-            {
-                'type': 'order_count_update',
-                'count': pending_count,
-                'message': f'{pending_count} orders available for pickup'
-            }
-        )
+    """Riders with a live connection who are accepting orders (all processes)"""
+    return rider_presence.online_riders()
+
+def rider_orders_group(zone=''):
+    """Group a rider listens on: their barangay zone, or the city-wide group"""
+    return zone_group(zone) if zone else ORDERS_GROUP
+
+def count_available_orders(zone=''):
+    """Count orders that riders can still pick up (in a zone's area if given)"""
+    if zone:
+        return available_order_counter.get_area(zone_area(zone))
+    return available_order_counter.get()
+
+
+# Shared per-process broadcaster; bursts of saves collapse into one count + send per group
+order_count_broadcaster = OrderCountBroadcaster(
+    ORDERS_GROUP, available_order_counter.get, available_order_counter.get_area
+)
+
+
+def notify_riders_of_order_change(zone=''):
+    """Notify riders of order count change via WebSocket (city-wide + the order's zone area)"""
+    order_count_broadcaster.schedule(zone)
+
+def was_in_rider_pool(order):
+    """Whether the order is in the rider pool as last loaded from (or saved to) the database"""
+    loaded = getattr(order, '_loaded_values', None)
+    if loaded is None:
+        return False
+    return is_available(loaded['status'], loaded['rider'])
 
 @receiver(post_save, sender=Order)
 def order_created_or_updated(sender, instance, created, **kwargs):
     """Triggered when an order is created or updated"""
+    # Order.save() only refreshes _loaded_values after post_save
+    was_available = False if created else was_in_rider_pool(instance)
+    now_available = is_available(instance.status, instance.rider_id)
+
+    # Only fields whose value actually changed (e.g. a Stripe webhook only
+    # changes payment_status; a proof-of-delivery upload changes nothing tracked)
+    changed = instance.changed_fields(kwargs.get('update_fields'))
+    notify_customer = not created and bool(CUSTOMER_VISIBLE_FIELDS & changed)
+    notify_restaurant = not created and bool(RESTAURANT_VISIBLE_FIELDS & changed)
+    notify_riders = created or bool(RIDER_VISIBLE_FIELDS & changed)
+    order_change_stats.record(
+        riders=notify_riders, customers=notify_customer, restaurants=created or notify_restaurant
+    )
+
+    if was_available == now_available and not (notify_customer or notify_restaurant or notify_riders or created):
+        return
+
     if created:
         logger.info(f"New order created: {instance.token_number} - Status: {instance.status}")
     else:
         logger.info(f"Order updated: {instance.token_number} - Status: {instance.status}")
-    
-    # Notify riders of the change
-    notify_riders_of_order_change()
+
+    # Wait for the commit: riders never see an order whose lines aren't
+    # written yet, and rolled-back saves never go out
+    transaction.on_commit(
+        partial(order_committed, instance, was_available, now_available, notify_customer, notify_riders,
+                created=created, notify_restaurant=notify_restaurant),
+        robust=True,
+    )
+
+def order_committed(order, was_available, now_available, notify_customer, notify_riders, created=False,
+                    deleted=False, notify_restaurant=False):
+    """
+    Runs on the request thread right after the commit, so it only touches
+    the cache and queues the rest by id: payloads are built on the
+    notification worker (deliver_order_change) and the response doesn't
+    wait for them.
+    """
+    if was_available != now_available:
+        bump_feed_version()
+    notification_dispatcher.run(
+        deliver_order_change, order.pk, was_available, now_available, notify_customer, notify_riders,
+        created, order if deleted else None, notify_restaurant,
+    )
+
+def deliver_order_change(order_id, was_available, now_available, notify_customer, notify_riders, created=False,
+                         deleted_order=None, notify_restaurant=False):
+    """Update counters and send notifications for a committed order change (on the notification worker)"""
+    # A deleted order can't be reloaded; its in-memory copy is all there is
+    order = deleted_order or Order.objects.select_related('rider').filter(pk=order_id).first()
+    if order is None:
+        return
+    send_order_change(
+        order, was_available, now_available, notify_customer, notify_riders,
+        created=created, deleted=deleted_order is not None, notify_restaurant=notify_restaurant,
+    )
+
+def send_order_change(order, was_available, now_available, notify_customer, notify_riders, created=False,
+                      deleted=False, notify_restaurant=False):
+    zone = restaurant_zone(order.restaurant_id)
+
+    if was_available != now_available:
+        available_order_counter.adjust(int(now_available) - int(was_available), zone)
+        # Riders patch their local order list instead of re-fetching it
+        publish_pool_change(order, was_available, now_available)
+
+    if notify_customer:
+        notify_order_watchers(order)
+
+    # The kitchen gets the whole order once, then status deltas
+    if created:
+        notify_restaurant_new_order(order)
+    elif notify_restaurant and not deleted:
+        notify_restaurant_order_change(order)
+
+    if notify_riders:
+        notify_riders_of_order_change(zone)
 
 @receiver(post_delete, sender=Order)
 def order_deleted(sender, instance, **kwargs):
     """Triggered when an order is deleted"""
     logger.info(f"Order deleted: {instance.token_number}")
-    
-    # Notify riders of the change
-    notify_riders_of_order_change()
+    transaction.on_commit(
+        partial(order_committed, instance, was_in_rider_pool(instance), False, False, True,
+                deleted=True),
+        robust=True,
+    )
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_zone_changed(sender, instance, **kwargs):
+    """A restaurant's barangay may have changed; drop its cached zone"""
+    forget_restaurant_zone(instance.user_id)
+    # Per-zone counts may now be attributed to the wrong zone
+    available_order_counter.invalidate()
+    # The feed shows restaurant names and barangays
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Address)
+@receiver(post_delete, sender=Address)
+def customer_address_changed(sender, instance, **kwargs):
+    """The feed shows the customer's street and barangay"""
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Rider)
+def rider_availability_changed(sender, instance, **kwargs):
+    """Keep the presence registry in step with the rider's online/offline toggle"""
+    rider_presence.set_available(instance.user_id, instance.is_available)
@@ -1,3 +1,405 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from customer.models import Address
+from menu.models import CartItem, Product
+from restaurant.models import Restaurant
+from users.models import User
+
+from .broadcast import OrderCountBroadcaster
+from .claims import ALREADY_YOURS, CLAIMED, NOT_CLAIMABLE, TAKEN, claim_order
+from .counters import available_order_counter
+from .dispatch import notification_dispatcher
+from .history import order_history_page
+from .models import Order, OrderLine, OrderStatusTransition
+from .notifications import order_change_stats
+from .placement import place_cart_order
+from .routing import websocket_urlpatterns
+from .transitions import CONFLICT, DONE, INVALID, NOT_FOUND, NOT_YOURS, UNCHANGED, transition_order
+
+
+class OrderCountBroadcasterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_count_is_skipped_across_processes(self):
+        count = {'value': 5}
+        # Two broadcasters stand in for two server processes sharing the cache
+        first = OrderCountBroadcaster('orders_updates', lambda: count['value'], window=0)
+        second = OrderCountBroadcaster('orders_updates', lambda: count['value'], window=0)
+
+        with mock.patch.object(OrderCountBroadcaster, 'send') as send:
+            first.schedule()
+            second.schedule()
+            self.assertEqual(send.call_count, 1)
+
+            count['value'] = 6
+            second.schedule()
+            # The first process last sent 5, but riders have seen 6 since
+            count['value'] = 5
+            first.schedule()
+
+        self.assertEqual([call.args[1] for call in send.call_args_list], [5, 6, 5])
+        self.assertEqual(second.unchanged, 1)
+
+
+class AvailableOrderCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        Address.objects.create(user=cls.customer, street='Street', barangay='Basak', label='home')
+        cls.poblacion = User.objects.create(username='poblacion', role='restaurant')
+        Restaurant.objects.create(user=cls.poblacion, name='One', address='a', barangay='Poblacion', phone='1')
+        cls.basak = User.objects.create(username='basak', role='restaurant')
+        Restaurant.objects.create(user=cls.basak, name='Two', address='b', barangay='Basak', phone='2')
+        cls.rider = User.objects.create(username='rider', role='rider')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_order(self, restaurant, **fields):
+        # The signals only adjust the counter on commit, which never happens here
+        return Order.objects.create(customer=self.customer, restaurant=restaurant, total_amount=100, **fields)
+
+    def test_reconcile_counts_the_pool_per_zone(self):
+        self.create_order(self.poblacion)
+        self.create_order(self.poblacion, status='ready')
+        self.create_order(self.basak)
+        self.create_order(self.basak, status='delivered')
+        self.create_order(self.basak, rider=self.rider, status='assigned')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(available_order_counter.get(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(available_order_counter.get(), 3)
+            self.assertEqual(available_order_counter.get_area({'poblacion'}), 2)
+            self.assertEqual(available_order_counter.get_area({'poblacion', 'basak'}), 3)
+
+    def test_adjust_moves_the_cached_counts(self):
+        self.create_order(self.poblacion)
+        self.create_order(self.basak)
+        available_order_counter.get()
+
+        with self.assertNumQueries(0):
+            available_order_counter.adjust(1, 'basak')
+            available_order_counter.adjust(-1, 'poblacion')
+            self.assertEqual(available_order_counter.get(), 2)
+            self.assertEqual(available_order_counter.get_area({'basak'}), 2)
+            self.assertEqual(available_order_counter.get_area({'poblacion'}), 0)
+
+    def test_missing_or_stale_counts_are_rebuilt(self):
+        self.create_order(self.poblacion)
+        # Nothing cached yet: the adjustment is dropped for a fresh count
+        available_order_counter.adjust(5, 'poblacion')
+        self.assertEqual(available_order_counter.get(), 1)
+
+        # A write that bypassed the signals is corrected on the next reconciliation
+        Order.objects.update(status='cancelled')
+        self.assertEqual(available_order_counter.get(), 1)
+        available_order_counter.invalidate()
+        self.assertEqual(available_order_counter.get(), 0)
+        self.assertEqual(available_order_counter.get_area({'poblacion'}), 0)
+
+
+class OrderStatusConsumerTests(TransactionTestCase):
+    # The consumer reads the order from another thread, so the data must be committed
+
+    def setUp(self):
+        cache.clear()
+        customer = User.objects.create(username='customer', role='customer')
+        restaurant = User.objects.create(username='resto', role='restaurant')
+        Restaurant.objects.create(user=restaurant, name='Resto', address='a', barangay='Poblacion', phone='1')
+        # Outside the test's event loop the jobs would go to the private worker thread
+        with mock.patch.object(notification_dispatcher, 'run', lambda job, *args: job(*args)):
+            self.order = Order.objects.create(customer=customer, restaurant=restaurant, total_amount=129)
+        self.addCleanup(notification_dispatcher.close)
+
+    def communicator(self, token_number):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/orders/{token_number}/')
+        communicator.scope['user'] = AnonymousUser()
+        return communicator
+
+    async def test_snapshot_on_connect_then_changes_pushed(self):
+        communicator = self.communicator(self.order.token_number)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'order_status')
+        self.assertEqual(snapshot['order']['id'], self.order.id)
+        self.assertEqual(snapshot['order']['status'], 'pending')
+
+        # A committed save reaches the socket through the notification dispatcher
+        self.order.status = 'accepted'
+        await database_sync_to_async(self.order.save)()
+        await notification_dispatcher.drain()
+        update = await communicator.receive_json_from(timeout=2)
+        self.assertEqual(update['order']['status'], 'accepted')
+
+        await communicator.disconnect()
+
+    async def test_unknown_order_is_refused(self):
+        communicator = self.communicator('nope00')
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+
+class ClaimOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        cls.restaurant = User.objects.create(username='resto', role='restaurant')
+        cls.riders = [User.objects.create(username=f'rider_{i}', role='rider') for i in range(5)]
+
+    def setUp(self):
+        self.order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_amount=129)
+
+    def test_one_winner(self):
+        outcomes = [claim_order(self.order.id, rider) for rider in self.riders]
+        self.assertEqual(outcomes, [CLAIMED, TAKEN, TAKEN, TAKEN, TAKEN])
+        self.assertEqual(claim_order(self.order.id, self.riders[0]), ALREADY_YOURS)
+
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.rider), ('assigned', self.riders[0]))
+        self.assertEqual(OrderStatusTransition.objects.filter(order=self.order).count(), 1)
+
+    def test_claim_is_one_update_and_one_insert(self):
+        # Savepoint, UPDATE, INSERT, release
+        with self.assertNumQueries(4):
+            self.assertEqual(claim_order(self.order.id, self.riders[0]), CLAIMED)
+
+    def test_history_records_the_status_it_was_claimed_from(self):
+        self.assertEqual(transition_order(self.order.id, 'preparing', self.restaurant), DONE)
+        claim_order(self.order.id, self.riders[0])
+
+        history = OrderStatusTransition.objects.filter(order=self.order).values_list(
+            'from_status', 'to_status', 'changed_by'
+        )
+        self.assertEqual(list(history), [
+            ('pending', 'preparing', self.restaurant.id),
+            ('preparing', 'assigned', self.riders[0].id),
+        ])
+
+    def test_lost_claims_say_why(self):
+        cancelled = Order.objects.create(
+            customer=self.customer, restaurant=self.restaurant, total_amount=129, status='cancelled'
+        )
+        self.assertEqual(claim_order(cancelled.id, self.riders[0]), NOT_CLAIMABLE)
+        self.assertEqual(claim_order(0, self.riders[0]), NOT_FOUND)
+        self.assertFalse(OrderStatusTransition.objects.exists())
+
+
+class TransitionOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        cls.restaurant = User.objects.create(username='resto', role='restaurant')
+        cls.rider = User.objects.create(username='rider', role='rider')
+
+    def setUp(self):
+        self.order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_amount=129)
+
+    def history(self):
+        return list(OrderStatusTransition.objects.filter(order=self.order).values_list(
+            'from_status', 'to_status', 'changed_by'
+        ))
+
+    def test_move_is_recorded(self):
+        self.assertEqual(transition_order(self.order.id, 'accepted', self.restaurant), DONE)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'accepted')
+        self.assertEqual(self.history(), [('pending', 'accepted', self.restaurant.id)])
+
+    def test_repeated_move_is_unchanged(self):
+        transition_order(self.order.id, 'accepted', self.restaurant)
+        self.assertEqual(transition_order(self.order.id, 'accepted', self.restaurant), UNCHANGED)
+        self.assertEqual(len(self.history()), 1)
+
+    def test_invalid_moves(self):
+        # Not a status the rider sets, and not reachable from 'delivered'
+        self.assertEqual(transition_order(self.order.id, 'accepted', self.rider), INVALID)
+        Order.objects.filter(pk=self.order.id).update(status='delivered')
+        self.assertEqual(transition_order(self.order.id, 'cancelled', self.restaurant), INVALID)
+        self.assertEqual(transition_order(self.order.id, 'ready', self.restaurant, expected='pending'), INVALID)
+        self.assertEqual(self.history(), [])
+
+    def test_other_restaurants_order(self):
+        other = User.objects.create(username='other', role='restaurant')
+        self.assertEqual(transition_order(self.order.id, 'cancelled', other), NOT_YOURS)
+        self.assertEqual(transition_order(0, 'cancelled', self.restaurant), NOT_FOUND)
+
+    def test_status_that_keeps_changing_is_a_conflict(self):
+        # Every compare-and-set loses to a concurrent writer
+        with mock.patch('orders.transitions.apply_transition', return_value=False) as apply:
+            self.assertEqual(transition_order(self.order.id, 'cancelled', self.restaurant), CONFLICT)
+        self.assertEqual(apply.call_count, 3)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+        self.assertEqual(self.history(), [])
+
+
+class OrderChangeAudienceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        cls.restaurant = User.objects.create(username='resto', role='restaurant')
+
+    def setUp(self):
+        cache.clear()
+        self.order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_amount=129)
+        # Deliver on the test thread instead of the notification worker
+        patcher = mock.patch.object(notification_dispatcher, 'run', lambda job, *args: job(*args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.notified = {}
+        for name in ('notify_riders_of_order_change', 'notify_order_watchers', 'notify_restaurant_order_change'):
+            patcher = mock.patch(f'orders.signals.{name}')
+            self.notified[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def save(self, **fields):
+        order = Order.objects.get(pk=self.order.pk)
+        for name, value in fields.items():
+            setattr(order, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    def test_payment_status_only_reaches_the_customer(self):
+        before = order_change_stats.stats()
+        self.save(payment_status='paid')
+
+        self.notified['notify_riders_of_order_change'].assert_not_called()
+        self.notified['notify_restaurant_order_change'].assert_not_called()
+        self.notified['notify_order_watchers'].assert_called_once()
+        after = order_change_stats.stats()
+        self.assertEqual(after['avoided']['riders'], before['avoided']['riders'] + 1)
+        self.assertEqual(after['notified']['customers'], before['notified']['customers'] + 1)
+
+    def test_status_change_reaches_everyone(self):
+        self.save(status='cancelled')
+        for notify in self.notified.values():
+            notify.assert_called_once()
+
+    def test_save_without_changes_sends_nothing(self):
+        self.save(total_amount=129)
+        for notify in self.notified.values():
+            notify.assert_not_called()
+
+
+class OrderHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        restaurant = User.objects.create(username='resto', role='restaurant')
+        Restaurant.objects.create(user=restaurant, name='Resto', address='a', barangay='Poblacion', phone='1')
+        cls.restaurant = restaurant
+        cls.active = Order.objects.create(customer=cls.customer, restaurant=restaurant, total_amount=100)
+        cls.finished = [
+            Order.objects.create(customer=cls.customer, restaurant=restaurant, total_amount=100, status='delivered')
+            for _ in range(5)
+        ]
+
+    def fetch(self, **data):
+        return self.client.post(
+            reverse('core:get_customer_orders'), {'user_id': self.customer.id, **data}, content_type='application/json'
+        )
+
+    def add_finished_orders(self, count):
+        for _ in range(count):
+            Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_amount=100, status='cancelled')
+
+    def test_pages_follow_the_cursor(self):
+        newest_first = [order.id for order in reversed(self.finished)]
+        page, cursor = order_history_page(self.customer.id, limit=2)
+        self.assertEqual([entry['id'] for entry in page], newest_first[:2])
+        self.assertEqual(page[0]['restaurant_name'], 'Resto')
+        page, cursor = order_history_page(self.customer.id, limit=2, cursor=cursor)
+        self.assertEqual([entry['id'] for entry in page], newest_first[2:4])
+        page, cursor = order_history_page(self.customer.id, limit=2, cursor=cursor)
+        self.assertEqual([entry['id'] for entry in page], newest_first[4:])
+        self.assertIsNone(cursor)
+
+    def test_queries_do_not_grow_with_the_history(self):
+        # User lookup, active orders, one history page
+        with self.assertNumQueries(3):
+            data = self.fetch(limit=3).json()
+        self.assertEqual(len(data['recent_orders']), 3)
+        self.assertEqual([entry['id'] for entry in data['active_orders']], [self.active.id])
+
+        self.add_finished_orders(30)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.fetch(limit=3).json()['recent_orders']), 3)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.fetch().json()['recent_orders']), 35)
+
+    def test_whole_history_unless_paged(self):
+        data = self.fetch().json()
+        self.assertEqual(len(data['recent_orders']), 5)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_bad_limits_are_rejected(self):
+        for limit in (0, -1, 'ten'):
+            with self.subTest(limit=limit):
+                response = self.fetch(limit=limit)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+        self.assertEqual(self.fetch(cursor='nope').status_code, 400)
+
+
+class PlaceCartOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        cls.owner = User.objects.create(username='resto', role='restaurant')
+        cls.restaurant = Restaurant.objects.create(
+            user=cls.owner, name='Resto', address='a', barangay='Poblacion', phone='1'
+        )
+        cls.products = [
+            Product.objects.create(restaurant=cls.restaurant, name=f'Dish {i}', price='50.00') for i in range(10)
+        ]
+
+    def fill_cart(self, count):
+        for product in self.products[:count]:
+            CartItem.objects.create(user=self.customer, restaurant=self.restaurant, product=product, quantity=2)
+
+    def test_statements_do_not_grow_with_the_cart(self):
+        # Savepoint, cart read, order, lines, cart delete, release
+        self.fill_cart(1)
+        with self.assertNumQueries(6):
+            place_cart_order(self.customer, total_amount=100)
+        self.fill_cart(10)
+        with self.assertNumQueries(6):
+            order = place_cart_order(self.customer, total_amount=1000)
+
+        self.assertEqual(OrderLine.objects.filter(order=order).count(), 10)
+        self.assertFalse(CartItem.objects.filter(user=self.customer).exists())
+
+    def test_lines_are_priced_from_the_cart(self):
+        self.fill_cart(3)
+        order = place_cart_order(self.customer, pricing=lambda subtotal: {'total_amount': subtotal + 39})
+        self.assertEqual(order.total_amount, Decimal('339.00'))
+        self.assertEqual(order.restaurant_id, self.owner.id)
+        self.assertEqual(
+            list(OrderLine.objects.filter(order=order).values_list('quantity', 'subtotal')),
+            [(2, Decimal('100.00'))] * 3,
+        )
+        # Checking out again finds the cart empty
+        self.assertIsNone(place_cart_order(self.customer))
+
+    def test_failed_write_leaves_the_cart_untouched(self):
+        self.fill_cart(3)
+        with mock.patch.object(OrderLine.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                place_cart_order(self.customer, total_amount=300)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(user=self.customer).count(), 3)
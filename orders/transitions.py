@@ -0,0 +1,191 @@
+"""
+Order status changes.
+
+``TRANSITIONS`` is the graph of allowed status moves. Every move is a
+compare-and-set: one ``UPDATE ... WHERE status=<expected>`` touching only the
+changed columns, written together with an ``OrderStatusTransition`` row. A
+restaurant and a rider acting on the same order at once can't overwrite each
+other; whoever loses sees the status the other one set. The UPDATE bypasses
+post_save, so the same after-commit notifications are sent from here.
+"""
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .counters import is_available
+from .dispatch import notification_dispatcher
+from .models import Order, OrderStatusTransition
+from .notifications import order_change_stats
+
+logger = logging.getLogger(__name__)
+
+# Transition outcomes
+DONE = 'done'
+UNCHANGED = 'unchanged'  # already in the target status, e.g. a retried request
+INVALID = 'invalid'  # not allowed from the current status, or not by this user
+CONFLICT = 'conflict'  # the status kept changing underneath us
+NOT_YOURS = 'not_yours'
+NOT_FOUND = 'not_found'
+
+TRANSITIONS = {
+    'pending': {'accepted', 'preparing', 'assigned', 'cancelled'},
+    'accepted': {'preparing', 'assigned', 'cancelled'},
+    'preparing': {'ready', 'assigned', 'cancelled'},
+    # A rider may claim an order while the kitchen is still working on it
+    'assigned': {'preparing', 'ready', 'otw', 'arrived', 'delivered', 'cancelled'},
+    'ready': {'assigned', 'otw', 'arrived', 'delivered', 'cancelled'},
+    'otw': {'arrived', 'delivered'},
+    'arrived': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+# Which statuses each role may set, and which order field ties them to it.
+# Riders get 'assigned' through orders.claims.
+ROLE_TARGETS = {
+    'restaurant': {'accepted', 'preparing', 'ready', 'delivered', 'cancelled'},
+    'rider': {'otw', 'arrived', 'delivered'},
+}
+ROLE_FIELDS = {'restaurant': 'restaurant_id', 'rider': 'rider_id'}
+
+MAX_ATTEMPTS = 3
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def sources_for(to_status):
+    """Statuses an order can move to ``to_status`` from"""
+    return {status for status, targets in TRANSITIONS.items() if to_status in targets}
+
+
+def transition_order(order_id, to_status, user, expected=None, **changes):
+    """
+    Move an order to ``to_status`` on behalf of its restaurant or rider.
+
+    ``expected`` limits the move to one current status. When only one current
+    status is possible the move is a single UPDATE; otherwise the current
+    status is read first and the UPDATE is made conditional on it. Extra
+    ``changes`` (e.g. ``proof_of_delivery_url``) are written in the same
+    UPDATE. Returns one of the outcomes above.
+    """
+    role = getattr(user, 'role', None)
+    if role not in ROLE_TARGETS:
+        return NOT_FOUND
+    if to_status not in ROLE_TARGETS[role]:
+        return INVALID
+
+    sources = sources_for(to_status)
+    if expected is not None:
+        sources &= {expected}
+    if not sources:
+        return INVALID
+
+    owner_field = ROLE_FIELDS[role]
+    current = next(iter(sources)) if len(sources) == 1 else None
+    for _ in range(MAX_ATTEMPTS):
+        if current is None:
+            current, outcome = _current_status(order_id, to_status, sources, owner_field, user)
+            if outcome is not None:
+                return outcome
+        if apply_transition(order_id, current, to_status, user, filters={owner_field: user.id}, changes=changes):
+            return DONE
+        current = None
+
+    logger.warning(f"Order {order_id} kept changing status; gave up moving it to {to_status}")
+    return CONFLICT
+
+
+def _current_status(order_id, to_status, sources, owner_field, user):
+    """``(status, None)`` if the move can go ahead from it, else ``(None, outcome)``"""
+    row = Order.objects.filter(pk=order_id).values_list('status', owner_field).first()
+    if row is None:
+        return None, NOT_FOUND
+    status, owner_id = row
+    if owner_id != user.id:
+        return None, NOT_YOURS
+    if status == to_status:
+        return None, UNCHANGED
+    if status not in sources:
+        return None, INVALID
+    return status, None
+
+
+def apply_transition(order_id, from_status, to_status, user=None, filters=None, changes=None):
+    """
+    The compare-and-set itself: move the order if it is still in
+    ``from_status`` (and matches ``filters``), record it and schedule the
+    notifications. Returns whether the order moved.
+    """
+    changes = changes or {}
+    with transaction.atomic():
+        moved = Order.objects.filter(pk=order_id, status=from_status, **(filters or {})).update(
+            status=to_status, **changes
+        )
+        if not moved:
+            return False
+        rider_assigned = 'rider' in changes or 'rider_id' in changes
+        record_transition(order_id, from_status, to_status, user, rider_assigned)
+
+    logger.info(f"Order {order_id}: {from_status} -> {to_status}")
+    return True
+
+
+def record_transition(order_id, from_status, to_status, user=None, rider_assigned=False):
+    """
+    Write the history row for a move the caller's UPDATE just made (inside
+    its transaction) and schedule the notifications. A ``from_status`` of
+    None records ``last_recorded_status``, for a move out of the rider pool
+    that didn't read the status first (orders.claims).
+    """
+    OrderStatusTransition.objects.create(
+        order_id=order_id,
+        from_status=last_recorded_status(order_id) if from_status is None else from_status,
+        to_status=to_status,
+        changed_by=user,
+    )
+    transaction.on_commit(
+        partial(transition_committed, order_id, from_status, rider_assigned), robust=True
+    )
+
+
+def last_recorded_status(order_id):
+    """
+    SQL for the status an order is in according to its history: where its
+    last transition took it, or the status every order starts in. Only
+    valid before the new row is written, and as long as status changes go
+    through this module.
+    """
+    last = OrderStatusTransition.objects.filter(order_id=order_id).order_by('-id').values('to_status')[:1]
+    return Coalesce(Subquery(last), Value(Order._meta.get_field('status').default))
+
+
+def transition_committed(order_id, from_status, rider_assigned=False):
+    """Right after the commit, on the request thread: queue the notifications by id"""
+    # A status change is news to every audience
+    order_change_stats.record(riders=True, customers=True, restaurants=True)
+    notification_dispatcher.run(deliver_transition, order_id, from_status, rider_assigned)
+
+
+def deliver_transition(order_id, from_status, rider_assigned=False):
+    """On the notification worker: reload the order and send what the transition changed"""
+    from .feed import bump_feed_version
+    from .signals import send_order_change
+
+    order = Order.objects.select_related('rider').filter(pk=order_id).first()
+    if order is None:
+        return
+    if from_status is None:
+        # A claim; it only matches orders in the rider pool
+        was_available = True
+    else:
+        # Only claims set the rider, and they only match unassigned orders
+        was_available = is_available(from_status, None if rider_assigned else order.rider_id)
+    now_available = is_available(order.status, order.rider_id)
+    if was_available != now_available:
+        bump_feed_version()
+    send_order_change(order, was_available, now_available, True, True, notify_restaurant=True)
@@ -7,4 +7,5 @@ urlpatterns = [
     path('ready/', views.mark_order_ready, name='mark_order_ready'),
     path('pending-count/', views.get_pending_orders_count, name='get_pending_orders_count'),
     path('sse-stream/', views.orders_sse_stream, name='orders_sse_stream'),
+    path('broadcast-stats/', views.broadcast_stats, name='broadcast_stats'),
 ]
@@ -1,14 +1,21 @@
 from django.shortcuts import render
 from rest_framework import viewsets
 from .models import Order, OrderLine
+from .counters import available_order_counter
+from .dispatch import notification_dispatcher
+from .transitions import DONE, NOT_FOUND, NOT_YOURS, UNCHANGED, transition_order
 from .serializers.serializers import OrderSerializer, OrderLineSerializer
 from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.csrf import csrf_exempt
+import asyncio
 import json
 import time
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -22,48 +29,28 @@ class OrderLineViewSet(viewsets.ModelViewSet):
 @require_POST
 @login_required
 def prepare_order(request):
-    order_id = request.POST.get('order_id')
+    return restaurant_transition(request, 'pending', 'preparing', 'Invalid status')
 
-    try:
-        order = Order.objects.get(id=order_id, restaurant=request.user)
-        if order.status == 'pending':
-            order.status = 'preparing'
-            order.save()
-            return JsonResponse({'success': True, 'new_status': 'preparing'})
-        return JsonResponse({'success': False, 'message': 'Invalid status'})
-    except Order.DoesNotExist:
-        return JsonResponse({'success': False, 'message': 'Order not found'})
-    
 
 @require_POST
 @login_required
 def mark_order_arrived(request):
-    order_id = request.POST.get('order_id')
+    return restaurant_transition(request, 'ready', 'delivered')
 
-    try:
-        order = Order.objects.get(id=order_id, restaurant=request.user)
-        if order.status == 'ready':
-            order.status = 'delivered'
-            order.save()
-            return JsonResponse({'success': True, 'new_status': 'delivered'})
-        return JsonResponse({'success': False, 'message': 'Invalid status transition'})
-    except Order.DoesNotExist:
-        return JsonResponse({'success': False, 'message': 'Order not found'})
-    
 @require_POST
 @login_required
 def mark_order_ready(request):
-    order_id = request.POST.get('order_id')
+    return restaurant_transition(request, 'preparing', 'ready')
 
-    try:
-        order = Order.objects.get(id=order_id, restaurant=request.user)
-        if order.status == 'preparing':
-            order.status = 'ready'
-            order.save()
-            return JsonResponse({'success': True, 'new_status': 'ready'})
-        return JsonResponse({'success': False, 'message': 'Invalid status transition'})
-    except Order.DoesNotExist:
+
+def restaurant_transition(request, expected, new_status, invalid_message='Invalid status transition'):
+    """Move one of the restaurant's orders from ``expected`` to ``new_status``"""
+    result = transition_order(request.POST.get('order_id'), new_status, request.user, expected=expected)
+    if result in (DONE, UNCHANGED):
+        return JsonResponse({'success': True, 'new_status': new_status})
+    if result in (NOT_FOUND, NOT_YOURS):
         return JsonResponse({'success': False, 'message': 'Order not found'})
+    return JsonResponse({'success': False, 'message': invalid_message})
 
 
 @require_GET
@@ -72,16 +59,12 @@ def get_pending_orders_count(request):
     """
     Get count of orders that are available for riders to pick up:
     - pending, accepted, preparing, ready
+    - no rider assigned yet
     - NOT assigned, otw, cancelled, delivered
     """
     try:
         # Count orders that are available for riders
-        pending_count = Order.objects.filter(
-            Q(status='pending') | 
-            Q(status='accepted') | 
-            Q(status='preparing') | 
-            Q(status='ready')
-        ).count()
+        pending_count = available_order_counter.get()
         
         return JsonResponse({
             'success': True,
@@ -98,64 +81,98 @@ def get_pending_orders_count(request):
 
 @csrf_exempt
 @login_required
-def orders_sse_stream(request):
+async def orders_sse_stream(request):
     """
-    Server-Sent Events endpoint for real-time order count updates
+    Server-Sent Events endpoint for real-time order count updates.
+
+    The stream subscribes to the same channel-layer group as
+    ``OrderUpdatesConsumer`` (the rider's barangay zone, or ``orders_updates``),
+    so it only wakes up when ``notify_riders_of_order_change`` broadcasts (or
+    when a heartbeat is due) and never holds a worker thread while idle.
     """
-    from .signals import add_rider_connection, remove_rider_connection
-    
-    def event_stream():
-        from .signals import get_latest_notification
-        
-        rider_id = request.user.id
-        
-        # Add rider to connected list
-        add_rider_connection(rider_id)
-        
+    from .presence import rider_presence
+    from .signals import count_available_orders, rider_orders_group
+    from .zones import rider_zone
+
+    notification_dispatcher.attach()
+    user = await request.auser()
+    rider_id = user.id
+    zone = await database_sync_to_async(rider_zone)(rider_id, request.GET.get('barangay'))
+    orders_group = rider_orders_group(zone)
+    channel_layer = get_channel_layer()
+    heartbeat_interval = getattr(settings, 'ORDERS_SSE_HEARTBEAT_SECONDS', 30)
+    presence_interval = rider_presence.refresh_interval
+
+    def sse_event(payload):
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def event_stream():
+        channel_name = await channel_layer.new_channel()
+        await channel_layer.group_add(orders_group, channel_name)
+        await database_sync_to_async(rider_presence.connect)(rider_id, channel_name, zone)
+        last_seen = time.monotonic()
+
         try:
             # Send initial count
-            initial_count = Order.objects.filter(
-                Q(status='pending') | 
-                Q(status='accepted') | 
-                Q(status='preparing') | 
-                Q(status='ready')
-            ).count()
-            
-            yield f"data: {json.dumps({'type': 'order_count', 'count': initial_count})}\n\n"
-            
-            last_notification_time = time.time()
-            
-            # Keep connection alive and check for updates
+            initial_count = await database_sync_to_async(count_available_orders)(zone)
+            yield sse_event({'type': 'order_count', 'count': initial_count})
+            last_heartbeat = time.monotonic()
+
             while True:
-                # Check for new notifications every 2 seconds
-                latest_notification = get_latest_notification()
-                if latest_notification and latest_notification.get('timestamp', 0) > last_notification_time:
-                    yield f"data: {json.dumps(latest_notification)}\n\n"
-                    last_notification_time = latest_notification.get('timestamp', time.time())
-                
-                # Send heartbeat every 30 seconds
-                if int(time.time()) % 30 == 0:
-                    yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': time.time()})}\n\n"
-                
-                time.sleep(2)  # Check for updates every 2 seconds
-                
-        except GeneratorExit:
-            # Rider disconnected
-            remove_rider_connection(rider_id)
-        except Exception as e:
-            print(f"SSE Error for rider {rider_id}: {e}")
-            remove_rider_connection(rider_id)
-    
+                # Keep presence alive even when busy traffic means no heartbeat is due
+                if time.monotonic() - last_seen >= presence_interval:
+                    await database_sync_to_async(rider_presence.touch)(rider_id, channel_name, zone)
+                    last_seen = time.monotonic()
+
+                try:
+                    message = await asyncio.wait_for(
+                        channel_layer.receive(channel_name),
+                        timeout=min(heartbeat_interval, presence_interval),
+                    )
+                except asyncio.TimeoutError:
+                    if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                        yield sse_event({'type': 'heartbeat', 'timestamp': time.time()})
+                        last_heartbeat = time.monotonic()
+                    continue
+
+                if message.get('type') == 'order_count_update':
+                    yield sse_event({
+                        'type': 'order_count_update',
+                        'count': message['count'],
+                        'message': message.get('message', f"{message['count']} orders available for pickup"),
+                    })
+                elif message.get('type') == 'order_feed_event':
+                    # Already JSON-encoded once for every subscriber
+                    yield f"data: {message['text']}\n\n"
+        finally:
+            # Rider disconnected (the server cancels the generator)
+            await channel_layer.group_discard(orders_group, channel_name)
+            await database_sync_to_async(rider_presence.disconnect)(rider_id, channel_name)
+
     response = StreamingHttpResponse(
         event_stream(),
         content_type='text/event-stream'
     )
     response['Cache-Control'] = 'no-cache'
-    response['Connection'] = 'keep-alive'
+    response['X-Accel-Buffering'] = 'no'
     response['Access-Control-Allow-Origin'] = '*'
     response['Access-Control-Allow-Headers'] = 'Cache-Control'
-    
+
     return response
 
 
+@require_GET
+@staff_member_required
+def broadcast_stats(request):
+    """Counters for the rider order-count broadcaster, the notification queue, rider presence and skipped order pushes"""
+    from .notifications import order_change_stats
+    from .presence import rider_presence
+    from .signals import order_count_broadcaster
 
+    return JsonResponse({
+        'success': True,
+        'order_count_broadcaster': order_count_broadcaster.stats(),
+        'dispatcher': notification_dispatcher.stats(),
+        'presence': rider_presence.stats(),
+        'order_changes': order_change_stats.stats(),
+    })
@@ -0,0 +1,116 @@
+"""
+Barangay zones used to partition rider broadcasts.
+
+Riders subscribe to the group of the barangay they are in; order events go
+to the restaurant's barangay and its neighbours instead of the whole city.
+Neighbours and barangay centre points are configured in settings so new
+areas can be added without code changes.
+"""
+import math
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+RESTAURANT_ZONE_CACHE_KEY = 'orders:restaurant_zone:{user_id}'
+
+
+def zone_slug(barangay):
+    """Normalize a barangay name into a group-safe slug ('' if unknown)"""
+    if not barangay:
+        return ''
+    return re.sub(r'[^a-z0-9]+', '-', str(barangay).strip().lower()).strip('-')[:60]
+
+
+def zone_group(slug):
+    """Channel-layer group for riders in one barangay"""
+    return f'orders_zone_{slug}'
+
+
+@lru_cache(maxsize=1)
+def _neighbour_map():
+    configured = getattr(settings, 'ORDERS_BARANGAY_NEIGHBOURS', {}) or {}
+    neighbours = {}
+    for barangay, adjacent in configured.items():
+        slug = zone_slug(barangay)
+        for other in adjacent:
+            other_slug = zone_slug(other)
+            if not slug or not other_slug or other_slug == slug:
+                continue
+            # Adjacency is symmetric even if only one side is configured
+            neighbours.setdefault(slug, set()).add(other_slug)
+            neighbours.setdefault(other_slug, set()).add(slug)
+    return {slug: frozenset(others) for slug, others in neighbours.items()}
+
+
+def neighbours(slug):
+    return _neighbour_map().get(slug, frozenset())
+
+
+def zone_area(slug):
+    """
+    Zones whose orders a rider in ``slug`` is offered.
+
+    Because adjacency is symmetric this is also the set of zones whose
+    riders care about an order placed in ``slug``.
+    """
+    if not slug:
+        return frozenset()
+    return frozenset({slug}) | neighbours(slug)
+
+
+def restaurant_zone(restaurant_user_id):
+    """Zone of the restaurant owned by this user, cached per restaurant"""
+    key = RESTAURANT_ZONE_CACHE_KEY.format(user_id=restaurant_user_id)
+    slug = cache.get(key)
+    if slug is None:
+        from restaurant.models import Restaurant
+
+        barangay = (
+            Restaurant.objects.filter(user_id=restaurant_user_id)
+            .values_list('barangay', flat=True)
+            .first()
+        )
+        slug = zone_slug(barangay)
+        cache.set(key, slug, timeout=None)
+    return slug
+
+
+def forget_restaurant_zone(restaurant_user_id):
+    cache.delete(RESTAURANT_ZONE_CACHE_KEY.format(user_id=restaurant_user_id))
+
+
+def nearest_zone(latitude, longitude):
+    """Closest configured barangay centre to a coordinate ('' if none configured)"""
+    centroids = getattr(settings, 'ORDERS_BARANGAY_CENTROIDS', {}) or {}
+    best_slug, best_distance = '', None
+    for barangay, (lat, lng) in centroids.items():
+        # Equirectangular distance is plenty at city scale
+        dx = (lng - longitude) * math.cos(math.radians((lat + latitude) / 2))
+        dy = lat - latitude
+        distance = dx * dx + dy * dy
+        if best_distance is None or distance < best_distance:
+            best_slug, best_distance = zone_slug(barangay), distance
+    return best_slug
+
+
+def rider_zone(rider_user_id, declared_barangay=None):
+    """
+    Zone a rider should listen on: the barangay the client declared, or the
+    one closest to the rider's last known location.
+    """
+    slug = zone_slug(declared_barangay)
+    if slug:
+        return slug
+
+    from delivery.models import RiderLocation
+
+    location = (
+        RiderLocation.objects.filter(rider_id=rider_user_id)
+        .values_list('latitude', 'longitude')
+        .first()
+    )
+    if location is None:
+        return ''
+    return nearest_zone(*location)
@@ -0,0 +1,79 @@
+"""
+The approved-restaurant listing the customer app shows on its home screen.
+
+It is serialized once into JSON bytes and cached together with its ETag.
+Saving or deleting a Restaurant bumps the listing version (restaurant.signals)
+and the next request rebuilds it, so steady-state requests are two cache
+reads and no queries.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+
+from .models import Restaurant
+
+logger = logging.getLogger(__name__)
+
+LISTING_VERSION_KEY = 'restaurants:listing_version'
+# Pictures uploaded before Cloudinary are served from our host, so the
+# listing is built per base URL
+LISTING_SNAPSHOT_KEY = 'restaurants:listing:{digest}'
+
+
+def listing_version():
+    return cache.get_or_set(LISTING_VERSION_KEY, 1, timeout=None)
+
+
+def bump_listing_version():
+    """Mark every cached listing stale"""
+    cache.add(LISTING_VERSION_KEY, 1, timeout=None)
+    try:
+        cache.incr(LISTING_VERSION_KEY)
+    except ValueError:
+        cache.set(LISTING_VERSION_KEY, 1, timeout=None)
+
+
+def picture_url(picture, base_url):
+    """Cloudinary URLs are already absolute; old local files get our host"""
+    if not picture:
+        return None
+    name = str(picture)
+    if name.startswith('http'):
+        return name
+    return base_url + picture.url
+
+
+def restaurant_entry(restaurant, base_url):
+    return {
+        'id': restaurant.id,
+        'name': restaurant.name,
+        'address': restaurant.address,
+        'barangay': restaurant.barangay,
+        'street': restaurant.street,
+        'restaurant_type': restaurant.restaurant_type,
+        'phone': restaurant.phone,
+        'profile_picture': picture_url(restaurant.profile_picture, base_url),
+    }
+
+
+def restaurant_listing(base_url):
+    """``(body, etag)`` for /getRestaurants/, rebuilt only after a restaurant changed"""
+    from core.http import make_etag
+
+    version = listing_version()
+    key = LISTING_SNAPSHOT_KEY.format(digest=hashlib.md5(base_url.encode()).hexdigest())
+    snapshot = cache.get(key)
+    if snapshot is not None and snapshot['version'] == version:
+        return snapshot['body'], snapshot['etag']
+
+    restaurants = Restaurant.objects.filter(is_approved=True).only(
+        'id', 'name', 'address', 'barangay', 'street', 'restaurant_type', 'phone', 'profile_picture'
+    )
+    entries = [restaurant_entry(restaurant, base_url) for restaurant in restaurants]
+    body = json.dumps({'success': True, 'restaurants': entries}).encode()
+    etag = make_etag(body)
+    cache.set(key, {'version': version, 'body': body, 'etag': etag}, timeout=None)
+    logger.info(f"Rebuilt restaurant listing v{version} ({len(entries)} restaurants)")
+    return body, etag
@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.db import models
 
-class Restaurant(models.Model):
+from core.geocoding import GeocodedLocationMixin
+
+class Restaurant(GeocodedLocationMixin, models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     address = models.TextField()
@@ -11,6 +13,16 @@ class Restaurant(models.Model):
     profile_picture = models.ImageField(upload_to='restaurant_profiles/', max_length=500, blank=True, null=True)  # Increased for Cloudinary URLs
     phone = models.CharField(max_length=15)
     is_approved = models.BooleanField(default=False)
+    latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    plus_code = models.CharField(max_length=20, blank=True, default='')
+
+    # latitude/longitude/plus_code are resolved from these when they change
+    location_fields = ('street', 'address', 'barangay')
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def location_query(self):
+        # ``street`` usually holds a plus code with locality, the most precise thing we have
+        return self.street or f'{self.address}, {self.barangay}'
\ No newline at end of file
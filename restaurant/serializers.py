@@ -17,7 +17,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'token_number', 'customer_name', 'customer_address', 'created_at', 'total_amount', 'rider_name', 'rider_phone', 'items']
+        fields = ['id', 'token_number', 'status', 'customer_name', 'customer_address', 'created_at', 'total_amount', 'rider_name', 'rider_phone', 'items']
 
     def get_customer_name(self, obj):
         return obj.customer.get_full_name()
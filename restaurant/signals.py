@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .listing import bump_listing_version
+from .models import Restaurant
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_listing_changed(sender, instance, **kwargs):
+    """Approval, name, address or picture may have changed; rebuild the listing"""
+    bump_listing_version()
@@ -1,3 +1,76 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from orders.models import Order, OrderStatusTransition
+from users.models import User
+
+from .models import Restaurant
+
+
+class OrderActionViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(username='customer', role='customer')
+        cls.restaurant = User.objects.create(username='resto', role='restaurant')
+
+    def setUp(self):
+        self.client.force_login(self.restaurant)
+        self.order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_amount=129)
+
+    def prepare(self):
+        return self.client.post(reverse('restaurant:prepare_order'), {'order_id': self.order.id}).json()
+
+    def test_prepare_twice_says_so(self):
+        self.assertEqual(self.prepare(), {'success': True, 'message': 'Order is now being prepared!'})
+        self.assertEqual(self.prepare(), {'success': False, 'message': 'Order is already being prepared.'})
+        self.assertEqual(OrderStatusTransition.objects.filter(order=self.order).count(), 1)
+
+    def test_prepare_after_cancel_is_refused(self):
+        Order.objects.filter(pk=self.order.id).update(status='cancelled')
+        self.assertEqual(self.prepare(), {'success': False, 'message': 'Order can no longer be prepared.'})
+
+    def test_repeated_accept_is_reported_separately(self):
+        url = reverse('restaurant:accept_order', args=[self.order.id])
+        self.client.post(url)
+        response = self.client.post(url, follow=True)
+        self.assertEqual(
+            [str(message) for message in response.context['messages']],
+            [f"Order #{self.order.id} has been accepted.", f"Order #{self.order.id} was already accepted."],
+        )
+
+
+class RestaurantListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='resto', role='restaurant')
+        cls.restaurant = Restaurant.objects.create(
+            user=user, name='Resto', address='a', barangay='Poblacion', phone='1', is_approved=True
+        )
+        hidden = User.objects.create(username='hidden', role='restaurant')
+        Restaurant.objects.create(user=hidden, name='Hidden', address='b', barangay='Basak', phone='2')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('core:get_restaurants')
+
+    def test_listing_is_served_from_the_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual([entry['name'] for entry in first.json()['restaurants']], ['Resto'])
+
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url)
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+    def test_saved_restaurant_changes_the_etag(self):
+        first = self.client.get(self.url)
+        self.restaurant.name = 'Renamed'
+        self.restaurant.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['restaurants'][0]['name'], 'Renamed')
@@ -6,13 +6,15 @@ from .models import Restaurant  # Import Restaurant from the restaurant app
 from django.contrib.auth.decorators import login_required
 from menu.models import CartItem
 from orders.models import Order
+from orders.transitions import DONE, NOT_FOUND, NOT_YOURS, UNCHANGED, transition_order
 from django.contrib import messages
 from django.core import serializers
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from .serializers import OrderSerializer
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from menu.forms import ProductForm
+from menu.catalog import menu_products, product_entry
 from menu.models import Product
 
 def cart_view(request):
@@ -58,7 +60,8 @@ def sync_cart_with_session(request):
     
 def restaurant_detail(request, restaurant_id):
     restaurant = get_object_or_404(Restaurant, id=restaurant_id)
-    products = Product.objects.filter(restaurant=restaurant)
+    base_url = request.build_absolute_uri('/')[:-1]
+    products = [product_entry(product, base_url) for product in menu_products(restaurant.id)]
     
     request.session['restaurant_id'] = restaurant.id
 
@@ -154,20 +157,34 @@ def dashboard(request):
 
 @login_required
 def accept_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id, restaurant=request.user)
     if request.method == 'POST':
-        order.status = 'accepted'
-        order.save()
-        messages.success(request, f"Order #{order.id} has been accepted.")
+        result = transition_order(order_id, 'accepted', request.user)
+        if result in (NOT_FOUND, NOT_YOURS):
+            raise Http404
+        if result == DONE:
+            messages.success(request, f"Order #{order_id} has been accepted.")
+        elif result == UNCHANGED:
+            messages.info(request, f"Order #{order_id} was already accepted.")
+        else:
+            messages.error(request, f"Order #{order_id} can no longer be accepted.")
+    else:
+        get_object_or_404(Order, id=order_id, restaurant=request.user)
     return redirect('restaurant:dashboard')
 
 @login_required
 def reject_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id, restaurant=request.user)
     if request.method == 'POST':
-        order.status = 'cancelled'
-        order.save()
-        messages.error(request, f"Order #{order.id} has been rejected.")
+        result = transition_order(order_id, 'cancelled', request.user)
+        if result in (NOT_FOUND, NOT_YOURS):
+            raise Http404
+        if result == DONE:
+            messages.error(request, f"Order #{order_id} has been rejected.")
+        elif result == UNCHANGED:
+            messages.info(request, f"Order #{order_id} was already rejected.")
+        else:
+            messages.error(request, f"Order #{order_id} can no longer be rejected.")
+    else:
+        get_object_or_404(Order, id=order_id, restaurant=request.user)
     return redirect('restaurant:dashboard')
 
 @login_required
@@ -175,12 +192,14 @@ def prepare_order(request):
     if request.method == 'POST':
         order_id = request.POST.get('order_id')
         try:
-            order = Order.objects.get(id=order_id, restaurant=request.user)
-            order.status = 'preparing'
-            order.save()
-            return JsonResponse({'success': True, 'message': 'Order is now being prepared!'})
-        except Order.DoesNotExist:
-            return JsonResponse({'success': False, 'message': 'Order not found.'})
+            result = transition_order(order_id, 'preparing', request.user)
+            if result == DONE:
+                return JsonResponse({'success': True, 'message': 'Order is now being prepared!'})
+            if result == UNCHANGED:
+                return JsonResponse({'success': False, 'message': 'Order is already being prepared.'})
+            if result in (NOT_FOUND, NOT_YOURS):
+                return JsonResponse({'success': False, 'message': 'Order not found.'})
+            return JsonResponse({'success': False, 'message': 'Order can no longer be prepared.'})
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)})
     return JsonResponse({'success': False, 'message': 'Invalid request method.'})
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Rider, RiderEarnings
+from .models import Rider, RiderDailyEarnings, RiderEarnings, RiderEarningsTotal
 
 # Register your models here.
 admin.site.register(Rider)
-admin.site.register(RiderEarnings)
\ No newline at end of file
+admin.site.register(RiderEarnings)
+admin.site.register(RiderDailyEarnings)
+admin.site.register(RiderEarningsTotal)
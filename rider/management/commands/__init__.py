@@ -0,0 +1,2 @@
+# Commands module
+
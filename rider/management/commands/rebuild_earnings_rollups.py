@@ -0,0 +1,85 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from rider.models import RiderDailyEarnings, RiderEarnings, RiderEarningsTotal
+
+
+class Command(BaseCommand):
+    help = 'Check the rider earnings rollups against the raw RiderEarnings rows, or rebuild them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report differences (exits with an error if there are any)'
+        )
+
+    def handle(self, *args, **options):
+        daily, totals = self.expected_rollups()
+
+        if options['check']:
+            problems = self.compare(daily, totals)
+            for problem in problems:
+                self.stdout.write(self.style.WARNING(problem))
+            if problems:
+                raise CommandError(f'{len(problems)} rollup rows differ from RiderEarnings; run without --check to rebuild')
+            self.stdout.write(self.style.SUCCESS(
+                f'Rollups match RiderEarnings ({len(daily)} rider-days, {len(totals)} riders)'
+            ))
+            return
+
+        with transaction.atomic():
+            RiderDailyEarnings.objects.all().delete()
+            RiderEarningsTotal.objects.all().delete()
+            RiderDailyEarnings.objects.bulk_create(
+                [RiderDailyEarnings(rider_id=rider_id, date=date, amount=amount)
+                 for (rider_id, date), amount in daily.items()],
+                batch_size=1000,
+            )
+            RiderEarningsTotal.objects.bulk_create(
+                [RiderEarningsTotal(rider_id=rider_id, amount=amount) for rider_id, amount in totals.items()],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rollups: {len(daily)} rider-days, {len(totals)} riders'
+        ))
+
+    def expected_rollups(self):
+        """Rollup values computed from scratch (local-time days, like RiderEarnings.save)"""
+        rows = (
+            RiderEarnings.objects
+            .annotate(date=TruncDate('earned_at', tzinfo=timezone.get_current_timezone()))
+            .values('rider_id', 'date')
+            .annotate(amount=Sum('amount'))
+        )
+        daily, totals = {}, defaultdict(Decimal)
+        for row in rows:
+            amount = Decimal(str(row['amount']))
+            daily[(row['rider_id'], row['date'])] = amount
+            totals[row['rider_id']] += amount
+        return daily, dict(totals)
+
+    def compare(self, daily, totals):
+        problems = []
+
+        stored_daily = {
+            (row.rider_id, row.date): row.amount for row in RiderDailyEarnings.objects.all()
+        }
+        for key in sorted(set(daily) | set(stored_daily), key=str):
+            expected, stored = daily.get(key, Decimal(0)), stored_daily.get(key, Decimal(0))
+            if expected != stored:
+                problems.append(f'Rider {key[0]} on {key[1]}: rollup {stored}, rows {expected}')
+
+        stored_totals = dict(RiderEarningsTotal.objects.values_list('rider_id', 'amount'))
+        for rider_id in sorted(set(totals) | set(stored_totals)):
+            expected, stored = totals.get(rider_id, Decimal(0)), stored_totals.get(rider_id, Decimal(0))
+            if expected != stored:
+                problems.append(f'Rider {rider_id} total: rollup {stored}, rows {expected}')
+
+        return problems
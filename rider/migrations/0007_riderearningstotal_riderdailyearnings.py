@@ -0,0 +1,65 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:00
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_rollups(apps, schema_editor):
+    RiderEarnings = apps.get_model('rider', 'RiderEarnings')
+    RiderDailyEarnings = apps.get_model('rider', 'RiderDailyEarnings')
+    RiderEarningsTotal = apps.get_model('rider', 'RiderEarningsTotal')
+
+    rows = (
+        RiderEarnings.objects
+        .annotate(date=TruncDate('earned_at', tzinfo=timezone.get_current_timezone()))
+        .values('rider_id', 'date')
+        .annotate(amount=Sum('amount'))
+    )
+    daily, totals = [], defaultdict(Decimal)
+    for row in rows:
+        amount = Decimal(str(row['amount']))
+        daily.append(RiderDailyEarnings(rider_id=row['rider_id'], date=row['date'], amount=amount))
+        totals[row['rider_id']] += amount
+
+    RiderDailyEarnings.objects.bulk_create(daily, batch_size=1000)
+    RiderEarningsTotal.objects.bulk_create(
+        [RiderEarningsTotal(rider_id=rider_id, amount=amount) for rider_id, amount in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rider', '0006_rider_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiderEarningsTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('rider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_total', to='rider.rider')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RiderDailyEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('rider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to='rider.rider')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('rider', 'date'), name='unique_rider_daily_earnings')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
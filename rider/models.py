@@ -1,9 +1,11 @@
 # rider/models.py
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from cloudinary.models import CloudinaryField
 
 from datetime import datetime, timedelta
+from decimal import Decimal
 from django.utils import timezone
 
 class Rider(models.Model):
@@ -17,6 +19,9 @@ class Rider(models.Model):
     def __str__(self):
         return self.user.username
     
+CENT = Decimal('0.01')
+
+
 class RiderEarnings(models.Model):
     rider = models.ForeignKey(Rider, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -25,21 +30,110 @@ class RiderEarnings(models.Model):
     def __str__(self):
         return f"{self.rider.user.username} - {self.amount} on {self.earned_at}"
 
+    def save(self, *args, **kwargs):
+        # Keep the daily rollup and running total in the same transaction as the row
+        self.amount = Decimal(str(self.amount)).quantize(CENT)
+        with transaction.atomic():
+            if self.pk is not None:
+                previous = RiderEarnings.objects.filter(pk=self.pk).values('rider_id', 'amount', 'earned_at').first()
+                if previous is not None:
+                    apply_earnings(previous['rider_id'], previous['earned_at'], -previous['amount'])
+            super().save(*args, **kwargs)
+            apply_earnings(self.rider_id, self.earned_at, self.amount)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            apply_earnings(self.rider_id, self.earned_at, -Decimal(str(self.amount)))
+            return super().delete(*args, **kwargs)
+
     @staticmethod
     def get_total_earnings(rider):
-        return RiderEarnings.objects.filter(rider=rider).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        return RiderEarningsTotal.objects.filter(rider=rider).values_list('amount', flat=True).first() or 0
 
     @staticmethod
     def get_daily_earnings(rider):
         today = timezone.localdate()  # Use timezone-aware date
-        return RiderEarnings.objects.filter(rider=rider, earned_at__date=today).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        return RiderDailyEarnings.objects.filter(rider=rider, date=today).values_list('amount', flat=True).first() or 0
 
     @staticmethod
     def get_weekly_earnings(rider):
-        start_of_week = timezone.localtime(timezone.now()) - timedelta(days=timezone.localtime(timezone.now()).weekday())  # Get start of the week with timezone-aware datetime
-        return RiderEarnings.objects.filter(rider=rider, earned_at__gte=start_of_week).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        today = timezone.localdate()
+        start_of_week = today - timedelta(days=today.weekday())
+        return RiderDailyEarnings.objects.filter(rider=rider, date__gte=start_of_week).aggregate(models.Sum('amount'))['amount__sum'] or 0
 
     @staticmethod
     def get_monthly_earnings(rider):
-        start_of_month = timezone.localtime(timezone.now()).replace(day=1)  # Get start of the month with timezone-aware datetime
-        return RiderEarnings.objects.filter(rider=rider, earned_at__gte=start_of_month).aggregate(models.Sum('amount'))['amount__sum'] or 0
\ No newline at end of file
+        start_of_month = timezone.localdate().replace(day=1)
+        return RiderDailyEarnings.objects.filter(rider=rider, date__gte=start_of_month).aggregate(models.Sum('amount'))['amount__sum'] or 0
+
+    @staticmethod
+    def get_earnings_summary(rider):
+        """Total, today, this week and this month from the rollups (two small queries)"""
+        today = timezone.localdate()
+        start_of_week = today - timedelta(days=today.weekday())
+        start_of_month = today.replace(day=1)
+
+        days = RiderDailyEarnings.objects.filter(
+            rider=rider, date__gte=min(start_of_week, start_of_month)
+        ).values_list('date', 'amount')
+
+        summary = {
+            'total_earnings': RiderEarnings.get_total_earnings(rider),
+            'daily_earnings': 0,
+            'weekly_earnings': 0,
+            'monthly_earnings': 0,
+        }
+        for date, amount in days:
+            if date == today:
+                summary['daily_earnings'] += amount
+            if date >= start_of_week:
+                summary['weekly_earnings'] += amount
+            if date >= start_of_month:
+                summary['monthly_earnings'] += amount
+        return summary
+
+
+class RiderDailyEarnings(models.Model):
+    """Sum of a rider's earnings per local day, kept in step by RiderEarnings.save()"""
+    rider = models.ForeignKey(Rider, on_delete=models.CASCADE, related_name='daily_earnings')
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rider', 'date'], name='unique_rider_daily_earnings'),
+        ]
+
+    def __str__(self):
+        return f"{self.rider.user.username} - {self.amount} on {self.date}"
+
+
+class RiderEarningsTotal(models.Model):
+    """Running total of a rider's earnings, kept in step by RiderEarnings.save()"""
+    rider = models.OneToOneField(Rider, on_delete=models.CASCADE, related_name='earnings_total')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.rider.user.username} - {self.amount}"
+
+
+def _add_to_rollup(model, lookup, amount):
+    # UPDATE ... SET amount = amount + x is atomic in the database; create the
+    # row on first use, retrying as an update if another request created it first
+    if model.objects.filter(**lookup).update(amount=F('amount') + amount):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(amount=amount, **lookup)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(amount=F('amount') + amount)
+
+
+def apply_earnings(rider_id, earned_at, amount):
+    """Add (or with a negative amount, remove) earnings from a rider's rollups"""
+    amount = Decimal(str(amount)).quantize(CENT)
+    if not amount:
+        return
+    day = timezone.localdate(earned_at) if timezone.is_aware(earned_at) else earned_at.date()
+    _add_to_rollup(RiderDailyEarnings, {'rider_id': rider_id, 'date': day}, amount)
+    _add_to_rollup(RiderEarningsTotal, {'rider_id': rider_id}, amount)
@@ -1,3 +1,195 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.urls import reverse
+from django.utils import timezone
+
+from customer.models import Address
+from menu.models import Product
+from orders.dispatch import notification_dispatcher
+from orders.models import Order, OrderLine
+from restaurant.models import Restaurant
+from users.models import User
+
+from .models import Rider, RiderDailyEarnings, RiderEarnings, RiderEarningsTotal
+
+
+# Count broadcasts flush inline instead of on a timer thread that can't see the test transaction
+@override_settings(ORDERS_BROADCAST_WINDOW_SECONDS=0)
+class FetchOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurant_user = User.objects.create(username='resto', role='restaurant')
+        restaurant = Restaurant.objects.create(
+            user=cls.restaurant_user, name='Resto', address='Poblacion', barangay='Poblacion', phone='1'
+        )
+        cls.product = Product.objects.create(restaurant=restaurant, name='Adobo', price=50)
+        cls.rider = User.objects.create(username='rider', role='rider')
+
+    def setUp(self):
+        # The feed snapshot and its version live in the cache
+        cache.clear()
+        # Notification jobs run on the dispatcher thread in production; here
+        # they run inline so they see the test transaction
+        patcher = mock.patch.object(notification_dispatcher, 'run', lambda job, *args: job(*args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_orders(self, count, status='pending'):
+        orders = []
+        for i in range(count):
+            # Run the on-commit signal work (counter, feed version) like a real request would
+            with self.captureOnCommitCallbacks(execute=True):
+                customer = User.objects.create(username=f'customer_{Order.objects.count()}', role='customer')
+                Address.objects.create(user=customer, street='Street', barangay='Basak', label='home')
+                order = Order.objects.create(
+                    customer=customer, restaurant=self.restaurant_user, total_amount=129, status=status
+                )
+                OrderLine.objects.create(order=order, product=self.product, quantity=2, subtotal=100)
+            orders.append(order)
+        return orders
+
+    def fetch(self, **params):
+        return self.client.post(reverse('rider:fetch-orders'), params).json()
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.create_orders(3)
+        with self.assertNumQueries(1):
+            self.fetch(status='pending,ready')
+
+        self.create_orders(20)
+        with self.assertNumQueries(1):
+            data = self.fetch(status='pending,ready')
+        self.assertEqual(len(data['orders']), 23)
+        self.assertEqual(data['orders'][0]['subtotal'], 100.0)
+        self.assertEqual(data['orders'][0]['restaurant']['name'], 'Resto')
+
+    def test_snapshot_is_built_once_per_pool_change(self):
+        self.create_orders(2)
+        with self.assertNumQueries(1):
+            first = self.client.get(reverse('rider:fetch-orders'))
+        with self.assertNumQueries(0):
+            again = self.client.post(reverse('rider:fetch-orders'))
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(len(first.json()['orders']), 2)
+
+        not_modified = self.client.get(reverse('rider:fetch-orders'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.create_orders(1)
+        with self.assertNumQueries(1):
+            changed = self.client.get(reverse('rider:fetch-orders'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(len(changed.json()['orders']), 3)
+
+    def test_only_pickable_orders_are_listed(self):
+        pending = self.create_orders(1)[0]
+        self.create_orders(1, status='delivered')
+        self.create_orders(1, status='cancelled')
+        claimed = self.create_orders(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            claimed.rider = self.rider
+            claimed.save()
+
+        data = self.fetch()
+        self.assertEqual([o['order_id'] for o in data['orders']], [pending.id])
+
+        ready = self.create_orders(1, status='ready')[0]
+        data = self.fetch(status='ready')
+        self.assertEqual([o['order_id'] for o in data['orders']], [ready.id])
+
+        response = self.client.post(reverse('rider:fetch-orders'), {'status': 'delivered'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination(self):
+        orders = self.create_orders(5)
+        expected = [order.id for order in reversed(orders)]
+
+        # Clients that don't page get the whole pool
+        everything = self.fetch()
+        self.assertEqual([o['order_id'] for o in everything['orders']], expected)
+        self.assertIsNone(everything['next_cursor'])
+
+        first = self.fetch(limit=2)
+        self.assertEqual([o['order_id'] for o in first['orders']], expected[:2])
+
+        second = self.fetch(limit=2, cursor=first['next_cursor'])
+        self.assertEqual([o['order_id'] for o in second['orders']], expected[2:4])
+
+        last = self.fetch(limit=2, cursor=second['next_cursor'])
+        self.assertEqual([o['order_id'] for o in last['orders']], expected[4:])
+        self.assertIsNone(last['next_cursor'])
+
+
+class RiderEarningsRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rider = Rider.objects.create(
+            user=User.objects.create(username='rider', role='rider'),
+            vehicle_type='Motorcycle', license_number='L-1', phone='1',
+        )
+        cls.other = Rider.objects.create(
+            user=User.objects.create(username='other', role='rider'),
+            vehicle_type='Motorcycle', license_number='L-2', phone='2',
+        )
+
+    def assertRollupsMatchRows(self):
+        """The rollups hold exactly what summing the raw rows gives"""
+        rows = (
+            RiderEarnings.objects
+            .annotate(date=TruncDate('earned_at', tzinfo=timezone.get_current_timezone()))
+            .values('rider_id', 'date')
+            .annotate(total=Sum('amount'))
+        )
+        expected_days = {(row['rider_id'], row['date']): row['total'] for row in rows}
+        days = {
+            (row.rider_id, row.date): row.amount
+            for row in RiderDailyEarnings.objects.all() if row.amount
+        }
+        self.assertEqual(days, expected_days)
+
+        expected_totals = dict(
+            RiderEarnings.objects.values_list('rider_id').annotate(total=Sum('amount'))
+        )
+        totals = {row.rider_id: row.amount for row in RiderEarningsTotal.objects.all() if row.amount}
+        self.assertEqual(totals, expected_totals)
+
+    def earn(self, amount, days_ago=0, rider=None):
+        earned_at = timezone.now() - timedelta(days=days_ago)
+        return RiderEarnings.objects.create(rider=rider or self.rider, amount=amount, earned_at=earned_at)
+
+    def test_rollups_follow_saves_edits_and_deletes(self):
+        self.earn(39)
+        self.earn('49.50')
+        self.earn(39, days_ago=3)
+        self.earn(20, rider=self.other)
+        self.assertRollupsMatchRows()
+
+        # Moving an entry to another day and changing its amount
+        edited = self.earn(10)
+        edited.amount = Decimal('15.25')
+        edited.earned_at = timezone.now() - timedelta(days=1)
+        edited.save()
+        self.assertRollupsMatchRows()
+
+        edited.delete()
+        RiderEarnings.objects.filter(rider=self.other).first().delete()
+        self.assertRollupsMatchRows()
+        self.assertEqual(RiderEarnings.get_total_earnings(self.rider), Decimal('127.50'))
+
+    def test_summary_reads_the_rollups(self):
+        self.earn(39)
+        self.earn(39, days_ago=40)
+
+        with self.assertNumQueries(2):
+            summary = RiderEarnings.get_earnings_summary(self.rider)
+        self.assertEqual(summary['total_earnings'], Decimal('78'))
+        self.assertEqual(summary['daily_earnings'], Decimal('39'))
+        self.assertEqual(summary['weekly_earnings'], Decimal('39'))
+        self.assertEqual(summary['monthly_earnings'], Decimal('39'))
@@ -6,6 +6,11 @@ from .models import Rider, RiderEarnings
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from orders.models import Order, OrderLine
+from orders.claims import CLAIMED, CLAIMED_STATUS, NOT_CLAIMABLE, TAKEN, claim_order
+from orders.transitions import CONFLICT, DONE, NOT_FOUND, NOT_YOURS, UNCHANGED, transition_order
+from orders.counters import AVAILABLE_STATUSES, available_order_counter
+from orders.feed import FEED_MAX_PAGE_SIZE, FEED_PAGE_SIZE, feed_page, feed_snapshot
+from core.http import cached_json_response
 from customer.models import Address, Customer
 from restaurant.models import Restaurant
 from users.models import User
@@ -18,8 +23,6 @@ import logging
 import os
 import boto3
 from botocore.config import Config
-from django.conf import settings
-import requests
 
 @csrf_exempt
 @login_required
@@ -60,17 +63,10 @@ def toggle_status(request):
 def rider_dashboard(request):
     rider = Rider.objects.get(user=request.user)
 
-    total_earnings = RiderEarnings.get_total_earnings(rider)
-    daily_earnings = RiderEarnings.get_daily_earnings(rider)
-    weekly_earnings = RiderEarnings.get_weekly_earnings(rider)
-    monthly_earnings = RiderEarnings.get_monthly_earnings(rider)
-
+    # Read from the per-day rollups rather than summing every earnings row
     context = {
         'rider': rider,
-        'total_earnings': total_earnings,
-        'daily_earnings': daily_earnings,
-        'weekly_earnings': weekly_earnings,
-        'monthly_earnings': monthly_earnings,
+        **RiderEarnings.get_earnings_summary(rider),
     }
 
     return render(request, 'rider/dashboard.html', context)
@@ -80,46 +76,58 @@ def complete_delivery(rider, amount):
     
     
 def get_available_orders(request):
-    # Count orders that don't have a rider assigned (rider is None or NULL)
-    count = Order.objects.filter(rider__isnull=True, status__in=['pending', 'accepted', 'preparing', 'ready']).count()
+    # Orders that don't have a rider assigned yet (cached counter, no table scan)
+    count = available_order_counter.get()
     return JsonResponse({'count': count})
 
 
 @csrf_exempt
 def fetch_orders(request):
-    if request.method == 'POST':
-        orders = Order.objects.filter(rider__isnull=True)
-
-        order_list = []
-        for order in orders:
+    """
+    Open orders riders can pick up, newest first.
+
+    Optional parameters (query string, form or JSON body):
+    ``status`` - comma-separated statuses (default: every pickable status),
+    ``limit`` - page size (max 200),
+    ``cursor`` - the ``next_cursor`` of the previous page (pages of 50 unless ``limit`` is given).
+
+    Without ``limit`` or ``cursor`` the whole pool is returned. The unfiltered
+    pool is the shared cached snapshot; send GET with ``If-None-Match`` to get
+    a 304 while it hasn't changed.
+    """
+    if request.method in ('GET', 'POST'):
+        params = request.GET.dict()
+        params.update(request.POST.dict())
+        if request.content_type == 'application/json' and request.body:
             try:
-                # Get related models
-                restaurant_obj = Restaurant.objects.get(user=order.restaurant)
-                customer_address = Address.objects.get(user=order.customer)
+                params.update(json.loads(request.body))
+            except ValueError:
+                return JsonResponse({'success': False, 'message': 'Invalid JSON body'}, status=400)
+
+        statuses = params.get('status')
+        if statuses:
+            statuses = [s.strip() for s in str(statuses).split(',') if s.strip()]
+            invalid = set(statuses) - set(AVAILABLE_STATUSES)
+            if invalid:
+                return JsonResponse({
+                    'success': False,
+                    'message': f"Invalid status: {', '.join(sorted(invalid))}. Allowed: {', '.join(AVAILABLE_STATUSES)}"
+                }, status=400)
 
-                # Calculate subtotal from OrderLine
-                subtotal = order.items.aggregate(total=Sum('subtotal'))['total'] or 0
-
-                order_data = {
-                    'order_id': order.id,
-                    'restaurant_barangay': restaurant_obj.barangay,
-                    'customer_barangay': customer_address.barangay,
-                    'customer_street': customer_address.street,
-                    'restaurant': {
-                        'name': restaurant_obj.name,
-                    },
-                    'total_amount': float(order.total_amount),
-                    'rider_fee': float(order.rider_fee),
-                    'small_order_fee': float(order.small_order_fee),
-                    'subtotal': float(subtotal),
-                }
-                order_list.append(order_data)
-
-            except Exception as e:
-                print(f"Error processing order {order.id}: {e}")
-                continue
-
-        return JsonResponse({'success': True, 'orders': order_list})
+        try:
+            cursor = int(params['cursor']) if params.get('cursor') not in (None, '') else None
+            limit = params.get('limit') or (FEED_PAGE_SIZE if cursor is not None else None)
+            if limit is not None:
+                limit = min(max(int(limit), 1), FEED_MAX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'message': 'limit and cursor must be integers'}, status=400)
+
+        if not statuses and limit is None:
+            body, etag = feed_snapshot()
+            return cached_json_response(request, body, etag)
+
+        order_list, next_cursor = feed_page(statuses, limit, cursor)
+        return JsonResponse({'success': True, 'orders': order_list, 'next_cursor': next_cursor})
     return JsonResponse({'success': False, 'message': 'Invalid request'})
 
 def orders_view(request):
@@ -139,31 +147,22 @@ def update_order_status(request):
         order_id = request.POST.get('order_id')
         new_status = request.POST.get('status')  # get status like 'otw' or 'delivered'
 
-        try:
-            order = Order.objects.get(id=order_id)
-
-            # If it's a new rider assignment
-            if order.rider is None:
-                order.rider = request.user
-                order.status = 'assigned'  # Set status to 'assigned' when rider accepts
-
-                order.save()
+        # Accepting an unassigned order: a conditional UPDATE decides the winner
+        if new_status in (None, '', CLAIMED_STATUS):
+            result = claim_order(order_id, request.user)
+            if result == CLAIMED:
                 return JsonResponse({'success': True, 'message': f'Order accepted and status updated to assigned.'})
-
-            # Rider tries to update status
-            elif order.rider == request.user:
-                if new_status in ['assigned', 'otw', 'arrived', 'delivered']:
-                    order.status = new_status
-                    order.save()
-                    return JsonResponse({'success': True, 'message': f'Order status updated to {new_status}.'})
-                else:
-                    return JsonResponse({'success': False, 'message': 'Invalid status update.'})
-
-            else:
-                return JsonResponse({'success': False, 'message': 'You are not assigned to this order.'})
-
-        except Order.DoesNotExist:
-            return JsonResponse({'success': False, 'message': 'Order not found.'})
+            if result == TAKEN:
+                return JsonResponse({'success': False, 'code': result, 'message': 'Order was already accepted by another rider.'}, status=409)
+            if result == NOT_CLAIMABLE:
+                return JsonResponse({'success': False, 'code': result, 'message': 'Order can no longer be accepted.'}, status=409)
+            if result == NOT_FOUND:
+                return JsonResponse({'success': False, 'message': 'Order not found.'})
+            # ALREADY_YOURS: a retried accept
+            return JsonResponse({'success': True, 'message': 'Order accepted and status updated to assigned.'})
+
+        # Rider moves their order along (otw, arrived, delivered)
+        return rider_transition_response(transition_order(order_id, new_status, request.user), new_status)
 
     return JsonResponse({'success': False, 'message': 'Invalid request method.'})
 
@@ -228,24 +227,8 @@ def recent_transactions(request):
                 barangay = getattr(customer_address, 'barangay', '') or ''
                 address_text = (street + (', ' if street and barangay else '') + barangay) or barangay or street
 
-            # Optionally derive plus_code via Google Geocoding (if key provided)
-            plus_code = ''
-            try:
-                api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', '')
-                if api_key and customer_address:
-                    query = (address_text or barangay) or ''
-                    if query:
-                        geo_resp = requests.get(
-                            'https://maps.googleapis.com/maps/api/geocode/json',
-                            params={'address': query, 'key': api_key},
-                            timeout=4
-                        )
-                        if geo_resp.ok:
-                            geo = geo_resp.json()
-                            if geo.get('status') == 'OK' and geo.get('results'):
-                                plus_code = geo['results'][0].get('plus_code', {}).get('global_code', '') or ''
-            except Exception:
-                plus_code = ''
+            # Resolved when the address was saved (customer.Address.plus_code)
+            plus_code = customer_address.plus_code if customer_address else ''
 
             results.append({
                 'id': order.id,
@@ -275,27 +258,30 @@ def update_order_with_proof(request):
         proof_of_delivery_url = request.POST.get('proof_of_delivery_url')
         new_status = request.POST.get('status', 'delivered')
 
-        try:
-            order = Order.objects.get(id=order_id)
+        result = transition_order(order_id, new_status, request.user, proof_of_delivery_url=proof_of_delivery_url)
+        if result == UNCHANGED:
+            # Already delivered; a re-uploaded proof still replaces the old one
+            Order.objects.filter(id=order_id, rider=request.user).update(proof_of_delivery_url=proof_of_delivery_url)
+        if result in (DONE, UNCHANGED):
+            return JsonResponse({
+                'success': True,
+                'message': f'Order completed with proof of delivery. Status updated to {new_status}.'
+            })
+        return rider_transition_response(result, new_status)
 
-            # Check if rider is assigned to this order
-            if order.rider == request.user:
-                # Update order with proof of delivery URL and status
-                order.proof_of_delivery_url = proof_of_delivery_url
-                order.status = new_status
-                order.save()
-                
-                return JsonResponse({
-                    'success': True, 
-                    'message': f'Order completed with proof of delivery. Status updated to {new_status}.'
-                })
-            else:
-                return JsonResponse({'success': False, 'message': 'You are not assigned to this order.'})
+    return JsonResponse({'success': False, 'message': 'Invalid request method.'})
 
-        except Order.DoesNotExist:
-            return JsonResponse({'success': False, 'message': 'Order not found.'})
 
-    return JsonResponse({'success': False, 'message': 'Invalid request method.'})
+def rider_transition_response(result, new_status):
+    if result in (DONE, UNCHANGED):
+        return JsonResponse({'success': True, 'message': f'Order status updated to {new_status}.'})
+    if result == NOT_YOURS:
+        return JsonResponse({'success': False, 'message': 'You are not assigned to this order.'})
+    if result == NOT_FOUND:
+        return JsonResponse({'success': False, 'message': 'Order not found.'})
+    if result == CONFLICT:
+        return JsonResponse({'success': False, 'code': result, 'message': 'Order was updated by someone else; try again.'}, status=409)
+    return JsonResponse({'success': False, 'message': 'Invalid status update.'})
 
 
 # (Removed) Presigned S3 URL endpoint — replaced by Cloudinary client-side upload
@@ -345,6 +331,10 @@ def fetch_order_details(request):
                 else:
                     restaurant_profile_url = request.build_absolute_uri(restaurant_obj.profile_picture.url)
             
+            # Stored at save time, or decoded offline from a plus code
+            restaurant_latitude, restaurant_longitude = restaurant_obj.coordinates()
+            customer_latitude, customer_longitude = customer_address.coordinates()
+
             response_data = {
                 'order_id': order.id,
                 'status': order.status,  # Add order status to response
@@ -357,8 +347,11 @@ def fetch_order_details(request):
                 'customer_phone': customer_obj.phone,
                 'customer_barangay': customer_address.barangay,
                 'customer_street': customer_address.street,
-                'customer_latitude': float(customer_address.latitude) if customer_address.latitude else None,
-                'customer_longitude': float(customer_address.longitude) if customer_address.longitude else None,
+                'restaurant_latitude': restaurant_latitude,
+                'restaurant_longitude': restaurant_longitude,
+                'customer_latitude': customer_latitude,
+                'customer_longitude': customer_longitude,
+                'customer_plus_code': customer_address.plus_code,
                 'total_amount': float(order.total_amount),
                 'rider_fee': float(order.rider_fee),
                 'small_order_fee': float(order.small_order_fee),
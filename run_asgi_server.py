@@ -22,6 +22,8 @@ from channels.routing import get_default_application
 if __name__ == "__main__":
     print("🚀 Starting Django ASGI server with WebSocket support...")
     print("📡 WebSocket endpoint: ws://localhost:8000/ws/orders/updates/")
+    print("📡 Order tracking: ws://localhost:8000/ws/orders/<token_number>/")
+    print("📡 Restaurant dashboard: ws://localhost:8000/ws/restaurant/orders/")
     print("🌐 HTTP endpoint: http://localhost:8000/")
     print("Press Ctrl+C to stop")
     
@@ -129,6 +129,42 @@ else:
         }
     }
 
+# Cache (shared across processes when Redis is available)
+if _redis_url:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': _redis_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Real-time order updates (WebSocket / SSE)
+ORDERS_SSE_HEARTBEAT_SECONDS = env.int('ORDERS_SSE_HEARTBEAT_SECONDS', default=30)
+# Order changes inside this window collapse into a single rider count broadcast
+ORDERS_BROADCAST_WINDOW_SECONDS = env.float('ORDERS_BROADCAST_WINDOW_SECONDS', default=0.25)
+# How often the cached available-order counter is re-checked against the database
+ORDERS_COUNTER_RECONCILE_SECONDS = env.int('ORDERS_COUNTER_RECONCILE_SECONDS', default=300)
+# Max notifications waiting for the channel layer before new ones are dropped
+ORDERS_DISPATCH_QUEUE_SIZE = env.int('ORDERS_DISPATCH_QUEUE_SIZE', default=1000)
+# Rider presence expires this long after a connection's last refresh
+ORDERS_PRESENCE_TTL_SECONDS = env.int('ORDERS_PRESENCE_TTL_SECONDS', default=90)
+# Barangay zones for rider broadcasts, as JSON, e.g.
+# ORDERS_BARANGAY_NEIGHBOURS='{"Poblacion": ["Basak", "Lilod Madaya"]}'
+# ORDERS_BARANGAY_CENTROIDS='{"Poblacion": [8.0034, 124.2839]}'
+ORDERS_BARANGAY_NEIGHBOURS = env.json('ORDERS_BARANGAY_NEIGHBOURS', default={})
+ORDERS_BARANGAY_CENTROIDS = env.json('ORDERS_BARANGAY_CENTROIDS', default={})
+
+# The customer app may reuse the restaurant listing this long before revalidating it
+RESTAURANT_LISTING_MAX_AGE_SECONDS = env.int('RESTAURANT_LISTING_MAX_AGE_SECONDS', default=60)
+# Time a typo-tolerant search may spend matching names when the exact search finds nothing
+SEARCH_FUZZY_BUDGET_MS = env.int('SEARCH_FUZZY_BUDGET_MS', default=25)
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -294,4 +330,8 @@ TWILIO_AUTH_TOKEN = env('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER', default='+16162365906')
 
 # Google Maps API Key
-GOOGLE_MAPS_API_KEY = env('GOOGLE_MAPS_API_KEY', default='')
\ No newline at end of file
+GOOGLE_MAPS_API_KEY = env('GOOGLE_MAPS_API_KEY', default='')
+
+# Short plus codes (e.g. "X7Q3+FF Marawi City") are recovered near this point
+PLUS_CODE_REFERENCE_LATITUDE = env.float('PLUS_CODE_REFERENCE_LATITUDE', default=7.9986)
+PLUS_CODE_REFERENCE_LONGITUDE = env.float('PLUS_CODE_REFERENCE_LONGITUDE', default=124.2928)